@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for anki-qb performance work.
+
+Each benchmark is a subcommand; run with --help for the list. Benchmarks that
+take a --max-* threshold exit with status 1 when it's exceeded, so they can be
+used to keep regressions from creeping back in.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+ROOT = Path(__file__).parent.parent
+SRC = ROOT / "src"
+
+console = Console()
+
+
+def time_command(command: list[str], repeat: int) -> list[float]:
+    """Run a command several times and return the wall-clock time of each run in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_startup(args) -> int:
+    """Time CLI startup and package import in fresh interpreters."""
+    cli = str(ROOT / "bin" / "generate-flashcards.py")
+    commands = {
+        "python (baseline)": [sys.executable, "-c", "pass"],
+        "import anki_qb": [sys.executable, "-c", f"import sys; sys.path.insert(0, {str(SRC)!r}); import anki_qb"],
+        "generate-flashcards --help": [sys.executable, cli, "--help"],
+        "generate-flashcards --list-categories": [
+            sys.executable, cli, "--list-categories", "--data-dir", str(args.data_dir)
+        ],
+    }
+
+    table = Table(title=f"Startup time (median of {args.repeat} runs)")
+    table.add_column("Command", style="cyan")
+    table.add_column("Median (ms)", justify="right")
+    table.add_column("Min (ms)", justify="right")
+
+    slowest = 0.0
+    for name, command in commands.items():
+        times = time_command(command, args.repeat)
+        median = statistics.median(times)
+        table.add_row(name, f"{median * 1000:.0f}", f"{min(times) * 1000:.0f}")
+        if name != "python (baseline)":
+            slowest = max(slowest, median)
+
+    console.print(table)
+    if args.max_ms is not None and slowest * 1000 > args.max_ms:
+        console.print(f"[red]✗ Slowest startup {slowest * 1000:.0f} ms exceeds {args.max_ms} ms[/red]")
+        return 1
+    return 0
+
+
+def time_calls(fn, calls: int) -> float:
+    """Call a function repeatedly and return the mean time per call in seconds."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def bench_models(args) -> int:
+    """Time resolving an LLM model per call vs. reusing it from the model registry."""
+    sys.path.insert(0, str(SRC))
+    import llm
+    from anki_qb.llm import ModelRegistry
+
+    registry = ModelRegistry()
+    registry.get(args.model)  # Resolve once up front, as the first call in a run would
+    timings = {
+        "llm.get_model": time_calls(lambda: llm.get_model(args.model), args.calls),
+        "ModelRegistry.get": time_calls(lambda: registry.get(args.model), args.calls),
+    }
+
+    table = Table(title=f"Model lookup overhead ({args.model}, {args.calls} calls)")
+    table.add_column("Lookup", style="cyan")
+    table.add_column("Per call (µs)", justify="right")
+    for name, seconds in timings.items():
+        table.add_row(name, f"{seconds * 1e6:.2f}")
+    console.print(table)
+
+    per_call_us = timings["ModelRegistry.get"] * 1e6
+    if args.max_us is not None and per_call_us > args.max_us:
+        console.print(f"[red]✗ Registry lookup {per_call_us:.2f} µs exceeds {args.max_us} µs[/red]")
+        return 1
+    return 0
+
+
+# Loads the bonuses in a fresh interpreter and prints resident memory and timings as JSON
+MEMORY_SCRIPT = """
+import gc, json, os, pickle, resource, sys, time
+sys.path.insert(0, {src!r})
+from anki_qb.config import Config
+from anki_qb.corpus import load_bonuses
+from anki_qb.formatters import format_qa
+from anki_qb.search import search_bonuses
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+gc.collect()
+baseline = rss()
+start = time.perf_counter()
+df = load_bonuses(Config(data_dir={data_dir!r}), dedup=False, flat={flat!r})
+load = time.perf_counter() - start
+gc.collect()
+memory = rss() - baseline
+start = time.perf_counter()
+data = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+pickling = time.perf_counter() - start
+start = time.perf_counter()
+found = search_bonuses({term!r}, df)
+search = time.perf_counter() - start
+start = time.perf_counter()
+format_qa(found)
+formatting = time.perf_counter() - start
+print(json.dumps({{
+    "memory": memory, "load": load, "pickle_bytes": len(data), "pickle": pickling,
+    "search": search, "format": formatting, "found": len(found),
+}}))
+"""
+
+
+def bench_memory(args) -> int:
+    """Measure resident memory and speed of the bonuses as Python lists vs. flat StringListArrays."""
+    results = {}
+    for name, flat in [("lists", False), ("flat", True)]:
+        script = MEMORY_SCRIPT.format(
+            src=str(SRC), data_dir=str(args.data_dir), flat=flat, term=args.term
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script], check=True, capture_output=True, text=True
+        ).stdout
+        results[name] = json.loads(output.splitlines()[-1])
+
+    table = Table(title=f"Bonus representation ({results['flat']['found']} matches for {args.term!r})")
+    table.add_column("Representation", style="cyan")
+    table.add_column("Resident (MB)", justify="right")
+    table.add_column("Load (s)", justify="right")
+    table.add_column("Pickle (MB)", justify="right")
+    table.add_column("Pickle (ms)", justify="right")
+    table.add_column("Search (ms)", justify="right")
+    table.add_column("format_qa (ms)", justify="right")
+    for name, result in results.items():
+        table.add_row(
+            name,
+            f"{result['memory'] / 1e6:.1f}",
+            f"{result['load']:.2f}",
+            f"{result['pickle_bytes'] / 1e6:.1f}",
+            f"{result['pickle'] * 1000:.0f}",
+            f"{result['search'] * 1000:.1f}",
+            f"{result['format'] * 1000:.1f}",
+        )
+    console.print(table)
+
+    flat_mb = results["flat"]["memory"] / 1e6
+    if args.max_mb is not None and flat_mb > args.max_mb:
+        console.print(f"[red]✗ Flat bonuses use {flat_mb:.1f} MB, more than {args.max_mb} MB[/red]")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for anki-qb")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    startup = subparsers.add_parser("startup", help="CLI startup and package import time")
+    startup.add_argument("--repeat", type=int, default=10, help="Runs per command (default: 10)")
+    startup.add_argument(
+        "--max-ms",
+        type=float,
+        help="Fail if any command's median startup time exceeds this many milliseconds"
+    )
+    startup.add_argument(
+        "--data-dir",
+        type=Path,
+        default=ROOT / "data",
+        help="Data directory (default: data/)"
+    )
+    startup.set_defaults(func=bench_startup)
+
+    models = subparsers.add_parser("models", help="Per-call model lookup overhead")
+    models.add_argument("--model", default="gpt-4o-mini", help="Model to look up (default: gpt-4o-mini)")
+    models.add_argument("--calls", type=int, default=1000, help="Lookups per method (default: 1000)")
+    models.add_argument(
+        "--max-us",
+        type=float,
+        help="Fail if a registry lookup takes more than this many microseconds"
+    )
+    models.set_defaults(func=bench_models)
+
+    memory = subparsers.add_parser("memory", help="Resident memory of the loaded bonuses")
+    memory.add_argument(
+        "--data-dir",
+        type=Path,
+        default=ROOT / "data",
+        help="Data directory (default: data/)"
+    )
+    memory.add_argument("--term", default="Stravinsky", help="Term to search for (default: Stravinsky)")
+    memory.add_argument(
+        "--max-mb",
+        type=float,
+        help="Fail if the flat bonuses take more than this many MB of resident memory"
+    )
+    memory.set_defaults(func=bench_memory)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,11 +16,15 @@ TODO:
 
 import argparse
 import os
+import re
+import socket
+import subprocess
 import sys
+import time
+from collections import Counter
 from functools import partial
 from pathlib import Path
 
-import pandas as pd
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.table import Table
@@ -28,34 +32,250 @@ from rich.table import Table
 # Add src to path for development
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from anki_qb import (
-    Config,
-    set_config,
-    format_ygk_prompts,
-    ask_llm,
-    read_markdown,
-)
-from anki_qb.llm import get_qbr_data
-from anki_qb.prompts import PROMPT_FREQUENCY_FOCUSED, PROMPT_CHATGPT_SHORT, PROMPT_CHATGPT
+# Only lightweight modules are imported here so that --help and --list-categories
+# start quickly; pandas, llm and lxml are imported once generation starts.
+from anki_qb.config import Config, set_config
+from anki_qb.jobs import DEFAULT_LEASE_SECONDS, JobQueue, QueueUsage
+from anki_qb.tokens import DEFAULT_CONTEXT_FRACTION
 
 console = Console()
 
+# Seconds between checks of the job queue for new jobs or results
+QUEUE_POLL_SECONDS = 1.0
+
 
 def list_categories(data_dir: Path) -> list[str]:
     """List all available YGK categories."""
-    ygk_dir = data_dir / "ygk"
-    if not ygk_dir.exists():
-        return []
+    from anki_qb.snapshot import ygk_categories
+
+    return list(ygk_categories(data_dir / "ygk"))
+
+
+def parse_range(value: str) -> tuple[int, int]:
+    """Parse an inclusive integer range like "2-5", "2015-" or "3" for argparse."""
+    low, sep, high = value.partition("-")
+    try:
+        low = int(low) if low else None
+        high = (int(high) if high else None) if sep else low
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid range: {value!r} (expected e.g. 2-5)") from None
+    return low, high
+
 
-    categories = []
-    for html_file in sorted(ygk_dir.glob("*.html")):
-        # Extract category from filename
-        name = html_file.stem
-        if name.startswith("https___www_naqt_com_you_gotta_know_") and name.endswith("_html"):
-            category = name.replace("https___www_naqt_com_you_gotta_know_", "").replace("_html", "")
-            categories.append(category)
+def parse_duration(value: str) -> float:
+    """Parse a duration like "90" (seconds), "45m", "2h" or "1h30m" into seconds for argparse."""
+    units = {"h": 3600, "m": 60, "s": 1}
+    parts = re.fullmatch(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s?)?", value.strip())
+    if not value.strip() or parts is None:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value!r} (expected e.g. 90, 45m or 1h30m)")
+    return sum(float(amount) * unit for amount, unit in zip(parts.groups(), units.values()) if amount)
+
+
+def print_triage(decisions: list, verbose: bool = False) -> None:
+    """
+    Print the triage decisions of a run.
+
+    Args:
+        decisions: List of (category, topic number, label, TriageDecision) tuples
+        verbose: Whether to also list the topics generated as usual
+    """
+    from anki_qb.triage import DOWNTIER, FULL, SKIP
+
+    table = Table(title="Triage")
+    for column in ("Category", "Topic", "Decision", "Signals"):
+        table.add_column(column)
+    for category, i, label, decision in decisions:
+        if verbose or decision.action != FULL:
+            table.add_row(category, f"{i}. {label}", decision.action, decision.reason)
+    if table.row_count:
+        console.print(table)
+    counts = Counter(decision.action for *_, decision in decisions)
+    console.print(
+        f"Triage: {counts[FULL]} full, {counts[DOWNTIER]} down-tiered, {counts[SKIP]} skipped"
+    )
 
-    return categories
+
+def spawn_workers(count: int) -> list[subprocess.Popen]:
+    """Start local worker processes with this run's arguments (see --workers)."""
+    argv, skip = [], False
+    for arg in sys.argv[1:]:
+        if skip:
+            skip = False
+        elif arg == "--workers":
+            skip = True
+        elif not arg.startswith("--workers="):
+            argv.append(arg)
+    return [
+        subprocess.Popen([sys.executable, sys.argv[0], *argv, "--worker"]) for _ in range(count)
+    ]
+
+
+def run_worker(queue: JobQueue, generate, verbose: bool = False) -> int:
+    """
+    Generate flashcards for jobs from a queue until none are left.
+
+    Args:
+        queue: Job queue shared with the coordinator
+        generate: Function taking a Job and returning its flashcard rows and a dict of
+            metadata to store with them (see JobQueue.complete)
+        verbose: Whether to print each job's outcome
+
+    Returns:
+        Number of jobs completed
+    """
+    from anki_qb.budget import BudgetExceeded
+
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    while True:
+        job = queue.lease(name)
+        if job is None:
+            if queue.drained():
+                return completed
+            time.sleep(QUEUE_POLL_SECONDS)
+            continue
+        description = f"{job.category} topic {job.topic_number}"
+        try:
+            with queue.keep_alive(job, name):
+                rows, metadata = generate(job)
+        except BudgetExceeded as e:
+            # Hand the job back without using up an attempt; another worker may have budget left
+            queue.fail(job, name, str(e), retry=False)
+            console.print(f"[yellow]⚠ Worker {name}: {e}[/yellow]")
+            return completed
+        except Exception as e:
+            queue.fail(job, name, f"{type(e).__name__}: {e}")
+            if verbose:
+                console.print(
+                    f"    [yellow]{description}: Error (attempt {job.attempts}) - {e}[/yellow]"
+                )
+            continue
+        if queue.complete(job, name, rows, metadata):
+            completed += 1
+            if verbose:
+                console.print(f"    {description}: {len(rows)} flashcards")
+
+
+def run_coordinator(
+    queue: JobQueue,
+    categories: list[str],
+    snapshot,
+    writer,
+    num_workers: int = 0,
+    verbose: bool = False,
+) -> int:
+    """
+    Queue the unfinished topics of some categories and write the flashcards workers return.
+
+    Args:
+        queue: Job queue shared with the workers
+        categories: Categories to generate flashcards for
+        snapshot: YGKSnapshot with the categories' topics
+        writer: FlashcardWriter for the output directory
+        num_workers: Local worker processes to start once the jobs are queued; if they
+            all exit with jobs left, the run stops (with none, it waits for workers
+            started elsewhere)
+        verbose: Whether to list every topic's triage decision, not only the ones
+            skipped or down-tiered (if the workers run with --triage)
+
+    Returns:
+        Number of jobs that failed
+    """
+    # Topics still to be collected, and flashcards written, per category
+    pending, counts = {}, {}
+    # Triage decisions the workers sent back with their results
+    decisions = []
+    queue.start_run()
+    for category in categories:
+        if writer.is_finished(category):
+            console.print(f"[green]✓ {category}: already done[/green]")
+            continue
+        if category not in snapshot:
+            console.print(f"[yellow]⚠ Skipping {category}: file not found[/yellow]")
+            continue
+        done = writer.done_topics(category)
+        topic_numbers = [i for i in range(1, len(snapshot.items(category)) + 1) if i not in done]
+        queue.add(category, topic_numbers)
+        pending[category], counts[category] = set(topic_numbers), 0
+    # Lets workers exit once the queue is empty, even if there was nothing to queue
+    queue.mark_all_queued()
+    num_jobs = sum(len(topics) for topics in pending.values())
+    console.print(f"[bold]Queued {num_jobs} topics in {len(pending)} categories ({queue.path})[/bold]")
+
+    workers = spawn_workers(num_workers)
+    try:
+        failures = collect_results(queue, pending, counts, writer, workers, decisions)
+    finally:
+        for worker in workers:
+            worker.wait()
+    if decisions:
+        print_triage(sorted(decisions, key=lambda d: d[:2]), verbose=verbose)
+    if failures:
+        console.print(
+            f"[yellow]⚠ {len(failures)} topics failed; run again with --resume to retry them[/yellow]"
+        )
+    return len(failures)
+
+
+def collect_results(
+    queue: JobQueue, pending: dict, counts: dict, writer, workers: list, decisions: list
+) -> list:
+    """Write the flashcards of finished jobs until no topics are pending (see run_coordinator)."""
+    from anki_qb.triage import TriageDecision
+
+    failures = []
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console
+    ) as progress:
+        num_jobs = sum(len(topics) for topics in pending.values())
+        task = progress.add_task("[cyan]Collecting flashcards...", total=num_jobs)
+        while pending:
+            workers_running = not workers or any(worker.poll() is None for worker in workers)
+            for job, rows, metadata in queue.collect():
+                if job.topic_number not in pending.get(job.category, ()):
+                    continue
+                if "triage" in metadata:
+                    decision = TriageDecision(**metadata["triage"])
+                    decisions.append((job.category, job.topic_number, metadata["label"], decision))
+                writer.write(job.category, rows)
+                writer.mark_done(job.category, job.topic_number)
+                counts[job.category] += len(rows)
+                pending[job.category].discard(job.topic_number)
+                progress.advance(task)
+            for job, error in queue.failed():
+                if job.topic_number not in pending.get(job.category, ()):
+                    continue
+                failures.append((job, error))
+                console.print(
+                    f"[red]✗ {job.category} topic {job.topic_number}: failed after "
+                    f"{job.attempts} attempts - {error}[/red]"
+                )
+                pending[job.category].discard(job.topic_number)
+                progress.advance(task)
+
+            for category in [category for category, topics in pending.items() if not topics]:
+                del pending[category]
+                writer.finish(category)
+                if counts[category]:
+                    output_file = writer.output_path(category)
+                    console.print(
+                        f"[green]✓ {category}: {counts[category]} flashcards → {output_file}[/green]"
+                    )
+                else:
+                    console.print(f"[yellow]⚠ {category}: No flashcards generated[/yellow]")
+
+            if pending and not workers_running:
+                # Leave the remaining categories unfinished so --resume picks them up
+                remaining = sum(len(topics) for topics in pending.values())
+                console.print(f"[yellow]⚠ Workers exited with {remaining} topics left[/yellow]")
+                break
+            if pending:
+                time.sleep(QUEUE_POLL_SECONDS)
+    return failures
 
 
 def main():
@@ -93,23 +313,182 @@ Examples:
         default=Path("output"),
         help="Output directory for CSV files (default: output/)"
     )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "apkg"],
+        default="csv",
+        help="Output one CSV per category (default), or a single flashcards.apkg Anki package "
+             "with one deck per category, updating it in place if it already exists"
+    )
     parser.add_argument(
         "--model",
         default="gpt-4o-mini",
         help="LLM model to use (default: gpt-4o-mini)"
     )
+    parser.add_argument(
+        "--routes",
+        type=Path,
+        help="JSON file of per-category model routes with fallbacks (overrides --model "
+             "for flashcard generation; see anki_qb.routing.Router.from_file)"
+    )
     parser.add_argument(
         "--prompt",
         choices=["frequency", "short", "detailed"],
         default="frequency",
         help="Prompt style: frequency-focused (default), short, or detailed"
     )
+    parser.add_argument(
+        "--no-system-prompt",
+        action="store_true",
+        help="Send each prompt as a single message instead of sending the instructions as a "
+             "system prompt shared by all topics (for models without system prompt support)"
+    )
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        default=0,
+        help="Generate flashcards for several consecutive topics in one request, up to this "
+             "many estimated prompt tokens per request (default: one request per topic)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream LLM responses, saving each flashcard as soon as it arrives instead of "
+             "once its topic is done"
+    )
+    parser.add_argument(
+        "--structured",
+        action="store_true",
+        help="Ask models that support it for JSON matching a flashcard schema instead of a "
+             "Markdown table, falling back to the table for other models"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds to wait for each LLM response; with --stream, the flashcards received "
+             "so far are kept"
+    )
+    parser.add_argument(
+        "--difficulty",
+        type=parse_range,
+        help="Only use QBReader questions in this difficulty range, e.g. 2-5"
+    )
+    parser.add_argument(
+        "--year",
+        type=parse_range,
+        help="Only use QBReader questions from this year range, e.g. 2015-2024 or 2015-"
+    )
+    parser.add_argument(
+        "--qb-category",
+        action="append",
+        help="Only use QBReader questions from this category (e.g. Literature); repeatable"
+    )
+    parser.add_argument(
+        "--semantic",
+        type=int,
+        default=0,
+        metavar="K",
+        help="Also include the K tossups and K bonuses most similar in meaning to each topic, "
+             "using a local embedding index (built and cached on first use)"
+    )
+    parser.add_argument(
+        "--embedding-model",
+        default="sentence-transformers/all-MiniLM-L6-v2",
+        help="llm embedding model for --semantic (default: sentence-transformers/all-MiniLM-L6-v2, "
+             "from the llm-sentence-transformers plugin)"
+    )
+    parser.add_argument(
+        "--order",
+        choices=["article", "frequency", "related"],
+        help="Order topics as in the article, by how often they appear in QBReader, or by their "
+             "number of related questions (default: related with a budget limit, else article)"
+    )
+    parser.add_argument(
+        "--min-frequency",
+        type=int,
+        default=0,
+        help="Skip topics mentioned fewer than this many times in QBReader questions"
+    )
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        help="Before sending each topic, skip it if it has no support in the corpus and send "
+             "it with the short prompt (and --triage-model) if its support is weak"
+    )
+    parser.add_argument(
+        "--triage-model",
+        help="Cheaper model for the topics --triage down-tiers (default: the topic's usual model)"
+    )
+    parser.add_argument(
+        "--context-fraction",
+        type=float,
+        default=DEFAULT_CONTEXT_FRACTION,
+        help="Fraction of the model's context window a prompt may fill; related questions "
+             f"beyond it are dropped (default: {DEFAULT_CONTEXT_FRACTION})"
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Stop before a request would take the run past this many input plus output tokens"
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=float,
+        help="Stop before a request would take the run past this estimated cost in USD"
+    )
+    parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        help="Stop starting new requests when the next one would end after this much time, "
+             "e.g. 45m or 2h"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted or budget-limited run in the same output directory, "
+             "skipping topics and categories it already finished"
+    )
+    parser.add_argument(
+        "--queue",
+        type=Path,
+        help="Distribute topics through this SQLite job queue (on storage shared by all nodes): "
+             "with --category/--all, queue the topics and write the flashcards workers return"
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Generate flashcards for jobs from --queue until it is empty, using this "
+             "process's model, prompt and search options"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="With --queue, also start this many local worker processes"
+    )
+    parser.add_argument(
+        "--lease",
+        type=parse_duration,
+        default=DEFAULT_LEASE_SECONDS,
+        help="How long a worker's claim on a job lasts without renewal before the job is "
+             f"retried elsewhere, e.g. 90 or 5m (default: {DEFAULT_LEASE_SECONDS}s)"
+    )
     parser.add_argument(
         "--data-dir",
         type=Path,
         default=Path("data"),
         help="Data directory (default: data/)"
     )
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="Include every copy of duplicated tossups/bonuses in prompts instead of one per group"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write the QBReader search cache (data/cache/search.sqlite)"
+    )
     parser.add_argument(
         "--list-categories",
         action="store_true",
@@ -146,12 +525,41 @@ Examples:
         return 0
 
     # Validate arguments
-    if not args.category and not args.all:
+    if (args.worker or args.workers) and not args.queue:
+        parser.error("--worker and --workers require --queue")
+
+    if args.worker and args.workers:
+        parser.error("Cannot specify both --worker and --workers")
+
+    if not args.category and not args.all and not args.worker:
         parser.error("Either --category or --all must be specified")
 
     if args.category and args.all:
         parser.error("Cannot specify both --category and --all")
 
+    from anki_qb.budget import Budget, BudgetExceeded
+    from anki_qb.formatters import (
+        batch_topic_number, format_batch_prompt, format_topic_prompt, group_topics, split_batch_table
+    )
+    from anki_qb.answers import AnswerIndex
+    from anki_qb.cache import SearchCache, corpus_fingerprint
+    from anki_qb.corpus import load_bonuses, load_tossups
+    from anki_qb.embeddings import load_embedding_index
+    from anki_qb.frequency import load_term_frequencies
+    from anki_qb.llm import ask_llm, ask_llm_stream, ask_llm_structured, get_qbr_data, usage
+    from anki_qb.output import FlashcardWriter
+    from anki_qb.parsing import parse_ygk_page
+    from anki_qb.routing import Route, Router, ask_routed, ask_routed_stream
+    from anki_qb.search import MetadataIndex
+    from anki_qb.snapshot import load_snapshot
+    from anki_qb.prompts import PROMPT_FREQUENCY_FOCUSED, PROMPT_CHATGPT_SHORT, PROMPT_CHATGPT
+    from anki_qb.tokens import estimate_tokens
+    from anki_qb.triage import DOWNTIER, SKIP, TriagePolicy
+
+    # Limits on the whole run, counted from here
+    budget = Budget(usage, max_tokens=args.max_tokens, max_cost=args.max_cost, deadline=args.deadline)
+    order = args.order or ("related" if budget.limited else "article")
+
     # Select prompt template
     prompt_map = {
         "frequency": PROMPT_FREQUENCY_FOCUSED,
@@ -169,15 +577,12 @@ Examples:
         console.print("See data/README.md for instructions.")
         return 1
 
-    # Load QBReader data
-    console.print(f"[bold]Loading QBReader data from {config.data_dir}...[/bold]")
-    bonuses = pd.read_json(config.bonuses_path, lines=True)
-    tossups = pd.read_json(config.tossups_path, lines=True)
-    console.print(f"  Loaded {len(bonuses):,} bonuses and {len(tossups):,} tossups")
+    # All YGK articles, parsed once and cached until the HTML changes
+    snapshot = load_snapshot(config)
 
     # Determine categories to process
     if args.all:
-        categories = list_categories(config.data_dir)
+        categories = snapshot.categories
         if not categories:
             console.print("[red]No categories found![/red]")
             return 1
@@ -185,13 +590,207 @@ Examples:
     else:
         categories = [args.category]
 
-    # Create output directory
-    args.output.mkdir(parents=True, exist_ok=True)
+    # The coordinator of a distributed run only queues topics and collects results,
+    # so it doesn't need the QBReader data
+    queue = JobQueue(args.queue, lease_seconds=args.lease) if args.queue else None
+    if queue is not None and not args.worker:
+        args.output.mkdir(parents=True, exist_ok=True)
+        with FlashcardWriter(args.output, format=args.format, resume=args.resume) as writer:
+            num_failed = run_coordinator(
+                queue, categories, snapshot, writer, args.workers, verbose=args.verbose
+            )
+        if num_failed:
+            return 1
+        console.print("\n[bold green]✓ Done![/bold green]")
+        return 0
+
+    if args.worker:
+        # Workers record their usage in the queue, so the limits apply to all of them together
+        budget = Budget(
+            QueueUsage(queue),
+            max_tokens=args.max_tokens,
+            max_cost=args.max_cost,
+            deadline=args.deadline,
+            started=queue.run_started(),
+        )
+
+    # Load QBReader data
+    console.print(f"[bold]Loading QBReader data from {config.data_dir}...[/bold]")
+    dedup = not args.keep_duplicates
+    bonuses = load_bonuses(config, dedup=dedup)
+    tossups = load_tossups(config, dedup=dedup)
+    console.print(f"  Loaded {len(bonuses):,} bonuses and {len(tossups):,} tossups")
+
+    # Models to use per category
+    if args.routes:
+        router = Router.from_file(args.routes, default_model=args.model)
+    else:
+        router = Router(Route([args.model], timeout=args.timeout))
 
     # Process each category
-    get_qbr_data_fn = partial(get_qbr_data, bonuses_df=bonuses, tossups_df=tossups, model=args.model)
+    filters = {"difficulty": args.difficulty, "year": args.year, "category": args.qb_category}
+    cache = None
+    if not args.no_cache:
+        semantic = (args.semantic, args.embedding_model) if args.semantic else None
+        fingerprint = corpus_fingerprint(
+            config.bonuses_path, config.tossups_path, dedup=dedup, semantic=semantic, **filters
+        )
+        cache = SearchCache(config.search_cache_path, fingerprint)
+    # Corpus frequencies of every YGK topic, computed once and cached
+    term_frequencies = None
+    if args.prompt == "frequency" or order == "frequency" or args.min_frequency or args.triage:
+        console.print("[bold]Loading term frequencies...[/bold]")
+        term_frequencies = load_term_frequencies(
+            snapshot.categories, tossups, bonuses, config, snapshot=snapshot
+        )
 
-    with Progress(
+    # Embedding indexes for semantic retrieval, computed once and cached
+    bonuses_embeddings = tossups_embeddings = None
+    if args.semantic:
+        console.print(f"[bold]Loading embedding indexes ({args.embedding_model})...[/bold]")
+        bonuses_embeddings = load_embedding_index(
+            bonuses, config.bonuses_path, config, model=args.embedding_model
+        )
+        tossups_embeddings = load_embedding_index(
+            tossups, config.tossups_path, config, model=args.embedding_model
+        )
+
+    get_qbr_data_fn = partial(
+        get_qbr_data,
+        bonuses_df=bonuses,
+        tossups_df=tossups,
+        model=args.model,
+        cache=cache,
+        term_frequencies=term_frequencies,
+        filters=filters,
+        bonuses_index=MetadataIndex(bonuses),
+        tossups_index=MetadataIndex(tossups),
+        bonuses_embeddings=bonuses_embeddings,
+        tossups_embeddings=tossups_embeddings,
+        semantic_k=args.semantic,
+        bonuses_answers=AnswerIndex(bonuses),
+        tossups_answers=AnswerIndex(tossups),
+    )
+
+    # Ask the route's model(s) for a topic's or batch's flashcards, within the run's budget
+    def ask(prompt, system, description, route, on_row=None, batched=False):
+        if args.no_system_prompt and system:
+            prompt, system = f"{system}\n\n{prompt}", None
+        prompt_tokens = estimate_tokens(f"{system or ''}\n\n{prompt}", route.models[0])
+        budget.check(route.models[0], prompt_tokens)
+        if args.stream:
+            # Stream the response, persisting rows as soon as they are parsed and
+            # falling back to other models on errors or timeouts before the first row
+            ask_stream = (
+                partial(ask_llm_structured, batched=batched) if args.structured
+                else ask_llm_stream
+            )
+            flashcards_df, complete, used_model = ask_routed_stream(
+                prompt, route, ask_fn=partial(ask_stream, system=system), on_row=on_row
+            )
+            if args.verbose and not complete:
+                console.print(
+                    f"    [yellow]{description}: timed out, "
+                    f"keeping {len(flashcards_df)} flashcards[/yellow]"
+                )
+            if args.verbose and used_model != route.models[0]:
+                console.print(f"    {description}: used fallback model {used_model}")
+            return flashcards_df
+        # Ask LLM(s) to generate flashcards, falling back to other models
+        # on errors, timeouts, or responses without flashcards
+        if args.structured:
+            flashcards_df, used_model = ask_routed(
+                prompt,
+                route,
+                ask_fn=partial(ask_llm_structured, system=system, batched=batched),
+                parse=lambda result: result[0],
+            )
+        else:
+            flashcards_df, used_model = ask_routed(
+                prompt, route, ask_fn=partial(ask_llm, system=system)
+            )
+        if args.verbose and used_model != route.models[0]:
+            console.print(f"    {description}: used fallback model {used_model}")
+        return flashcards_df
+
+    # Skip or down-tier weakly supported topics before sending them (see anki_qb.triage)
+    triage = TriagePolicy() if args.triage else None
+    triage_decisions = []
+
+    def triage_topic(category, i, prompt, metadata, get_item):
+        frequency = None
+        if term_frequencies is not None:
+            frequency = term_frequencies.topic_frequency(metadata["article"], metadata["label"])
+        decision = triage.decide(metadata["num_related"], metadata["text_length"], frequency)
+        triage_decisions.append((category, i, metadata["label"], decision))
+        if decision.action == DOWNTIER:
+            prompt, metadata = format_topic_prompt(
+                get_item(),
+                PROMPT_CHATGPT_SHORT,
+                get_qbr_data_fn,
+                model=args.triage_model or args.model,
+                context_fraction=args.context_fraction,
+                split_system=True,
+            )
+        metadata["tier"] = decision.action
+        return decision, prompt, metadata
+
+    def topic_route(category, metadata):
+        route = router.route_for(category)
+        if metadata.get("tier") == DOWNTIER and args.triage_model:
+            return Route([args.triage_model], timeout=route.timeout)
+        return route
+
+    # Workers of a distributed run generate one queued topic at a time
+    if args.worker:
+        def generate_job(job):
+            num_records = len(usage.records)
+            try:
+                return generate_queued_topic(job)
+            finally:
+                queue.record_usage(usage.records[num_records:])
+
+        def generate_queued_topic(job):
+            data = snapshot.items(job.category)[job.topic_number - 1]
+            prompt, metadata = format_topic_prompt(
+                data,
+                prompt_template,
+                get_qbr_data_fn,
+                model=args.model,
+                context_fraction=args.context_fraction,
+                split_system=True,
+            )
+            # Sent back with the flashcards for the coordinator's triage summary
+            job_metadata = {"label": metadata["label"]}
+            if triage is not None:
+                decision, prompt, metadata = triage_topic(
+                    job.category, job.topic_number, prompt, metadata, lambda: data
+                )
+                job_metadata["triage"] = {"action": decision.action, "reason": decision.reason}
+                if decision.action == SKIP:
+                    return [], job_metadata
+            description = f"{job.category} topic {job.topic_number} ({metadata['label']})"
+            flashcards_df = ask(
+                prompt, metadata["system"], description, topic_route(job.category, metadata)
+            )
+            fields = {
+                "category": job.category,
+                "topic_name": metadata["label"],
+                "topic_number": job.topic_number,
+                "search_term": metadata["sanitized_term"],
+            }
+            return flashcards_df.assign(**fields).to_dict("records"), job_metadata
+
+        completed = run_worker(queue, generate_job, verbose=args.verbose)
+        console.print(f"[bold green]✓ Worker done: {completed} topics[/bold green]")
+        return 0
+
+    # Create output directory; flashcards are written on a background thread as
+    # topics finish, so LLM calls don't wait on disk and memory use stays flat
+    args.output.mkdir(parents=True, exist_ok=True)
+    writer = FlashcardWriter(args.output, format=args.format, resume=args.resume)
+
+    with writer, Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
@@ -204,66 +803,258 @@ Examples:
             total=len(categories)
         )
 
+        stopped = None
         for category in categories:
             html_path = config.html_path(category)
 
-            if not html_path.exists():
+            if writer.is_finished(category):
+                console.print(f"[green]✓ {category}: already done[/green]")
+                progress.advance(overall_task)
+                continue
+            try:
+                budget.check(args.model, 0)
+            except BudgetExceeded as e:
+                stopped = e
+                break
+
+            if category not in snapshot and not html_path.exists():
                 console.print(f"[yellow]⚠ Skipping {category}: file not found[/yellow]")
                 progress.advance(overall_task)
                 continue
 
-            # Generate prompts
+            # Generate prompts; the parsed topics are kept for triage to reformat
             try:
-                prompts_with_metadata = format_ygk_prompts(str(html_path), prompt_template, get_qbr_data_fn)
+                if category in snapshot:
+                    items = snapshot.items(category)
+                else:
+                    items = parse_ygk_page(str(html_path))
+                prompts_with_metadata = [
+                    format_topic_prompt(
+                        data,
+                        prompt_template,
+                        get_qbr_data_fn,
+                        model=args.model,
+                        context_fraction=args.context_fraction,
+                        split_system=True,
+                    )
+                    for data in items
+                ]
             except Exception as e:
                 console.print(f"[red]✗ Error parsing {category}: {e}[/red]")
                 progress.advance(overall_task)
                 continue
 
+            # Order and filter topics by how often they come up in the corpus
+            topics = list(enumerate(prompts_with_metadata, 1))
+            if term_frequencies is not None:
+                def frequency(topic):
+                    metadata = topic[1][1]
+                    return term_frequencies.topic_frequency(metadata["article"], metadata["label"])
+
+                if args.min_frequency:
+                    topics = [topic for topic in topics if frequency(topic) >= args.min_frequency]
+                if order == "frequency":
+                    topics.sort(key=frequency, reverse=True)
+            if order == "related":
+                topics.sort(key=lambda topic: topic[1][1]["num_related"], reverse=True)
+
+            # Skip topics whose flashcards an earlier run already wrote
+            done = writer.done_topics(category)
+            topics = [topic for topic in topics if topic[0] not in done]
+
+            if triage is not None:
+                triaged = []
+                for i, (prompt, metadata) in topics:
+                    decision, prompt, metadata = triage_topic(
+                        category, i, prompt, metadata, partial(items.__getitem__, i - 1)
+                    )
+                    if decision.action != SKIP:
+                        triaged.append((i, (prompt, metadata)))
+                topics = triaged
+
             # Generate flashcards for each topic
-            all_flashcards = []
+            num_flashcards = 0
             topic_task = progress.add_task(
                 f"[green]  {category}",
-                total=len(prompts_with_metadata)
+                total=len(topics)
             )
 
-            for i, (prompt, metadata) in enumerate(prompts_with_metadata, 1):
+            num_topics = len(prompts_with_metadata)
+
+            def topic_fields(i, metadata):
+                return {
+                    "category": category,
+                    "topic_name": metadata["label"],
+                    "topic_number": i,
+                    "search_term": metadata["sanitized_term"],
+                }
+
+            def generate_topic(i, prompt, metadata):
+                description = f"Topic {i}/{num_topics} ({metadata['label']})"
+                fields = topic_fields(i, metadata)
+                num_streamed = 0
+
+                def on_row(row):
+                    nonlocal num_streamed
+                    writer.write(category, [{**row, **fields}])
+                    num_streamed += 1
+
                 try:
-                    topic_label = metadata["label"]
-                    sanitized_term = metadata["sanitized_term"]
+                    packing = metadata["packing"]
+                    if args.verbose and packing and packing["truncated"]:
+                        console.print(
+                            f"    {description}: "
+                            f"prompt truncated to ~{packing['estimated_tokens']:,} tokens, dropped "
+                            f"{packing['tossups_dropped']} tossups and {packing['bonuses_dropped']} bonuses"
+                        )
 
-                    # Ask LLM to generate flashcards
-                    result = ask_llm(prompt, model=args.model)
+                    flashcards_df = ask(
+                        prompt,
+                        metadata["system"],
+                        description,
+                        topic_route(category, metadata),
+                        on_row=on_row,
+                    )
+                    if not args.stream:
+                        writer.write(category, flashcards_df.assign(**fields))
+                    writer.mark_done(category, i)
 
-                    # Parse the markdown table response
-                    flashcards_df = read_markdown(result)
-                    flashcards_df['category'] = category
-                    flashcards_df['topic_name'] = topic_label
-                    flashcards_df['topic_number'] = i
-                    flashcards_df['search_term'] = sanitized_term
-                    all_flashcards.append(flashcards_df)
+                    if args.verbose:
+                        console.print(f"    {description}: {len(flashcards_df)} flashcards")
+                    return len(flashcards_df)
 
+                except BudgetExceeded:
+                    raise
+                except Exception as e:
                     if args.verbose:
-                        console.print(f"    Topic {i}/{len(prompts_with_metadata)} ({topic_label}): {len(flashcards_df)} flashcards")
+                        console.print(f"    [yellow]{description}: Error - {e}[/yellow]")
+                    if num_streamed:
+                        # Keep the flashcards streamed before the error, as after a timeout,
+                        # so that --resume doesn't write them again
+                        writer.mark_done(category, i)
+                    return num_streamed
 
+            def generate_batch(batch):
+                # Several topics in one request; rows are matched back to their
+                # topic by the Topic column, and topics without any are retried alone
+                description = "Topics " + ", ".join(str(i) for i, _ in batch)
+                fields = {n: topic_fields(i, metadata) for n, (i, (_, metadata)) in enumerate(batch, 1)}
+                streamed = Counter()
+
+                def on_row(row):
+                    topic_key = next((key for key in row if key.strip().lower() == "topic"), None)
+                    n = batch_topic_number(row[topic_key]) if topic_key else None
+                    if n in fields:
+                        cells = {key: value for key, value in row.items() if key != topic_key}
+                        writer.write(category, [{**cells, **fields[n]}])
+                        streamed[n] += 1
+
+                try:
+                    batch_df = ask(
+                        format_batch_prompt([prompt for _, (prompt, _) in batch]),
+                        batch[0][1][1]["system"],
+                        description,
+                        topic_route(category, batch[0][1][1]),
+                        on_row=on_row,
+                        batched=True,
+                    )
+                    results = split_batch_table(batch_df, len(batch))
+                except BudgetExceeded:
+                    raise
                 except Exception as e:
                     if args.verbose:
-                        console.print(f"    [yellow]Topic {i}/{len(prompts_with_metadata)} ({topic_label}): Error - {e}[/yellow]")
+                        console.print(f"    [yellow]{description}: Error - {e}[/yellow]")
+                    results = {}
+
+                count = 0
+                for n, (i, (prompt, metadata)) in enumerate(batch, 1):
+                    if n not in results and streamed[n]:
+                        # The batch failed after this topic's flashcards were streamed; keep
+                        # them rather than retrying the topic and writing them twice
+                        writer.mark_done(category, i)
+                        count += streamed[n]
+                        continue
+                    if n not in results:
+                        count += generate_topic(i, prompt, metadata)
+                        continue
+                    if not args.stream:
+                        writer.write(category, results[n].assign(**fields[n]))
+                    writer.mark_done(category, i)
+                    count += len(results[n])
+                    if args.verbose:
+                        console.print(
+                            f"    Topic {i}/{num_topics} ({metadata['label']}): "
+                            f"{len(results[n])} flashcards (batched)"
+                        )
+                return count
 
-                progress.advance(topic_task)
+            # Group small topics into shared requests if requested; topics triage
+            # down-tiered use another prompt and model, so they are grouped separately
+            if args.batch_tokens:
+                batches = []
+                for tier in dict.fromkeys(metadata.get("tier") for _, (_, metadata) in topics):
+                    tier_topics = [topic for topic in topics if topic[1][1].get("tier") == tier]
+                    groups = group_topics(
+                        [prompt for _, (prompt, _) in tier_topics], args.batch_tokens, model=args.model
+                    )
+                    batches += [[tier_topics[j] for j in group] for group in groups]
+            else:
+                batches = [[topic] for topic in topics]
+
+            try:
+                for batch in batches:
+                    if len(batch) == 1:
+                        i, (prompt, metadata) = batch[0]
+                        num_flashcards += generate_topic(i, prompt, metadata)
+                    else:
+                        num_flashcards += generate_batch(batch)
+                    progress.advance(topic_task, len(batch))
+            except BudgetExceeded as e:
+                # Leave the category unfinished so --resume picks it up
+                stopped = e
+                console.print(f"[yellow]⚠ {category}: stopped after {num_flashcards} flashcards[/yellow]")
+                progress.remove_task(topic_task)
+                break
 
-            # Save flashcards for this category
-            if all_flashcards:
-                combined_df = pd.concat(all_flashcards, ignore_index=True)
-                output_file = args.output / f"flashcards_{category}.csv"
-                combined_df.to_csv(output_file, index=False)
-                console.print(f"[green]✓ {category}: {len(combined_df)} flashcards → {output_file}[/green]")
+            # Move this category's flashcards into place once the writer catches up
+            writer.finish(category)
+            if num_flashcards:
+                output_file = writer.output_path(category)
+                console.print(f"[green]✓ {category}: {num_flashcards} flashcards → {output_file}[/green]")
             else:
                 console.print(f"[yellow]⚠ {category}: No flashcards generated[/yellow]")
 
             progress.remove_task(topic_task)
             progress.advance(overall_task)
 
+    if args.format == "apkg" and any(writer.apkg_stats.values()):
+        stats = writer.apkg_stats
+        console.print(
+            f"[green]✓ {writer.output_path()}: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged[/green]"
+        )
+
+    if triage_decisions:
+        print_triage(triage_decisions, verbose=args.verbose)
+
+    if stopped is not None:
+        console.print(
+            f"[yellow]⚠ {stopped}. Flashcards so far are saved; run again with --resume "
+            f"to continue.[/yellow]"
+        )
+    if budget.limited:
+        spent = budget.spent()
+        console.print(
+            f"Spent: {spent['tokens']:,} tokens, ~${spent['cost']:.2f}, {spent['seconds']:,.0f}s"
+        )
+
+    totals = usage.summary()
+    if totals["requests"]:
+        console.print(
+            f"Tokens: {totals['input_tokens']:,} input ({totals['cache_hit_rate']:.0%} cached), "
+            f"{totals['output_tokens']:,} output over {totals['requests']:,} requests"
+        )
+
     console.print("\n[bold green]✓ Done![/bold green]")
     return 0
 
@@ -2,27 +2,66 @@
 
 __version__ = "0.1.0"
 
-from anki_qb.config import Config, get_config, set_config
-from anki_qb.parsing import parse_ygk_page, parse_ygk_page_dl, parse_ygk_page_ul, ygk_path
-from anki_qb.search import search_bonuses, search_tossups
-from anki_qb.formatters import format_qa, format_ygk_prompt, format_ygk_prompts, read_markdown
-from anki_qb.llm import ask_llm, sanitize_term, get_qbr_data
-
-__all__ = [
-    "Config",
-    "get_config",
-    "set_config",
-    "parse_ygk_page",
-    "parse_ygk_page_dl",
-    "parse_ygk_page_ul",
-    "ygk_path",
-    "search_bonuses",
-    "search_tossups",
-    "format_qa",
-    "format_ygk_prompt",
-    "format_ygk_prompts",
-    "read_markdown",
-    "ask_llm",
-    "sanitize_term",
-    "get_qbr_data",
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# Public API, mapped to the module defining each name. Modules are imported on first
+# attribute access so that importing anki_qb doesn't pull in pandas, llm and lxml.
+_EXPORTS = {
+    "Config": "anki_qb.config",
+    "get_config": "anki_qb.config",
+    "set_config": "anki_qb.config",
+    "load_bonuses": "anki_qb.corpus",
+    "load_tossups": "anki_qb.corpus",
+    "YGKItem": "anki_qb.parsing",
+    "parse_ygk_page": "anki_qb.parsing",
+    "parse_ygk_page_dl": "anki_qb.parsing",
+    "parse_ygk_page_ul": "anki_qb.parsing",
+    "ygk_path": "anki_qb.parsing",
+    "YGKSnapshot": "anki_qb.snapshot",
+    "load_snapshot": "anki_qb.snapshot",
+    "search_answers": "anki_qb.search",
+    "search_bonuses": "anki_qb.search",
+    "search_tossups": "anki_qb.search",
+    "AnswerIndex": "anki_qb.answers",
+    "parse_answer_line": "anki_qb.answers",
+    "format_qa": "anki_qb.formatters",
+    "format_ygk_prompt": "anki_qb.formatters",
+    "format_ygk_prompts": "anki_qb.formatters",
+    "read_markdown": "anki_qb.formatters",
+    "ask_llm": "anki_qb.llm",
+    "ask_llm_async": "anki_qb.llm",
+    "sanitize_term": "anki_qb.llm",
+    "sanitize_term_async": "anki_qb.llm",
+    "get_qbr_data": "anki_qb.llm",
+    "get_qbr_data_async": "anki_qb.llm",
+    "MarkdownTableParser": "anki_qb.tables",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from anki_qb.config import Config, get_config, set_config
+    from anki_qb.corpus import load_bonuses, load_tossups
+    from anki_qb.parsing import YGKItem, parse_ygk_page, parse_ygk_page_dl, parse_ygk_page_ul, ygk_path
+    from anki_qb.snapshot import YGKSnapshot, load_snapshot
+    from anki_qb.search import search_answers, search_bonuses, search_tossups
+    from anki_qb.answers import AnswerIndex, parse_answer_line
+    from anki_qb.formatters import format_qa, format_ygk_prompt, format_ygk_prompts, read_markdown
+    from anki_qb.llm import (
+        ask_llm, ask_llm_async, sanitize_term, sanitize_term_async, get_qbr_data, get_qbr_data_async
+    )
+    from anki_qb.tables import MarkdownTableParser
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,201 @@
+"""Parsing of QBReader answer lines into normalized primary and accepted answers."""
+
+import functools
+import re
+import unicodedata
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from anki_qb.text_utils import normalize_text
+
+# Separator between answers in the answer_accept/answers_accept columns (never in a normalized answer)
+ANSWER_SEPARATOR = "|"
+
+# Bracketed or parenthesized directives, e.g. "[accept Wright; prompt on Richard]"
+_DIRECTIVES = re.compile(r"\[([^\]]*)\]|\(([^)]*)\)")
+
+# Editor tags, e.g. "<JB, Literature>"
+_EDITOR_TAGS = re.compile(r"<[^>]*>")
+
+# Start of a directive clause whose answers are accepted
+_ACCEPT_PREFIX = re.compile(r"\s*(?:also accept|anti-?prompt on|accept|or)\s+", re.IGNORECASE)
+
+# Separators between answers within an accept clause
+_ALTERNATE_SEPARATORS = re.compile(r",|\bor\b")
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_ARTICLES = ("the ", "a ", "an ")
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Normalize an answer so that spellings of the same answer compare equal.
+
+    Applies normalize_text, then strips accents, lowercases, replaces punctuation
+    with spaces and drops a leading article.
+
+    Args:
+        text: Answer text
+
+    Returns:
+        Normalized answer (empty if text isn't a string)
+    """
+    if not isinstance(text, str):
+        return ""
+    text = normalize_text(text)
+    if not text.isascii():
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    text = " ".join(_NON_WORD.sub(" ", text.lower()).split())
+    for article in _ARTICLES:
+        if text.startswith(article):
+            return text[len(article):]
+    return text
+
+
+def parse_answer_line(line: str) -> tuple[str, list[str]]:
+    """
+    Split a QBReader answer line into its primary answer and accepted alternates.
+
+    Alternates come from bracketed or parenthesized "or"/"accept" clauses. Prompt
+    and reject clauses, pronunciation guides and editor tags are dropped.
+
+    Example:
+        >>> parse_answer_line("Richard Wright [accept Wright; prompt on Richard]")
+        ('Richard Wright', ['Wright'])
+
+    Args:
+        line: Answer line, e.g. a tossup's answer_sanitized
+
+    Returns:
+        Tuple of (primary answer, list of alternates), not normalized
+    """
+    if not isinstance(line, str):
+        return "", []
+    line = _EDITOR_TAGS.sub(" ", line)
+    alternates = []
+    for match in _DIRECTIVES.finditer(line):
+        for clause in (match.group(1) or match.group(2) or "").split(";"):
+            prefix = _ACCEPT_PREFIX.match(clause)
+            if prefix is None:
+                continue
+            for alternate in _ALTERNATE_SEPARATORS.split(clause[prefix.end():]):
+                alternate = alternate.strip().strip('"')
+                if alternate and alternate not in alternates:
+                    alternates.append(alternate)
+    primary = " ".join(_DIRECTIVES.sub(" ", line).split()).strip(" .,;:")
+    if primary.upper().startswith("ANSWER:"):
+        primary = primary[len("ANSWER:"):].strip()
+    return primary, alternates
+
+
+@functools.lru_cache(maxsize=65536)
+def _normalized_answers(line: str) -> tuple[str, tuple[str, ...]]:
+    """Normalized primary answer and all accepted answers (primary first) of an answer line."""
+    primary, alternates = parse_answer_line(line)
+    primary = normalize_answer(primary)
+    accepted = [primary] if primary else []
+    for answer in map(normalize_answer, alternates):
+        if answer and answer not in accepted:
+            accepted.append(answer)
+    return primary, tuple(accepted)
+
+
+def add_answer_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add normalized answer columns parsed from the answer lines.
+
+    Tossups get answer_primary (the normalized primary answer) and answer_accept
+    (every accepted answer, primary first, joined by ANSWER_SEPARATOR). Bonuses
+    get answers_primary and answers_accept likewise, over all of their parts.
+    Identical answer lines, which are common across mirrored sets, are parsed once.
+
+    Args:
+        df: Tossup DataFrame with answer_sanitized, or bonus DataFrame with answers_sanitized
+
+    Returns:
+        The DataFrame with the columns added
+    """
+    if "answer_sanitized" in df.columns:
+        parsed = [
+            _normalized_answers(line) if isinstance(line, str) else ("", ())
+            for line in df["answer_sanitized"]
+        ]
+        df["answer_primary"] = [primary for primary, _ in parsed]
+        df["answer_accept"] = [ANSWER_SEPARATOR.join(accepted) for _, accepted in parsed]
+    elif "answers_sanitized" in df.columns:
+        primaries, accepts = [], []
+        for lines in df["answers_sanitized"]:
+            parsed = [
+                _normalized_answers(line)
+                for line in (lines if isinstance(lines, (list, tuple)) else [])
+                if isinstance(line, str)
+            ]
+            primaries.append(ANSWER_SEPARATOR.join(primary for primary, _ in parsed if primary))
+            accepts.append(ANSWER_SEPARATOR.join(a for _, accepted in parsed for a in accepted))
+        df["answers_primary"] = primaries
+        df["answers_accept"] = accepts
+    return df
+
+
+class AnswerIndex:
+    """
+    Hash index from normalized answers to the rows of a tossup or bonus DataFrame.
+
+    Finding the questions whose answer is exactly a topic is a dictionary lookup
+    instead of a scan of the answer lines. Build it once after loading (see
+    anki_qb.corpus, which adds the answer columns) and pass it to the search functions.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index.
+
+        Args:
+            df: Tossup or bonus DataFrame; answer columns are added first if missing
+        """
+        if not {"answer_accept", "answers_accept"} & set(df.columns):
+            df = add_answer_columns(df.copy())
+        prefix = "answer" if "answer_accept" in df.columns else "answers"
+        self.size = len(df)
+        self.primary = self._build(df[f"{prefix}_primary"])
+        self.accepted = self._build(df[f"{prefix}_accept"])
+
+    @staticmethod
+    def _build(column: pd.Series) -> dict[str, np.ndarray]:
+        positions = {}
+        for position, answers in enumerate(column):
+            if not answers:
+                continue
+            for answer in answers.split(ANSWER_SEPARATOR):
+                rows = positions.setdefault(answer, [])
+                if not rows or rows[-1] != position:
+                    rows.append(position)
+        return {answer: np.array(rows, dtype=np.int32) for answer, rows in positions.items()}
+
+    def lookup(self, answer: str, alternates: bool = True) -> np.ndarray:
+        """
+        Find the rows with an answer.
+
+        Args:
+            answer: Answer to look up (normalized with normalize_answer)
+            alternates: Whether to also match accepted alternates, not just primary answers
+
+        Returns:
+            Sorted array of row positions (possibly empty)
+        """
+        index = self.accepted if alternates else self.primary
+        return index.get(normalize_answer(answer), np.zeros(0, dtype=np.int32))
+
+    def count(self, answer: str, alternates: bool = True) -> int:
+        """Number of rows with an answer (see lookup)."""
+        return len(self.lookup(answer, alternates=alternates))
+
+
+def accepted_answers(df: pd.DataFrame) -> Optional[pd.Series]:
+    """Get the answer_accept/answers_accept column of a DataFrame, or None if it has neither."""
+    for column in ("answer_accept", "answers_accept"):
+        if column in df.columns:
+            return df[column]
+    return None
@@ -0,0 +1,338 @@
+"""Export flashcards directly to Anki package (.apkg) files."""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+# Stable ids so that re-exports update the same note type instead of creating new ones
+MODEL_ID = 1729384756
+MODEL_NAME = "Anki QB"
+MODEL_FIELDS = ["Question", "Answer", "Difficulty", "Topic", "Category"]
+
+DEFAULT_DECK_PREFIX = "Quiz Bowl"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS col (
+    id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null,
+    usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null, tags text not null
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null,
+    flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null,
+    type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null
+);
+CREATE TABLE IF NOT EXISTS revlog (
+    id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null
+);
+CREATE TABLE IF NOT EXISTS graves (
+    usn integer not null, oid integer not null, type integer not null
+);
+CREATE INDEX IF NOT EXISTS ix_notes_usn on notes (usn);
+CREATE INDEX IF NOT EXISTS ix_cards_usn on cards (usn);
+CREATE INDEX IF NOT EXISTS ix_revlog_usn on revlog (usn);
+CREATE INDEX IF NOT EXISTS ix_cards_nid on cards (nid);
+CREATE INDEX IF NOT EXISTS ix_cards_sched on cards (did, queue, due);
+CREATE INDEX IF NOT EXISTS ix_revlog_cid on revlog (cid);
+CREATE INDEX IF NOT EXISTS ix_notes_csum on notes (csum);
+"""
+
+_COLLECTION_CONF = {
+    "activeDecks": [1],
+    "curDeck": 1,
+    "newSpread": 0,
+    "collapseTime": 1200,
+    "timeLim": 0,
+    "estTimes": True,
+    "dueCounts": True,
+    "curModel": None,
+    "nextPos": 1,
+    "sortType": "noteFld",
+    "sortBackwards": False,
+    "addToCur": True,
+}
+
+_DECK_CONF = {
+    "1": {
+        "id": 1,
+        "name": "Default",
+        "autoplay": True,
+        "lapse": {"delays": [10], "leechAction": 0, "leechFails": 8, "minInt": 1, "mult": 0},
+        "maxTaken": 60,
+        "mod": 0,
+        "new": {
+            "bury": True,
+            "delays": [1, 10],
+            "initialFactor": 2500,
+            "ints": [1, 4, 7],
+            "order": 1,
+            "perDay": 20,
+            "separate": True,
+        },
+        "replayq": True,
+        "rev": {
+            "bury": True,
+            "ease4": 1.3,
+            "fuzz": 0.05,
+            "ivlFct": 1,
+            "maxIvl": 36500,
+            "minSpace": 1,
+            "perDay": 100,
+        },
+        "timer": 0,
+        "usn": 0,
+    }
+}
+
+_CSS = """.card {
+    font-family: arial;
+    font-size: 20px;
+    text-align: center;
+    color: black;
+    background-color: white;
+}
+"""
+
+
+def note_guid(category: str, topic: str, question: str) -> str:
+    """
+    Get a stable note GUID for a flashcard.
+
+    Args:
+        category: YGK category
+        topic: Topic name within the category
+        question: Flashcard question
+
+    Returns:
+        GUID string that is the same every time the same card is exported
+    """
+    key = "\x1f".join([category, topic, question])
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _stable_id(name: str) -> int:
+    """Derive a stable positive 52-bit id from a name."""
+    return int(hashlib.sha1(name.encode()).hexdigest()[:13], 16)
+
+
+def _field_checksum(text: str) -> int:
+    return int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+def _deck(deck_id: int, name: str, now: int) -> dict:
+    return {
+        "id": deck_id,
+        "name": name,
+        "desc": "",
+        "conf": 1,
+        "dyn": 0,
+        "collapsed": False,
+        "browserCollapsed": False,
+        "extendNew": 10,
+        "extendRev": 50,
+        "newToday": [0, 0],
+        "revToday": [0, 0],
+        "lrnToday": [0, 0],
+        "timeToday": [0, 0],
+        "mod": now,
+        "usn": -1,
+    }
+
+
+def _model(deck_id: int, now: int) -> dict:
+    fields = [
+        {"name": name, "ord": i, "font": "Arial", "media": [], "rtl": False, "size": 20, "sticky": False}
+        for i, name in enumerate(MODEL_FIELDS)
+    ]
+    return {
+        "id": MODEL_ID,
+        "name": MODEL_NAME,
+        "type": 0,
+        "mod": now,
+        "usn": -1,
+        "sortf": 0,
+        "did": deck_id,
+        "flds": fields,
+        "tmpls": [{
+            "name": "Card 1",
+            "ord": 0,
+            "qfmt": "{{Question}}",
+            "afmt": "{{FrontSide}}<hr id=answer>{{Answer}}",
+            "bqfmt": "",
+            "bafmt": "",
+            "did": None,
+        }],
+        "req": [[0, "any", [0]]],
+        "css": _CSS,
+        "latexPre": (
+            "\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n"
+            "\\usepackage[utf8]{inputenc}\n\\usepackage{amssymb,amsmath}\n"
+            "\\pagestyle{empty}\n\\setlength{\\parindent}{0in}\n\\begin{document}\n"
+        ),
+        "latexPost": "\\end{document}",
+        "tags": [],
+        "vers": [],
+    }
+
+
+def _init_collection(conn: sqlite3.Connection, now: int) -> None:
+    conn.executescript(_SCHEMA)
+    if conn.execute("SELECT COUNT(*) FROM col").fetchone()[0]:
+        return
+    conn.execute(
+        "INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, '{}')",
+        (
+            now,
+            now * 1000,
+            now * 1000,
+            json.dumps(_COLLECTION_CONF),
+            json.dumps({}),
+            json.dumps({"1": _deck(1, "Default", now)}),
+            json.dumps(_DECK_CONF),
+        ),
+    )
+
+
+def _format_difficulty(value) -> str:
+    """Format a Difficulty cell, with "" for a missing one (empty, None, NaN or "nan")."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    value = str(value).strip()
+    if value.lower() in ("nan", "none"):
+        return ""
+    # Whole numbers from a float column (e.g. "2.0" when some cards have no difficulty)
+    with contextlib.suppress(ValueError):
+        number = float(value)
+        if number.is_integer():
+            return str(int(number))
+    return value
+
+
+def export_apkg(
+    path,
+    flashcards: pd.DataFrame,
+    deck_prefix: str = DEFAULT_DECK_PREFIX,
+) -> dict[str, int]:
+    """
+    Write flashcards to an Anki package, with one deck per category.
+
+    If the package already exists it is updated in place: notes are matched by
+    their GUID (see note_guid), changed notes are updated, new notes are added,
+    and unchanged notes are left untouched so Anki's import skips them. All
+    writes happen in a single SQLite transaction.
+
+    Args:
+        path: Path to the .apkg file
+        flashcards: DataFrame with Question, Answer, category and topic_name columns,
+            and optionally Difficulty
+        deck_prefix: Parent deck name; decks are named "<deck_prefix>::<category>"
+
+    Returns:
+        Dictionary with the number of notes added, updated and unchanged
+    """
+    path = Path(path)
+    now = int(time.time())
+    stats = {"added": 0, "updated": 0, "unchanged": 0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "collection.anki2"
+        if path.exists():
+            with zipfile.ZipFile(path) as zf:
+                db_path.write_bytes(zf.read("collection.anki2"))
+
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                _init_collection(conn, now)
+                models_json, decks_json = conn.execute("SELECT models, decks FROM col").fetchone()
+                models, decks = json.loads(models_json), json.loads(decks_json)
+                existing = {
+                    guid: (nid, flds, tags)
+                    for nid, guid, flds, tags in conn.execute("SELECT id, guid, flds, tags FROM notes")
+                }
+                next_id = max(
+                    now * 1000,
+                    conn.execute("SELECT COALESCE(MAX(id), 0) FROM notes").fetchone()[0] + 1,
+                    conn.execute("SELECT COALESCE(MAX(id), 0) FROM cards").fetchone()[0] + 1,
+                )
+                due = conn.execute("SELECT COALESCE(MAX(due), 0) FROM cards").fetchone()[0]
+
+                for category, group in flashcards.groupby("category", sort=False):
+                    deck_name = f"{deck_prefix}::{category}" if deck_prefix else str(category)
+                    deck_id = _stable_id(deck_name)
+                    decks.setdefault(str(deck_id), _deck(deck_id, deck_name, now))
+                    models.setdefault(str(MODEL_ID), _model(deck_id, now))
+
+                    for row in group.to_dict("records"):
+                        question = str(row.get("Question", ""))
+                        topic = str(row.get("topic_name", ""))
+                        difficulty = _format_difficulty(row.get("Difficulty"))
+                        fields = [question, str(row.get("Answer", "")), difficulty, topic, str(category)]
+                        flds = "\x1f".join(fields)
+                        tags = f" ygk {category}" + (f" difficulty::{difficulty}" if difficulty else "") + " "
+                        guid = note_guid(str(category), topic, question)
+
+                        if guid in existing:
+                            nid, old_flds, old_tags = existing[guid]
+                            if (old_flds, old_tags) == (flds, tags):
+                                stats["unchanged"] += 1
+                                continue
+                            conn.execute(
+                                "UPDATE notes SET mod = ?, usn = -1, tags = ?, flds = ?, sfld = ?, csum = ? "
+                                "WHERE id = ?",
+                                (now, tags, flds, question, _field_checksum(question), nid),
+                            )
+                            existing[guid] = (nid, flds, tags)
+                            stats["updated"] += 1
+                            continue
+
+                        nid, cid = next_id, next_id + 1
+                        next_id += 2
+                        due += 1
+                        conn.execute(
+                            "INSERT INTO notes VALUES (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')",
+                            (nid, guid, MODEL_ID, now, tags, flds, question, _field_checksum(question)),
+                        )
+                        conn.execute(
+                            "INSERT INTO cards VALUES (?, ?, ?, 0, ?, -1, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+                            (cid, nid, deck_id, now, due),
+                        )
+                        existing[guid] = (nid, flds, tags)
+                        stats["added"] += 1
+
+                conn.execute(
+                    "UPDATE col SET mod = ?, models = ?, decks = ?",
+                    (now * 1000, json.dumps(models), json.dumps(decks)),
+                )
+        finally:
+            conn.close()
+
+        # Write the new package next to the old one, then swap it in atomically
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_apkg = path.with_name(path.name + ".tmp")
+        with zipfile.ZipFile(tmp_apkg, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.write(db_path, "collection.anki2")
+            zf.writestr("media", "{}")
+        os.replace(tmp_apkg, path)
+
+    return stats
@@ -0,0 +1,115 @@
+"""Token, cost and time limits for generation runs."""
+
+import time
+from typing import Optional
+
+from anki_qb.tokens import estimate_cost
+
+# Expected response size before any responses have been seen
+DEFAULT_OUTPUT_TOKENS = 1500
+
+
+class BudgetExceeded(Exception):
+    """Raised when a request would take a run past one of its limits."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Budget reached: {reason}")
+        self.reason = reason
+
+
+class Budget:
+    """
+    Limits on the tokens, cost and wall-clock time of a run.
+
+    Spending is read from a UsageTracker (see anki_qb.llm.usage), counting only the
+    requests recorded after the budget was created. Before each request, check()
+    estimates what it will add (its prompt tokens, plus the average response size
+    and request duration seen so far) and refuses it if that would pass a limit.
+
+    Example:
+        budget = Budget(usage, max_tokens=2_000_000, max_cost=5.0, deadline=3600)
+        budget.check("gpt-4o-mini", estimate_tokens(prompt, "gpt-4o-mini"))
+        ask_llm(prompt)
+    """
+
+    def __init__(
+        self,
+        tracker,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        deadline: Optional[float] = None,
+        started: Optional[float] = None,
+    ):
+        """
+        Start the budget.
+
+        Args:
+            tracker: UsageTracker that the run's requests are recorded in
+            max_tokens: Maximum input plus output tokens, or None for no limit
+            max_cost: Maximum estimated cost in USD (see anki_qb.tokens.estimate_cost),
+                or None for no limit
+            deadline: Maximum number of seconds from the start, or None for no limit
+            started: Time (as from time.time()) a run shared by several processes
+                started, with tracker holding only the run's requests (see
+                anki_qb.jobs.QueueUsage); by default the run starts now
+        """
+        self.tracker = tracker
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.deadline = deadline
+        self.start = started if started is not None else time.time()
+        self._first_record = len(tracker.records) if started is None else 0
+
+    @property
+    def limited(self) -> bool:
+        """Whether any limit is set."""
+        return any(limit is not None for limit in (self.max_tokens, self.max_cost, self.deadline))
+
+    def _records(self) -> list[dict]:
+        return self.tracker.records[self._first_record:]
+
+    def spent(self) -> dict:
+        """
+        Get what the run has used so far.
+
+        Returns:
+            Dictionary with requests, tokens, cost (USD) and seconds
+        """
+        records = self._records()
+        return {
+            "requests": len(records),
+            "tokens": sum((r["input_tokens"] or 0) + (r["output_tokens"] or 0) for r in records),
+            "cost": sum(
+                estimate_cost(r["model"], r["input_tokens"] or 0, r["output_tokens"] or 0)
+                for r in records
+            ),
+            "seconds": time.time() - self.start,
+        }
+
+    def check(self, model: str, prompt_tokens: int) -> None:
+        """
+        Check that a request fits in what is left of the budget.
+
+        Args:
+            model: Model the request will be sent to
+            prompt_tokens: Estimated prompt size (see anki_qb.tokens.estimate_tokens)
+
+        Raises:
+            BudgetExceeded: If the request would pass a limit
+        """
+        if not self.limited:
+            return
+        spent = self.spent()
+        outputs = [r["output_tokens"] for r in self._records() if r["output_tokens"] is not None]
+        output_tokens = sum(outputs) / len(outputs) if outputs else DEFAULT_OUTPUT_TOKENS
+
+        if self.deadline is not None:
+            seconds_per_request = spent["seconds"] / spent["requests"] if spent["requests"] else 0
+            if spent["seconds"] + seconds_per_request > self.deadline:
+                raise BudgetExceeded(f"deadline of {self.deadline:,.0f}s")
+        if self.max_tokens is not None:
+            if spent["tokens"] + prompt_tokens + output_tokens > self.max_tokens:
+                raise BudgetExceeded(f"{self.max_tokens:,} tokens")
+        if self.max_cost is not None:
+            if spent["cost"] + estimate_cost(model, prompt_tokens, output_tokens) > self.max_cost:
+                raise BudgetExceeded(f"${self.max_cost:,.2f}")
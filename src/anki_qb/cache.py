@@ -0,0 +1,157 @@
+"""Persistent cache of QBReader search results shared across prompts and models."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Bump when the cached search results or formatting change
+CACHE_VERSION = 3
+
+
+def corpus_fingerprint(*paths, **options) -> str:
+    """
+    Fingerprint corpus files from their names, sizes and modification times.
+
+    Args:
+        *paths: Paths to the corpus files (e.g. bonuses.json and tossups.json)
+        **options: Settings that change search results (e.g. dedup=True)
+
+    Returns:
+        Short hex digest that changes whenever any of the files change
+    """
+    digest = hashlib.sha1(f"v{CACHE_VERSION}".encode())
+    for path in paths:
+        path = Path(path)
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    for name, value in sorted(options.items()):
+        digest.update(f"{name}={value!r}".encode())
+    return digest.hexdigest()[:16]
+
+
+def remove_stale(path, prefix: str) -> None:
+    """
+    Delete earlier versions of a fingerprinted cache file.
+
+    Args:
+        path: Path of the current file, named <prefix><fingerprint><suffix>
+            (see corpus_fingerprint)
+        prefix: Part of the file name before the fingerprint
+    """
+    path = Path(path)
+    fingerprint = path.name[len(prefix):-len(path.suffix) or None]
+    for stale in path.parent.glob(prefix + "?" * len(fingerprint) + path.suffix):
+        if stale != path:
+            try:
+                stale.unlink()
+            except OSError:
+                # Another process may have removed it first, or still hold it open on Windows
+                pass
+
+
+class SearchCache:
+    """
+    SQLite-backed cache mapping (search key, corpus fingerprint) to search results.
+
+    Search results are the matched row ids and formatted questions for tossups and
+    bonuses (see get_qbr_data), so they can be reused by any prompt style or model.
+    The cache also keeps the LLM-sanitized search term for each (label, model), which
+    doesn't depend on the corpus and so is kept across fingerprints.
+    Safe to share across threads.
+    """
+
+    def __init__(self, path, fingerprint: str):
+        """
+        Open (or create) a search cache.
+
+        Args:
+            path: Path to the SQLite database file
+            fingerprint: Corpus fingerprint (see corpus_fingerprint); entries cached
+                for other fingerprints are ignored
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search ("
+                "key TEXT NOT NULL, fingerprint TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (key, fingerprint))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS terms ("
+                "label TEXT NOT NULL, model TEXT NOT NULL, term TEXT NOT NULL, "
+                "PRIMARY KEY (label, model))"
+            )
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up cached search results.
+
+        Args:
+            key: Search key (the sanitized term, plus the semantic query when there is one)
+
+        Returns:
+            Cached results, or None if not cached for this corpus
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM search WHERE key = ? AND fingerprint = ?",
+                (key, self.fingerprint),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, data: dict) -> None:
+        """
+        Store search results.
+
+        Args:
+            key: Search key (the sanitized term, plus the semantic query when there is one)
+            data: JSON-serializable search results
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search (key, fingerprint, data) VALUES (?, ?, ?)",
+                (key, self.fingerprint, json.dumps(data)),
+            )
+
+    def get_term(self, label: str, model: str) -> Optional[str]:
+        """
+        Look up a sanitized search term.
+
+        Args:
+            label: Original topic label
+            model: Name of the model that sanitized it
+
+        Returns:
+            Sanitized term, or None if not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT term FROM terms WHERE label = ? AND model = ?", (label, model)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_term(self, label: str, model: str, term: str) -> None:
+        """
+        Store a sanitized search term.
+
+        Args:
+            label: Original topic label
+            model: Name of the model that sanitized it
+            term: Sanitized term
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO terms (label, model, term) VALUES (?, ?, ?)",
+                (label, model, term),
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
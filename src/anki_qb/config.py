@@ -35,6 +35,26 @@ class Config:
         """Path to tossups.json file."""
         return self.data_dir / "qbreader" / "tossups.json"
 
+    @property
+    def ygk_dir(self) -> Path:
+        """Directory with the YGK article HTML files."""
+        return self.data_dir / "ygk"
+
+    @property
+    def cache_dir(self) -> Path:
+        """Directory for precomputed data derived from the data files."""
+        return self.data_dir / "cache"
+
+    @property
+    def search_cache_path(self) -> Path:
+        """Path to the QBReader search cache database."""
+        return self.cache_dir / "search.sqlite"
+
+    @property
+    def ygk_snapshot_path(self) -> Path:
+        """Path to the precompiled snapshot of all YGK articles."""
+        return self.cache_dir / "ygk_snapshot.json.gz"
+
     def html_path(self, category: str) -> Path:
         """
         Get path to HTML file for a given category.
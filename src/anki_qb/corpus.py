@@ -0,0 +1,172 @@
+"""Loading the QBReader corpus together with precomputed per-question data."""
+
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from anki_qb.answers import add_answer_columns
+from anki_qb.cache import corpus_fingerprint, remove_stale
+from anki_qb.config import Config, get_config
+from anki_qb.dedup import assign_clusters
+from anki_qb.ragged import flatten_lists
+
+# Bonus columns holding one string per part
+BONUS_LIST_COLUMNS = ("parts_sanitized", "answers_sanitized", "parts", "answers")
+
+# Rows parsed at a time when loading flat columns
+LOAD_CHUNK_ROWS = 10000
+
+# Categorical columns added by _add_metadata
+_CATEGORY_COLUMNS = ("category", "subcategory", "set_name")
+
+
+def _cached_cluster_ids(df: pd.DataFrame, source: Path, cache_dir: Path) -> np.ndarray:
+    """Load cluster ids for a corpus file from the cache, computing them on a miss."""
+    prefix = f"clusters_{source.stem}_"
+    path = cache_dir / f"{prefix}{corpus_fingerprint(source)}.npy"
+    if path.exists():
+        cluster_ids = np.load(path)
+        if len(cluster_ids) == len(df):
+            return cluster_ids
+    cluster_ids = assign_clusters(df)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write to a file of this process's own and swap it in, since other processes
+    # (e.g. queue workers) may be loading the cache at the same time
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, cluster_ids)
+    os.replace(tmp_path, path)
+    remove_stale(path, prefix)
+    return cluster_ids
+
+
+def _nested(df: pd.DataFrame, column: str, key: str, flat_column: str) -> Optional[pd.Series]:
+    """Get a field stored either in a nested dict column (e.g. set.year) or a flat column (setYear)."""
+    if column in df.columns:
+        return df[column].map(lambda value: value.get(key) if isinstance(value, dict) else None)
+    if flat_column in df.columns:
+        return df[flat_column]
+    return None
+
+
+def _add_metadata(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace the QBReader metadata fields with compact typed columns.
+
+    Adds difficulty (int8) and year (int16), with -1 for missing values, and
+    category, subcategory and set_name as categoricals. The nested set and
+    packet dicts are dropped.
+    """
+    def integers(values, dtype):
+        values = pd.Series(values if values is not None else -1, index=df.index)
+        return pd.to_numeric(values, errors="coerce").fillna(-1).astype(dtype)
+
+    def categories(values):
+        return pd.Series(values, index=df.index, dtype="object").astype("category")
+
+    df["difficulty"] = integers(df.get("difficulty"), "int8")
+    df["year"] = integers(_nested(df, "set", "year", "setYear"), "int16")
+    df["category"] = categories(df.get("category"))
+    df["subcategory"] = categories(df.get("subcategory"))
+    df["set_name"] = categories(_nested(df, "set", "name", "setName"))
+    return df.drop(columns=[c for c in ["set", "packet"] if c in df.columns])
+
+
+def _is_text(values: pd.Series) -> bool:
+    """Whether a column holds only strings and missing values."""
+    return values.dtype == object and all(
+        isinstance(value, str) or value is None or (isinstance(value, float) and value != value)
+        for value in values
+    )
+
+
+def _read_flat(path: Path, list_columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Read a corpus file with its list columns stored as StringListArrays (see anki_qb.ragged).
+
+    The file is parsed a chunk at a time, and every string of a chunk is moved
+    into flat buffers before the next chunk is parsed. The other text columns
+    are turned back into Python strings only once parsing is done, so they are
+    allocated together rather than scattered among the parser's freed objects,
+    which would otherwise keep most of the parser's memory resident.
+    """
+    chunks = []
+    text_columns = set()
+    for chunk in pd.read_json(path, lines=True, chunksize=LOAD_CHUNK_ROWS):
+        chunk = _add_metadata(chunk)
+        text = [c for c in chunk.columns if c not in list_columns and _is_text(chunk[c])]
+        text_columns.update(text)
+        chunks.append(flatten_lists(chunk, [*list_columns, *text]))
+    df = pd.concat(chunks, ignore_index=True)
+    del chunks
+
+    # Chunks have different categories, so their categoricals concatenate to objects
+    for column in _CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+    for column in text_columns:
+        df[column] = [value[0] if isinstance(value, list) else value for value in df[column]]
+    return df
+
+
+def _load(path: Path, config: Config, dedup: bool, list_columns: Sequence[str] = ()) -> pd.DataFrame:
+    if list_columns:
+        df = _read_flat(path, list_columns)
+    else:
+        df = _add_metadata(pd.read_json(path, lines=True))
+    df = add_answer_columns(df)
+    if dedup:
+        df["cluster_id"] = _cached_cluster_ids(df, path, config.cache_dir)
+    return df
+
+
+def load_tossups(config: Optional[Config] = None, dedup: bool = True) -> pd.DataFrame:
+    """
+    Load the QBReader tossups.
+
+    Metadata is stored in compact typed columns: difficulty, year, category,
+    subcategory and set_name (see anki_qb.search.MetadataIndex for filtering on them).
+    Answer lines are parsed into normalized answer_primary and answer_accept columns
+    (see anki_qb.answers.AnswerIndex for exact-answer lookups).
+
+    Args:
+        config: Configuration with data paths (defaults to the global config)
+        dedup: Whether to add a `cluster_id` column grouping duplicate tossups
+            (see anki_qb.dedup). Cluster ids are computed once per corpus version
+            and cached in the config's cache directory.
+
+    Returns:
+        Tossup DataFrame
+    """
+    config = config or get_config()
+    return _load(config.tossups_path, config, dedup)
+
+
+def load_bonuses(
+    config: Optional[Config] = None,
+    dedup: bool = True,
+    flat: bool = True,
+) -> pd.DataFrame:
+    """
+    Load the QBReader bonuses.
+
+    Metadata is stored in compact typed columns: difficulty, year, category,
+    subcategory and set_name (see anki_qb.search.MetadataIndex for filtering on them).
+    Answer lines are parsed into normalized answers_primary and answers_accept columns
+    (see anki_qb.answers.AnswerIndex for exact-answer lookups).
+
+    Args:
+        config: Configuration with data paths (defaults to the global config)
+        dedup: Whether to add a `cluster_id` column grouping duplicate bonuses
+            (see anki_qb.dedup). Cluster ids are computed once per corpus version
+            and cached in the config's cache directory.
+        flat: Whether to store the per-part columns (parts_sanitized, answers_sanitized)
+            as flat StringListArrays (see anki_qb.ragged) instead of Python lists,
+            which takes far less memory and pickles quickly. Rows still read as lists.
+
+    Returns:
+        Bonus DataFrame
+    """
+    config = config or get_config()
+    return _load(config.bonuses_path, config, dedup, BONUS_LIST_COLUMNS if flat else ())
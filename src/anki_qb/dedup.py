@@ -0,0 +1,81 @@
+"""Detection and collapsing of duplicate tossups and bonuses across question sets."""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+# Pronunciation guides, power marks and editorial notes, e.g. "[ay-LEE-uh]" or "(*)"
+_BRACKETED = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize question text so that mirrors of the same question compare equal.
+
+    Lowercases, drops bracketed/parenthesized asides (pronunciation guides, power
+    marks), removes punctuation, and collapses whitespace.
+
+    Args:
+        text: Question text
+
+    Returns:
+        Normalized text
+    """
+    if not isinstance(text, str):
+        return ""
+    text = _BRACKETED.sub(" ", text.lower())
+    text = _PUNCTUATION.sub(" ", text)
+    return " ".join(text.split())
+
+
+def _bonus_text(leadin, parts) -> str:
+    """Join a bonus leadin and its parts into one text."""
+    parts = parts if isinstance(parts, (list, tuple)) else [parts]
+    return " ".join(p for p in [leadin, *parts] if isinstance(p, str))
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(normalize_question(text).encode(), digest_size=8).digest()
+
+
+def assign_clusters(df: pd.DataFrame) -> np.ndarray:
+    """
+    Assign a cluster id to every tossup or bonus so that duplicates share an id.
+
+    Two questions are duplicates if their text is identical after normalize_question.
+    Bonuses are compared on their leadin and parts together.
+
+    Args:
+        df: Tossup or bonus DataFrame
+
+    Returns:
+        Array of int32 cluster ids aligned with the rows of df
+    """
+    if "question_sanitized" in df.columns:
+        texts = df["question_sanitized"]
+    else:
+        texts = map(_bonus_text, df["leadin_sanitized"], df["parts_sanitized"])
+    digests = [_digest(text) for text in texts]
+    codes, _ = pd.factorize(pd.Series(digests, dtype=object))
+    return codes.astype(np.int32)
+
+
+def collapse_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep one representative row per cluster in a set of search results.
+
+    Requires a `cluster_id` column (see assign_clusters). The first row of each
+    cluster is kept and a `duplicates` column records how many matching rows
+    the cluster had.
+
+    Args:
+        df: Tossup or bonus search results with a cluster_id column
+
+    Returns:
+        DataFrame with one row per cluster, in order of first appearance
+    """
+    counts = df["cluster_id"].map(df["cluster_id"].value_counts())
+    return df.assign(duplicates=counts)[~df["cluster_id"].duplicated()]
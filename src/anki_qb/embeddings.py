@@ -0,0 +1,275 @@
+"""Semantic retrieval of related questions with a local embedding index."""
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+
+import llm
+import numpy as np
+import pandas as pd
+
+from anki_qb.cache import corpus_fingerprint, remove_stale
+from anki_qb.config import Config, get_config
+from anki_qb.search import MetadataIndex
+
+# Local CPU model from the llm-sentence-transformers plugin
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Default number of nearest questions to retrieve per query
+DEFAULT_TOP_K = 10
+
+# Texts embedded per model call while building an index
+EMBED_BATCH_SIZE = 256
+
+# Rows scored per matrix multiplication, bounding the float32 working memory
+SEARCH_CHUNK_ROWS = 65536
+
+
+def _join(value) -> str:
+    """Join a question field (string or list of strings) into one text."""
+    if isinstance(value, (list, tuple)):
+        return " ".join(v for v in value if isinstance(v, str))
+    return value if isinstance(value, str) else ""
+
+
+def question_texts(df: pd.DataFrame) -> list[str]:
+    """
+    Get the text to embed for each tossup or bonus: the question(s) and answer(s).
+
+    Args:
+        df: Tossup DataFrame (question_sanitized, answer_sanitized) or bonus DataFrame
+            (leadin_sanitized, parts_sanitized, answers_sanitized)
+
+    Returns:
+        One text per row, in order
+    """
+    if "question_sanitized" in df.columns:
+        return [
+            f"{_join(question)} Answer: {_join(answer)}"
+            for question, answer in zip(df["question_sanitized"], df["answer_sanitized"])
+        ]
+    return [
+        f"{_join(leadin)} {_join(parts)} Answers: {_join(answers)}"
+        for leadin, parts, answers in zip(
+            df["leadin_sanitized"], df["parts_sanitized"], df["answers_sanitized"]
+        )
+    ]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingIndex:
+    """
+    Unit-length embeddings of a corpus stored as a float16 matrix, one row per question.
+
+    The matrix is memory-mapped from disk, so only the chunk being scored is held
+    in memory as float32. Similarity is the dot product (cosine similarity).
+
+    Example:
+        index = EmbeddingIndex.build(question_texts(tossups), Path("tossups.npy"))
+        positions, scores = index.query(["Igor Stravinsky: Russian composer..."], k=10)
+    """
+
+    def __init__(self, matrix: np.ndarray, model: str = DEFAULT_EMBEDDING_MODEL):
+        """
+        Initialize from an embedding matrix.
+
+        Args:
+            matrix: (rows, dimensions) array of unit-length embeddings
+            model: Name of the llm embedding model that produced them
+        """
+        self.matrix = matrix
+        self.model = model
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    @classmethod
+    def build(
+        cls,
+        texts: Sequence[str],
+        path: Path,
+        model: str = DEFAULT_EMBEDDING_MODEL,
+    ) -> "EmbeddingIndex":
+        """
+        Embed texts and write the matrix to a .npy file, a batch at a time.
+
+        Args:
+            texts: Texts to embed, one per row
+            path: Path of the .npy file to write (replaced atomically when done)
+            model: Name of an llm embedding model
+
+        Returns:
+            EmbeddingIndex memory-mapped from the new file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp.npy")
+        embedding_model = llm.get_embedding_model(model)
+
+        matrix = None
+        batch = []
+        row = 0
+        for vector in embedding_model.embed_multi(texts, batch_size=EMBED_BATCH_SIZE):
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    tmp_path, mode="w+", dtype=np.float16, shape=(len(texts), len(vector))
+                )
+            batch.append(vector)
+            if len(batch) == EMBED_BATCH_SIZE:
+                matrix[row:row + len(batch)] = _normalize(np.asarray(batch, dtype=np.float32))
+                row += len(batch)
+                batch = []
+        if matrix is None:
+            # Empty corpus: still write the file so load_embedding_index doesn't rebuild every time
+            matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=(0, 0))
+        if batch:
+            matrix[row:row + len(batch)] = _normalize(np.asarray(batch, dtype=np.float32))
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, path)
+        return cls.load(path, model)
+
+    @classmethod
+    def load(cls, path: Path, model: str = DEFAULT_EMBEDDING_MODEL) -> "EmbeddingIndex":
+        """Memory-map an index written by build()."""
+        return cls(np.load(path, mmap_mode="r"), model)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed query texts with the index's model, returning unit-length float32 rows."""
+        embedding_model = llm.get_embedding_model(self.model)
+        return _normalize(np.asarray(list(embedding_model.embed_multi(texts)), dtype=np.float32))
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = DEFAULT_TOP_K,
+        mask: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest rows to each query embedding.
+
+        All queries are scored together, one chunk of the matrix at a time.
+
+        Args:
+            queries: (queries, dimensions) array of unit-length embeddings
+            k: Number of neighbors per query
+            mask: Optional boolean array over rows; rows where it is False are skipped
+
+        Returns:
+            Tuple of (row positions, similarity scores), each of shape (queries, k') with
+            k' = min(k, number of candidate rows), best match first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.matrix), SEARCH_CHUNK_ROWS):
+            chunk = np.asarray(self.matrix[start:start + SEARCH_CHUNK_ROWS], dtype=np.float32)
+            scores = queries @ chunk.T
+            if mask is not None:
+                scores[:, ~mask[start:start + len(chunk)]] = -np.inf
+            rows = np.broadcast_to(np.arange(start, start + len(chunk)), scores.shape)
+
+            # Keep the running top k of the previous chunks and this one
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        if mask is not None:
+            # Drop masked-out rows that filled the top k when there were too few candidates
+            keep = min(k, int(mask.sum()))
+            best_scores, best_rows = best_scores[:, :keep], best_rows[:, :keep]
+        return best_rows, best_scores
+
+    def query(
+        self,
+        texts: Sequence[str],
+        k: int = DEFAULT_TOP_K,
+        mask: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Embed query texts and find their k nearest rows (see search)."""
+        return self.search(self.embed(texts), k=k, mask=mask)
+
+
+def load_embedding_index(
+    df: pd.DataFrame,
+    source: Path,
+    config: Optional[Config] = None,
+    model: str = DEFAULT_EMBEDDING_MODEL,
+) -> EmbeddingIndex:
+    """
+    Load the embedding index for a corpus file, building it on a miss.
+
+    The index is cached in the config's cache directory, one file per corpus file
+    and model, and rebuilt when the corpus file changes; the outdated file is then
+    deleted. Building embeds every question once, which can take a while on CPU.
+
+    Args:
+        df: Tossups or bonuses loaded from source (see anki_qb.corpus)
+        source: Path of the corpus file, e.g. config.tossups_path
+        config: Configuration with data paths (defaults to the global config)
+        model: Name of an llm embedding model (e.g. from llm-sentence-transformers)
+
+    Returns:
+        EmbeddingIndex with one row per row of df
+    """
+    config = config or get_config()
+    source = Path(source)
+    model_name = re.sub(r"[^\w.-]+", "_", model)
+    prefix = f"embeddings_{source.stem}_{model_name}_"
+    path = config.cache_dir / f"{prefix}{corpus_fingerprint(source, model=model)}.npy"
+    if path.exists():
+        index = EmbeddingIndex.load(path, model)
+        if len(index) == len(df):
+            return index
+    index = EmbeddingIndex.build(question_texts(df), path, model)
+    remove_stale(path, prefix)
+    return index
+
+
+def semantic_search(
+    query: str,
+    df: pd.DataFrame,
+    embeddings: EmbeddingIndex,
+    k: int = DEFAULT_TOP_K,
+    difficulty: Optional[tuple[Optional[int], Optional[int]]] = None,
+    year: Optional[tuple[Optional[int], Optional[int]]] = None,
+    category: Optional[Union[str, Iterable[str]]] = None,
+    index: Optional[MetadataIndex] = None,
+) -> pd.DataFrame:
+    """
+    Find the tossups or bonuses most similar in meaning to a query.
+
+    Unlike search_tossups/search_bonuses, this finds questions that clue a topic
+    without naming it.
+
+    Args:
+        query: Query text, e.g. a YGK topic's label and description
+        df: DataFrame the embeddings were built from
+        embeddings: EmbeddingIndex for df (see load_embedding_index)
+        k: Number of questions to return
+        difficulty: Inclusive (min, max) difficulty range to restrict the search to
+        year: Inclusive (min, max) year range to restrict the search to
+        category: QBReader category name or names to restrict the search to
+        index: Precomputed MetadataIndex for df (built on the fly if filters are given without one)
+
+    Returns:
+        DataFrame with the k most similar rows, most similar first, and a
+        `similarity` column
+    """
+    mask = None
+    if difficulty is not None or year is not None or category is not None:
+        mask = (index or MetadataIndex(df)).mask(difficulty=difficulty, year=year, category=category)
+    rows, scores = embeddings.query([query], k=k, mask=mask)
+    return df.iloc[rows[0]].assign(similarity=scores[0])
@@ -1,9 +1,20 @@
 """Formatting utilities for QBReader data and markdown tables."""
 
 import re
+from typing import Optional
+
 import pandas as pd
 
 from anki_qb.parsing import parse_ygk_page
+from anki_qb.prompts import PROMPT_BATCH
+from anki_qb.tables import MarkdownTableParser
+from anki_qb.tokens import DEFAULT_CONTEXT_FRACTION, context_window, estimate_tokens
+
+# A str.format placeholder like {topic} (but not an escaped {{brace}})
+_PLACEHOLDER = re.compile(r"(?<!\{)\{[A-Za-z_][^{}]*\}")
+
+# Default maximum number of topics in one batched prompt (see group_topics)
+DEFAULT_MAX_BATCH_TOPICS = 8
 
 
 def format_qa(df: pd.DataFrame) -> list[str]:
@@ -15,21 +26,26 @@ def format_qa(df: pd.DataFrame) -> list[str]:
       - Tossups: uses `question_sanitized` and `answer_sanitized`
       - Bonuses: uses `leadin_sanitized`, `parts_sanitized`, and `answers_sanitized`
 
+    If there is a `duplicates` column (see anki_qb.dedup.collapse_duplicates), questions
+    that stand for several copies are marked with the number of copies.
+
     Args:
         df: DataFrame containing tossup or bonus data
 
     Returns:
         List of strings, one per row
     """
-    formatted = []
-
-    for _, row in df.iterrows():
-        # Detect bonus vs tossup
-        if {'leadin_sanitized', 'parts_sanitized', 'answers_sanitized'}.issubset(row.index):
-            leadin = row.get('leadin_sanitized', '')
-            parts = row.get('parts_sanitized', [])
-            answers = row.get('answers_sanitized', [])
+    copies = df['duplicates'].tolist() if 'duplicates' in df.columns else [1] * len(df)
+    notes = [f"\n(Appears {n} times)" if n > 1 else "" for n in copies]
 
+    # Detect bonus vs tossup
+    if {'leadin_sanitized', 'parts_sanitized', 'answers_sanitized'}.issubset(df.columns):
+        # Iterating a flat StringListArray column (see anki_qb.ragged) decodes
+        # only these rows' strings
+        formatted = []
+        for leadin, parts, answers, note in zip(
+            df['leadin_sanitized'], df['parts_sanitized'], df['answers_sanitized'], notes
+        ):
             # Make sure parts and answers are lists
             parts = parts if isinstance(parts, (list, tuple)) else [parts]
             answers = answers if isinstance(answers, (list, tuple)) else [answers]
@@ -40,20 +56,19 @@ def format_qa(df: pd.DataFrame) -> list[str]:
                 a_str = a.strip() if isinstance(a, str) else ""
                 qa_text += f"  Part {i}: {p_str}\n  Answer: {a_str}\n"
 
-            formatted.append(qa_text.strip())
+            formatted.append(qa_text.strip() + note)
+        return formatted
 
-        elif {'question_sanitized', 'answer_sanitized'}.issubset(row.index):
-            question = row.get('question_sanitized', '')
-            answer = row.get('answer_sanitized', '')
+    if {'question_sanitized', 'answer_sanitized'}.issubset(df.columns):
+        formatted = []
+        for question, answer, note in zip(df['question_sanitized'], df['answer_sanitized'], notes):
             q_str = question.strip() if isinstance(question, str) else ""
             a_str = answer.strip() if isinstance(answer, str) else ""
-            formatted.append(f"Question: {q_str}\nAnswer: {a_str}")
+            formatted.append(f"Question: {q_str}\nAnswer: {a_str}{note}")
+        return formatted
 
-        else:
-            # Unknown schema — skip row
-            continue
-
-    return formatted
+    # Unknown schema
+    return []
 
 
 def format_ygk_prompt(data: dict[str, str], prompt_template: str, qbr_data: dict[str, str]) -> str:
@@ -83,10 +98,119 @@ def format_ygk_prompt(data: dict[str, str], prompt_template: str, qbr_data: dict
         tossups=qbr_data["tossups"],
         num_related_bonuses=qbr_data["num_related_bonuses"],
         bonuses=qbr_data["bonuses"],
+        term_frequencies=qbr_data.get("term_frequencies", "(not available)"),
     )
 
 
-def format_ygk_prompts(path: str, prompt_template: str, get_qbr_data_fn) -> list[tuple[str, dict]]:
+def split_prompt_template(prompt_template: str) -> tuple[str, str]:
+    """
+    Split a prompt template into its fixed instructions and its per-topic input.
+
+    The split is made at the template's "INPUT TEMPLATE" heading if it has one,
+    otherwise at the start of the line containing the first placeholder. Sending
+    the instructions as a system prompt gives every topic's request the same
+    prefix, which providers with prompt caching can reuse across a run.
+
+    Args:
+        prompt_template: Prompt template string with format placeholders
+
+    Returns:
+        Tuple of (system prompt, user message template). The system prompt is empty
+        if the template starts with a placeholder.
+    """
+    match = _PLACEHOLDER.search(prompt_template)
+    first_field = match.start() if match else len(prompt_template)
+    heading = prompt_template.rfind("INPUT TEMPLATE", 0, first_field)
+    cut = prompt_template.rfind("\n", 0, heading if heading != -1 else first_field) + 1
+    # The system prompt isn't formatted, so unescape any literal braces
+    system = prompt_template[:cut].strip().replace("{{", "{").replace("}}", "}")
+    return system, prompt_template[cut:]
+
+
+def pack_qbr_data(
+    data: dict[str, str],
+    prompt_template: str,
+    qbr_data: dict[str, str],
+    model: Optional[str] = None,
+    context_fraction: float = DEFAULT_CONTEXT_FRACTION,
+) -> tuple[dict[str, str], dict]:
+    """
+    Fit the related tossups and bonuses into a fraction of the model's context window.
+
+    Questions are taken alternately from the tossups and bonuses, in search order,
+    until the estimated size of the formatted prompt would exceed the token budget.
+
+    Args:
+        data: Dictionary with article, label, text, and terms
+        prompt_template: Prompt template string with format placeholders
+        qbr_data: Dictionary with QBReader data (see get_qbr_data)
+        model: Model the prompt will be sent to (used for token estimation)
+        context_fraction: Fraction of the model's context window the prompt may fill
+
+    Returns:
+        Tuple of (packed qbr_data, packing info) where packing info contains:
+        - estimated_tokens: Estimated size of the packed prompt
+        - token_budget: Maximum prompt size allowed
+        - tossups_included / tossups_dropped: Number of tossups kept / truncated
+        - bonuses_included / bonuses_dropped: Number of bonuses kept / truncated
+        - truncated: Whether any questions were dropped
+    """
+    separator = "\n\n"
+    streams = {
+        "tossups": qbr_data.get("tossup_texts") or _split_qa(qbr_data["tossups"]),
+        "bonuses": qbr_data.get("bonus_texts") or _split_qa(qbr_data["bonuses"]),
+    }
+    empty = {**qbr_data, "tossups": "", "bonuses": ""}
+    used = estimate_tokens(format_ygk_prompt(data, prompt_template, empty), model)
+    budget = int(context_window(model) * context_fraction)
+    separator_tokens = estimate_tokens(separator, model)
+
+    kept = {name: [] for name in streams}
+    open_streams = [name for name in streams if streams[name]]
+    while open_streams:
+        for name in list(open_streams):
+            items = streams[name]
+            item = items[len(kept[name])]
+            cost = estimate_tokens(item, model) + (separator_tokens if kept[name] else 0)
+            if used + cost > budget:
+                open_streams.remove(name)
+                continue
+            used += cost
+            kept[name].append(item)
+            if len(kept[name]) == len(items):
+                open_streams.remove(name)
+
+    packed = {
+        **qbr_data,
+        "tossups": separator.join(kept["tossups"]),
+        "bonuses": separator.join(kept["bonuses"]),
+    }
+    info = {
+        "estimated_tokens": used,
+        "token_budget": budget,
+        "tossups_included": len(kept["tossups"]),
+        "tossups_dropped": len(streams["tossups"]) - len(kept["tossups"]),
+        "bonuses_included": len(kept["bonuses"]),
+        "bonuses_dropped": len(streams["bonuses"]) - len(kept["bonuses"]),
+    }
+    info["truncated"] = bool(info["tossups_dropped"] or info["bonuses_dropped"])
+    return packed, info
+
+
+def _split_qa(text: str) -> list[str]:
+    """Split a block of formatted questions (see format_qa) back into individual questions."""
+    return [t for t in text.split("\n\n") if t.strip()]
+
+
+def format_ygk_prompts(
+    path: str,
+    prompt_template: str,
+    get_qbr_data_fn,
+    model: Optional[str] = None,
+    context_fraction: Optional[float] = DEFAULT_CONTEXT_FRACTION,
+    split_system: bool = False,
+    snapshot=None,
+) -> list[tuple[str, dict]]:
     """
     Parse a YGK page and format all topics into prompts with metadata.
 
@@ -94,37 +218,192 @@ def format_ygk_prompts(path: str, prompt_template: str, get_qbr_data_fn) -> list
         path: Path to the HTML file or category name
         prompt_template: Prompt template string with format placeholders
         get_qbr_data_fn: Function to get QBReader data for a given YGK data dict
+        model: Model the prompts will be sent to (used to size the context)
+        context_fraction: Fraction of the model's context window each prompt may fill.
+            If None, all related questions are included.
+        split_system: If True, the template's instructions are returned separately as
+            a system prompt and each prompt holds only the topic's input (see
+            split_prompt_template)
+        snapshot: Optional YGKSnapshot (see anki_qb.snapshot) to take the topics from
+            instead of parsing the HTML file
 
     Returns:
         List of (prompt, metadata) tuples where metadata contains:
+        - article: Title of the YGK article
         - label: Original topic label from YGK article
         - sanitized_term: The search term used to find related questions
+        - packing: Token estimate and truncated question counts (see pack_qbr_data),
+          or None if context_fraction is None
+        - system: System prompt to send with the prompt, or None if split_system is False
+        - num_related: Number of related tossups plus bonuses found for the topic
+        - text_length: Number of characters in the topic's YGK text
+    """
+    items = snapshot.items(path) if snapshot is not None and path in snapshot else parse_ygk_page(path)
+    return [
+        format_topic_prompt(
+            data,
+            prompt_template,
+            get_qbr_data_fn,
+            model=model,
+            context_fraction=context_fraction,
+            split_system=split_system,
+        )
+        for data in items
+    ]
+
+
+def format_topic_prompt(
+    data: dict[str, str],
+    prompt_template: str,
+    get_qbr_data_fn,
+    model: Optional[str] = None,
+    context_fraction: Optional[float] = DEFAULT_CONTEXT_FRACTION,
+    split_system: bool = False,
+) -> tuple[str, dict]:
+    """
+    Format a single YGK topic into a prompt with metadata.
+
+    Args:
+        data: Dictionary with article, label, text, and terms (one item of a YGK page)
+        prompt_template: Prompt template string with format placeholders
+        get_qbr_data_fn: Function to get QBReader data for a given YGK data dict
+        model: Model the prompt will be sent to (used to size the context)
+        context_fraction: Fraction of the model's context window the prompt may fill.
+            If None, all related questions are included.
+        split_system: If True, the template's instructions are returned separately as
+            a system prompt (see split_prompt_template)
+
+    Returns:
+        Tuple of (prompt, metadata), as in format_ygk_prompts
     """
-    ret = []
-    for data in parse_ygk_page(path):
-        qbr_data = get_qbr_data_fn(data)
-        prompt = format_ygk_prompt(data, prompt_template, qbr_data)
-        metadata = {
-            "label": data["label"],
-            "sanitized_term": qbr_data.get("sanitized_term", data["label"])
-        }
-        ret.append((prompt, metadata))
-    return ret
+    system, user_template = None, prompt_template
+    if split_system:
+        system, user_template = split_prompt_template(prompt_template)
+    qbr_data = get_qbr_data_fn(data)
+    packing = None
+    if context_fraction is not None:
+        qbr_data, packing = pack_qbr_data(
+            data, prompt_template, qbr_data, model=model, context_fraction=context_fraction
+        )
+    prompt = format_ygk_prompt(data, user_template, qbr_data)
+    metadata = {
+        "article": data["article"],
+        "label": data["label"],
+        "sanitized_term": qbr_data.get("sanitized_term", data["label"]),
+        "packing": packing,
+        "system": system,
+        "num_related": qbr_data["num_related_tossups"] + qbr_data["num_related_bonuses"],
+        "text_length": len(data["text"]),
+    }
+    return prompt, metadata
 
 
 def read_markdown(markdown_text: str) -> pd.DataFrame:
     """
     Reads a Markdown-formatted table into a pandas DataFrame.
 
+    The table may appear anywhere in the text (e.g. after a preamble). See
+    MarkdownTableParser for how escaped pipes and ragged rows are handled.
+
     Args:
-        markdown_text: The Markdown table as a string
+        markdown_text: Text containing a Markdown table
 
     Returns:
         DataFrame containing the parsed table
+
+    Raises:
+        ValueError: If no table is found in the text
+    """
+    parser = MarkdownTableParser()
+    parser.feed(markdown_text)
+    parser.close()
+    if parser.header is None:
+        raise ValueError("No Markdown table found in text")
+    return pd.DataFrame(parser.rows, columns=parser.header)
+
+
+def group_topics(
+    prompts: list[str],
+    token_budget: int,
+    model: Optional[str] = None,
+    max_topics: int = DEFAULT_MAX_BATCH_TOPICS,
+) -> list[list[int]]:
+    """
+    Group consecutive topic prompts into batches that fit a token budget.
+
+    Small topics (e.g. with few related questions) are packed together so they can
+    be sent as one request with format_batch_prompt. A topic that doesn't fit the
+    budget on its own gets a batch to itself.
+
+    Args:
+        prompts: Per-topic prompts without the shared instructions (see
+            format_ygk_prompts with split_system=True)
+        token_budget: Maximum estimated tokens of a batch's topic prompts combined
+        model: Model the prompts will be sent to (used for token estimation)
+        max_topics: Maximum number of topics per batch
+
+    Returns:
+        Batches as lists of indices into prompts, in order
+    """
+    batches = []
+    batch, used = [], 0
+    for i, prompt in enumerate(prompts):
+        tokens = estimate_tokens(prompt, model)
+        if batch and (used + tokens > token_budget or len(batch) >= max_topics):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(i)
+        used += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def format_batch_prompt(prompts: list[str]) -> str:
+    """
+    Combine several topic prompts into one prompt asking for a single table.
+
+    The response table gets an extra `Topic` column with each flashcard's topic
+    number (1-based, in the order of prompts); see split_batch_table.
+
+    Args:
+        prompts: Per-topic prompts without the shared instructions
+
+    Returns:
+        Batched prompt, to be sent with the template's instructions as system prompt
+    """
+    topics = "\n\n".join(f"### TOPIC {n}\n\n{prompt.strip()}" for n, prompt in enumerate(prompts, 1))
+    return PROMPT_BATCH.format(num_topics=len(prompts), topics=topics)
+
+
+def batch_topic_number(value) -> Optional[int]:
+    """Parse a `Topic` cell like "2", "Topic 2" or "#2" into a topic number."""
+    match = re.search(r"\d+", str(value))
+    return int(match.group()) if match else None
+
+
+def split_batch_table(df: pd.DataFrame, num_topics: int) -> dict[int, pd.DataFrame]:
+    """
+    Split the table returned for a batched prompt back into per-topic tables.
+
+    Args:
+        df: Parsed response table with a `Topic` column (see format_batch_prompt)
+        num_topics: Number of topics in the batch
+
+    Returns:
+        Dictionary from topic number (1-based) to its flashcards without the `Topic`
+        column. Topics the response has no flashcards for are missing.
+
+    Raises:
+        ValueError: If the table has no `Topic` column
     """
-    lines = [l.strip() for l in markdown_text.strip().splitlines() if l.strip()]
-    lines = [re.sub(r'^\||\|$', '', l) for l in lines]  # remove outer pipes
-    lines = [re.split(r'\s*\|\s*', l) for l in lines if not re.match(r'^\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\s*$', l)]
-    header, *rows = lines
-    rows = [[r.strip() for r in row] for row in rows]
-    return pd.DataFrame(rows, columns=[h.strip() for h in header])
+    topic_column = next((c for c in df.columns if str(c).strip().lower() == "topic"), None)
+    if topic_column is None:
+        raise ValueError("Batched response table has no Topic column")
+    numbers = df[topic_column].map(batch_topic_number)
+    df = df.drop(columns=[topic_column])
+    return {
+        int(n): group.reset_index(drop=True)
+        for n, group in df.groupby(numbers, sort=True)
+        if 1 <= n <= num_topics
+    }
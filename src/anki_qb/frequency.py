@@ -0,0 +1,214 @@
+"""Corpus-wide frequency of YGK topic labels and terms in QBReader questions."""
+
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from anki_qb.cache import corpus_fingerprint, remove_stale
+from anki_qb.config import Config, get_config
+from anki_qb.dedup import normalize_question
+from anki_qb.parsing import parse_ygk_page
+
+# Count columns of the frequency table: questions mentioning a phrase in their text or answer line
+COUNT_COLUMNS = ["tossup_text", "tossup_answer", "bonus_text", "bonus_answer"]
+
+
+class _PhraseMatcher:
+    """Finds which of a fixed set of phrases occur (as whole words) in normalized text."""
+
+    def __init__(self, phrases: Iterable[str]):
+        # First word -> lengths (in words) of the phrases starting with it
+        self.phrases = set()
+        self.lengths = defaultdict(set)
+        for phrase in phrases:
+            words = phrase.split()
+            if words:
+                self.phrases.add(phrase)
+                self.lengths[words[0]].add(len(words))
+
+    def find(self, text: str) -> set[str]:
+        words = normalize_question(text).split()
+        found = set()
+        for i, word in enumerate(words):
+            for n in self.lengths.get(word, ()):
+                phrase = " ".join(words[i:i + n])
+                if phrase in self.phrases:
+                    found.add(phrase)
+        return found
+
+
+def _count(matcher: _PhraseMatcher, texts: Iterable[str]) -> dict[str, int]:
+    counts = defaultdict(int)
+    for text in texts:
+        for phrase in matcher.find(text):
+            counts[phrase] += 1
+    return counts
+
+
+def _join(value) -> str:
+    """Join a bonus field (string or list of strings) into one text."""
+    if isinstance(value, (list, tuple)):
+        return " ".join(v for v in value if isinstance(v, str))
+    return value if isinstance(value, str) else ""
+
+
+def compute_term_frequencies(
+    topics: Iterable[tuple[str, object]],
+    tossups_df: pd.DataFrame,
+    bonuses_df: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Count how many tossups and bonuses mention each YGK topic label and term.
+
+    Phrases are matched as whole words after normalize_question (so case,
+    punctuation and parenthesized dates are ignored). The corpus is scanned once
+    for all topics together.
+
+    Args:
+        topics: (category, YGK item) pairs, e.g. from parse_ygk_page for each category
+        tossups_df: DataFrame with tossup questions
+        bonuses_df: DataFrame with bonus questions
+
+    Returns:
+        DataFrame with one row per (category, label, phrase) and columns category,
+        article, label, kind ("label" or "term"), phrase, and the COUNT_COLUMNS
+    """
+    rows = []
+    for category, item in topics:
+        labels = [item["label"], *item["label"].split(" / ")] if " / " in item["label"] else [item["label"]]
+        phrases = [("label", p) for p in labels] + [("term", t) for t in item["terms"]]
+        seen = set()
+        for kind, phrase in phrases:
+            normalized = normalize_question(phrase)
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                rows.append((category, item["article"], item["label"], kind, normalized))
+    table = pd.DataFrame(rows, columns=["category", "article", "label", "kind", "phrase"])
+
+    matcher = _PhraseMatcher(table["phrase"])
+    counts = {
+        "tossup_text": _count(matcher, tossups_df["question_sanitized"]),
+        "tossup_answer": _count(matcher, tossups_df["answer_sanitized"]),
+        "bonus_text": _count(
+            matcher,
+            map(lambda leadin, parts: f"{_join(leadin)} {_join(parts)}",
+                bonuses_df["leadin_sanitized"], bonuses_df["parts_sanitized"]),
+        ),
+        "bonus_answer": _count(matcher, map(_join, bonuses_df["answers_sanitized"])),
+    }
+    for column, column_counts in counts.items():
+        table[column] = table["phrase"].map(lambda p: column_counts.get(p, 0)).astype("int32")
+    for column in ["category", "article", "label", "kind"]:
+        table[column] = table[column].astype("category")
+    return table
+
+
+def load_term_frequencies(
+    categories: list[str],
+    tossups_df: pd.DataFrame,
+    bonuses_df: pd.DataFrame,
+    config: Optional[Config] = None,
+    snapshot=None,
+) -> "TermFrequencies":
+    """
+    Load the term frequency table for YGK categories, computing it on a miss.
+
+    The table is cached in the config's cache directory and recomputed when the
+    QBReader files or any of the categories' HTML files change; the outdated table
+    is then deleted.
+
+    Args:
+        categories: YGK categories to include (normally all of them)
+        tossups_df: DataFrame with tossup questions
+        bonuses_df: DataFrame with bonus questions
+        config: Configuration with data paths (defaults to the global config)
+        snapshot: Optional YGKSnapshot (see anki_qb.snapshot) to take the topics from
+            instead of parsing the HTML files
+
+    Returns:
+        TermFrequencies for the categories
+    """
+    config = config or get_config()
+    html_paths = [config.html_path(category) for category in categories]
+    fingerprint = corpus_fingerprint(config.tossups_path, config.bonuses_path, *html_paths)
+    path = config.cache_dir / f"term_frequencies_{fingerprint}.csv"
+    if path.exists():
+        return TermFrequencies(pd.read_csv(path, keep_default_na=False))
+
+    topics = [
+        (category, item)
+        for category, html_path in zip(categories, html_paths)
+        for item in (
+            snapshot.items(category) if snapshot is not None and category in snapshot
+            else parse_ygk_page(str(html_path))
+        )
+    ]
+    table = compute_term_frequencies(topics, tossups_df, bonuses_df)
+    Path(config.cache_dir).mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    table.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    remove_stale(path, "term_frequencies_")
+    return TermFrequencies(table)
+
+
+class TermFrequencies:
+    """Lookup of corpus frequencies by YGK topic (see compute_term_frequencies)."""
+
+    def __init__(self, table: pd.DataFrame):
+        """
+        Initialize from a frequency table.
+
+        Args:
+            table: DataFrame returned by compute_term_frequencies
+        """
+        self.table = table
+        self._by_topic = {
+            (article, label): group
+            for (article, label), group in table.groupby(["article", "label"], observed=True, sort=False)
+        }
+
+    def topic(self, article: str, label: str) -> pd.DataFrame:
+        """Get the frequency rows for a topic (empty if the topic is unknown)."""
+        return self._by_topic.get((article, label), self.table.iloc[:0])
+
+    def topic_frequency(self, article: str, label: str) -> int:
+        """
+        Get the number of questions that mention a topic's label.
+
+        Args:
+            article: YGK article title
+            label: Topic label
+
+        Returns:
+            Largest number of mentions (summed over COUNT_COLUMNS) of any form of the label
+        """
+        rows = self.topic(article, label)
+        rows = rows[rows["kind"] == "label"]
+        if rows.empty:
+            return 0
+        return int(rows[COUNT_COLUMNS].sum(axis=1).max())
+
+    def format(self, article: str, label: str) -> str:
+        """
+        Format a topic's frequencies for inclusion in a prompt.
+
+        Args:
+            article: YGK article title
+            label: Topic label
+
+        Returns:
+            One line per label/term, most frequent first
+        """
+        rows = self.topic(article, label)
+        if rows.empty:
+            return "(not available)"
+        rows = rows.assign(total=rows[COUNT_COLUMNS].sum(axis=1)).sort_values("total", ascending=False)
+        return "\n".join(
+            f"- {row.phrase}: {row.tossup_text} tossup texts, {row.tossup_answer} tossup answers, "
+            f"{row.bonus_text} bonus texts, {row.bonus_answer} bonus answers"
+            for row in rows.itertuples()
+        )
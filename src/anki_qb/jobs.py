@@ -0,0 +1,365 @@
+"""SQLite-backed job queue for spreading flashcard generation across processes and machines."""
+
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# Seconds a worker may hold a job without renewing its lease
+DEFAULT_LEASE_SECONDS = 300
+
+# Times a job is handed out before it is marked failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Job statuses: waiting for a worker, held by a worker, finished with results the
+# coordinator hasn't taken yet, results taken, and given up on
+PENDING, LEASED, DONE, COLLECTED, FAILED = "pending", "leased", "done", "collected", "failed"
+
+
+@dataclass
+class Job:
+    """A topic to generate flashcards for."""
+
+    id: int
+    category: str
+    topic_number: int
+    attempts: int = 0
+
+
+class JobQueue:
+    """
+    Queue of (category, topic) jobs in a SQLite database shared by a coordinator and workers.
+
+    The coordinator starts a run, adds jobs, marks them all queued and collects
+    their results; workers lease a job, generate its flashcards and complete it.
+    A lease expires if it isn't renewed (see keep_alive), so the jobs of a crashed
+    worker are handed out again, up to max_attempts times in total. Workers also
+    record their token usage here so that a run's budget covers all of them (see
+    QueueUsage). Safe to share across threads; every process opens its own
+    JobQueue on the same file.
+
+    The database uses SQLite's default rollback journal rather than WAL, since WAL
+    needs memory shared by all processes and so only works on a single host. On a
+    network filesystem, the filesystem must support POSIX file locks (e.g. NFSv4
+    with locking enabled) or leases can be handed out twice.
+
+    Example:
+        queue = JobQueue("jobs.sqlite")
+        while (job := queue.lease("worker-1")) is not None:
+            with queue.keep_alive(job, "worker-1"):
+                rows = generate(job.category, job.topic_number)
+            queue.complete(job, "worker-1", rows)
+    """
+
+    def __init__(
+        self,
+        path,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        """
+        Open (or create) a job queue.
+
+        Args:
+            path: Path to the SQLite database file; to spread a run over several
+                machines, it must be on a filesystem they share with working file locks
+            lease_seconds: Seconds a leased job is held before another worker may take it
+            max_attempts: Times a job is leased before it is marked failed
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path), timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, category TEXT NOT NULL, topic_number INTEGER NOT NULL, "
+            f"status TEXT NOT NULL DEFAULT '{PENDING}', attempts INTEGER NOT NULL DEFAULT 0, "
+            "worker TEXT, lease_expires REAL, result TEXT, metadata TEXT, error TEXT, "
+            "UNIQUE (category, topic_number))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY, time REAL NOT NULL, "
+            "model TEXT, input_tokens INTEGER, output_tokens INTEGER)"
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't lease the same job
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def start_run(self) -> None:
+        """
+        Start a new run: record its start time and reopen the queue for adding jobs.
+
+        Called by the coordinator before adding jobs. Usage recorded before the
+        start doesn't count towards the new run's budget.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('started', ?)", (str(time.time()),)
+            )
+            conn.execute("DELETE FROM meta WHERE key = 'all_queued'")
+
+    def run_started(self) -> Optional[float]:
+        """Time (as from time.time()) the current run started, or None if none was started."""
+        started = self._meta("started")
+        return float(started) if started is not None else None
+
+    def mark_all_queued(self) -> None:
+        """Record that every job of the run was added, so idle workers may exit (see drained)."""
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('all_queued', '1')")
+
+    def add(self, category: str, topic_numbers: Iterable[int]) -> None:
+        """
+        Add jobs for topics of a category.
+
+        Jobs already in the queue keep their state, except that failed jobs are
+        retried and collected results can be collected again (e.g. by a resumed
+        coordinator).
+
+        Args:
+            category: Category name
+            topic_numbers: 1-based numbers of the topics in the category's article
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO jobs (category, topic_number) VALUES (?, ?) "
+                "ON CONFLICT (category, topic_number) DO UPDATE SET "
+                f"status = CASE status WHEN '{COLLECTED}' THEN '{DONE}' "
+                f"WHEN '{FAILED}' THEN '{PENDING}' ELSE status END, "
+                f"attempts = CASE status WHEN '{FAILED}' THEN 0 ELSE attempts END",
+                [(category, number) for number in topic_numbers],
+            )
+
+    def lease(self, worker: str) -> Optional[Job]:
+        """
+        Take the next job that is pending or whose lease has expired.
+
+        Args:
+            worker: Name of the worker taking the job (e.g. host and process id)
+
+        Returns:
+            The leased Job, or None if no job is available right now
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs whose last allowed lease expired were most likely crashing their workers
+            conn.execute(
+                f"UPDATE jobs SET status = '{FAILED}', error = 'lease expired' "
+                f"WHERE status = '{LEASED}' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = conn.execute(
+                f"SELECT id, category, topic_number, attempts FROM jobs WHERE status = '{PENDING}' "
+                f"OR (status = '{LEASED}' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                f"UPDATE jobs SET status = '{LEASED}', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now + self.lease_seconds, row[0]),
+            )
+        return Job(row[0], row[1], row[2], row[3] + 1)
+
+    def renew(self, job: Job, worker: str) -> bool:
+        """
+        Extend a job's lease.
+
+        Returns:
+            Whether the worker still held the job
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? "
+                f"WHERE id = ? AND worker = ? AND status = '{LEASED}'",
+                (time.time() + self.lease_seconds, job.id, worker),
+            )
+        return cursor.rowcount == 1
+
+    @contextlib.contextmanager
+    def keep_alive(self, job: Job, worker: str) -> Iterator[None]:
+        """Renew a job's lease in the background while the block runs."""
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.renew(job, worker):
+                    return
+
+        thread = threading.Thread(target=run, name=f"lease-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(
+        self, job: Job, worker: str, rows: list[dict], metadata: Optional[dict] = None
+    ) -> bool:
+        """
+        Store a job's flashcards.
+
+        A job whose lease expired can still be completed as long as no other
+        worker finished it first, so slow workers don't waste their results.
+
+        Args:
+            job: Job leased by this worker
+            worker: Name of the worker
+            rows: JSON-serializable flashcard rows
+            metadata: Optional JSON-serializable details of how the flashcards were
+                generated (e.g. the topic's triage decision), returned by collect
+
+        Returns:
+            Whether the results were stored (False if the job was already finished)
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = '{DONE}', worker = ?, result = ?, metadata = ?, "
+                f"error = NULL WHERE id = ? AND status IN ('{PENDING}', '{LEASED}')",
+                (worker, json.dumps(rows), json.dumps(metadata or {}), job.id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job: Job, worker: str, error: str, retry: bool = True) -> None:
+        """
+        Give a job back after an error.
+
+        Args:
+            job: Job leased by this worker
+            worker: Name of the worker
+            error: Description of the error
+            retry: Whether another worker may try the job again (if it has attempts
+                left); if False, the attempt isn't counted, e.g. when the worker is
+                stopping for reasons unrelated to the job
+        """
+        with self._transaction() as conn:
+            if retry:
+                conn.execute(
+                    f"UPDATE jobs SET status = CASE WHEN attempts >= ? THEN '{FAILED}' "
+                    f"ELSE '{PENDING}' END, error = ?, lease_expires = NULL "
+                    f"WHERE id = ? AND worker = ? AND status = '{LEASED}'",
+                    (self.max_attempts, error, job.id, worker),
+                )
+            else:
+                conn.execute(
+                    f"UPDATE jobs SET status = '{PENDING}', attempts = attempts - 1, "
+                    f"error = ?, lease_expires = NULL "
+                    f"WHERE id = ? AND worker = ? AND status = '{LEASED}'",
+                    (error, job.id, worker),
+                )
+
+    def collect(self) -> list[tuple[Job, list[dict], dict]]:
+        """
+        Take the results of the jobs finished since the last call.
+
+        Returns:
+            List of (job, flashcard rows, metadata) tuples
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT id, category, topic_number, attempts, result, metadata FROM jobs "
+                f"WHERE status = '{DONE}' ORDER BY id"
+            ).fetchall()
+            conn.executemany(
+                f"UPDATE jobs SET status = '{COLLECTED}' WHERE id = ?", [(row[0],) for row in rows]
+            )
+        return [(Job(*row[:4]), json.loads(row[4]), json.loads(row[5] or "{}")) for row in rows]
+
+    def failed(self) -> list[tuple[Job, str]]:
+        """Get the jobs that were given up on, with their last error."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, category, topic_number, attempts, error FROM jobs "
+                f"WHERE status = '{FAILED}' ORDER BY id"
+            ).fetchall()
+        return [(Job(*row[:4]), row[4] or "") for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (PENDING, LEASED, DONE, COLLECTED, FAILED)} | dict(rows)
+
+    def drained(self) -> bool:
+        """Whether all jobs were queued (see mark_all_queued) and none are left for workers."""
+        if self._meta("all_queued") is None:
+            return False
+        counts = self.counts()
+        return counts[PENDING] == counts[LEASED] == 0
+
+    def record_usage(self, records: Iterable[dict]) -> None:
+        """
+        Record the token usage of a worker's requests.
+
+        Args:
+            records: Usage records with model, input_tokens and output_tokens (see
+                anki_qb.llm.UsageTracker)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO usage (time, model, input_tokens, output_tokens) VALUES (?, ?, ?, ?)",
+                [(now, r["model"], r["input_tokens"], r["output_tokens"]) for r in records],
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueueUsage:
+    """
+    Usage of all workers of a run, as recorded in a JobQueue.
+
+    Stands in for a UsageTracker in anki_qb.budget.Budget, so that the limits of
+    a distributed run apply to all of its workers together.
+
+    Example:
+        budget = Budget(QueueUsage(queue), max_cost=5.0, started=queue.run_started())
+    """
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+
+    @property
+    def records(self) -> list[dict]:
+        """Usage records of the requests made since the run started."""
+        queue = self.queue
+        started = queue.run_started() or 0
+        with queue._lock:
+            rows = queue._conn.execute(
+                "SELECT model, input_tokens, output_tokens FROM usage WHERE time >= ? ORDER BY id",
+                (started,),
+            ).fetchall()
+        return [
+            {"model": model, "input_tokens": input_tokens, "output_tokens": output_tokens}
+            for model, input_tokens, output_tokens in rows
+        ]
@@ -1,37 +1,208 @@
 """LLM interaction functions for flashcard generation using the llm package."""
 
-import functools
-from typing import Optional
+import asyncio
+import contextlib
+import hashlib
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional
 
 import llm
+import pandas as pd
 
-from anki_qb.prompts import PROMPT_SANITIZE_TERM
-from anki_qb.search import search_bonuses, search_tossups
+from anki_qb.cache import SearchCache
+from anki_qb.dedup import collapse_duplicates
+from anki_qb.embeddings import DEFAULT_TOP_K, EmbeddingIndex, semantic_search
+from anki_qb.prompts import PROMPT_SANITIZE_TERM, PROMPT_STRUCTURED
+from anki_qb.answers import AnswerIndex
+from anki_qb.search import MetadataIndex, search_answers, search_bonuses, search_tossups
 from anki_qb.formatters import format_qa
+from anki_qb.frequency import TermFrequencies
+from anki_qb.structured import FLASHCARD_COLUMNS, JSONArrayParser, flashcard_row, flashcard_schema
+from anki_qb.tables import MarkdownTableParser
 
 
 # Default model to use if not specified
 DEFAULT_MODEL = "gpt-4o-mini"
 
+# Suggested limit on concurrent async requests (see ask_llm_async)
+DEFAULT_CONCURRENCY = 16
 
-@functools.cache
-def sanitize_term(term: str, model: Optional[str] = None) -> str:
+# Sanitized terms by (term, model), shared by all threads and event loops
+_sanitized_terms: dict[tuple[str, str], str] = {}
+
+
+class ModelRegistry:
+    """
+    Resolves llm models once and keeps the instances for reuse.
+
+    llm.get_model goes through plugin discovery and alias resolution on every
+    call, and providers can keep clients on the model instance, so holding on to
+    the instances avoids both. The registry is safe to use from multiple threads.
+    Async models are kept separately from sync ones; call clear() after an event
+    loop closes if a provider's async clients are tied to the loop.
+
+    Example:
+        registry = ModelRegistry()
+        model = registry.get("gpt-4o-mini")
+        ...
+        registry.clear()
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str] = None) -> llm.Model:
+        """Get the sync model instance for a model name or alias (defaults to DEFAULT_MODEL)."""
+        return self._get(name or DEFAULT_MODEL, is_async=False)
+
+    def get_async(self, name: Optional[str] = None) -> llm.AsyncModel:
+        """Get the async model instance for a model name or alias (defaults to DEFAULT_MODEL)."""
+        return self._get(name or DEFAULT_MODEL, is_async=True)
+
+    def clear(self) -> None:
+        """Drop all model instances; they are resolved again on next use."""
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def _get(self, name: str, is_async: bool):
+        key = (name, is_async)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = llm.get_async_model(name) if is_async else llm.get_model(name)
+                    self._models[key] = model
+        return model
+
+
+# Keys that providers use for the number of input tokens served from their prompt cache
+_CACHED_TOKEN_KEYS = ("cached_tokens", "cache_read_input_tokens", "cachedContentTokenCount")
+
+
+def _cached_tokens(details) -> int:
+    """Find the number of cached input tokens in a provider's token details."""
+    if not isinstance(details, dict):
+        return 0
+    for key in _CACHED_TOKEN_KEYS:
+        if isinstance(details.get(key), int):
+            return details[key]
+    return sum(_cached_tokens(value) for value in details.values())
+
+
+class UsageTracker:
+    """
+    Records the token usage of each LLM request.
+
+    Cached tokens are input tokens the provider served from its prompt cache,
+    which applies when requests share a prefix such as the system prompt (see
+    anki_qb.formatters.split_prompt_template). Counts are None when the
+    provider doesn't report them.
+    """
+
+    def __init__(self):
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, model: str, usage) -> dict:
+        """
+        Record the usage of one request.
+
+        Args:
+            model: Model name the request was sent to
+            usage: llm Usage for the response
+
+        Returns:
+            The recorded dict with model, input_tokens, output_tokens and cached_tokens
+        """
+        entry = {
+            "model": model,
+            "input_tokens": usage.input,
+            "output_tokens": usage.output,
+            "cached_tokens": _cached_tokens(usage.details),
+        }
+        with self._lock:
+            self.records.append(entry)
+        return entry
+
+    def summary(self) -> dict:
+        """
+        Total usage over all recorded requests.
+
+        Returns:
+            Dictionary with requests, input_tokens, output_tokens, cached_tokens and
+            cache_hit_rate (fraction of input tokens that were cached)
+        """
+        with self._lock:
+            records = list(self.records)
+        totals = {
+            key: sum(r[key] or 0 for r in records)
+            for key in ["input_tokens", "output_tokens", "cached_tokens"]
+        }
+        rate = totals["cached_tokens"] / totals["input_tokens"] if totals["input_tokens"] else 0.0
+        return {"requests": len(records), **totals, "cache_hit_rate": rate}
+
+    def clear(self) -> None:
+        """Forget all recorded requests."""
+        with self._lock:
+            self.records.clear()
+
+
+# Registry and usage tracker used by the functions in this module
+models = ModelRegistry()
+usage = UsageTracker()
+
+
+def _cached_term(term: str, model: Optional[str], cache: Optional[SearchCache]) -> Optional[str]:
+    """Look up a sanitized term in memory, then in the persistent cache."""
+    key = (term, model or DEFAULT_MODEL)
+    if key not in _sanitized_terms and cache is not None:
+        sanitized = cache.get_term(*key)
+        if sanitized is not None:
+            _sanitized_terms[key] = sanitized
+    return _sanitized_terms.get(key)
+
+
+def _store_term(term: str, model: Optional[str], cache: Optional[SearchCache], sanitized: str) -> str:
+    key = (term, model or DEFAULT_MODEL)
+    _sanitized_terms[key] = sanitized
+    if cache is not None:
+        cache.put_term(*key, sanitized)
+    return sanitized
+
+
+def sanitize_term(term: str, model: Optional[str] = None, cache: Optional[SearchCache] = None) -> str:
     """
     Sanitize a search term using LLM to increase likelihood of matching in database.
 
+    Results are memoized in-process and, if a cache is given, stored in it so
+    later runs don't ask the model again.
+
     Args:
         term: Original search term (may include dates, etc.)
         model: LLM model to use (defaults to DEFAULT_MODEL)
+        cache: Optional search cache to look up and store sanitized terms in
 
     Returns:
         Sanitized search term
     """
-    model_obj = llm.get_model(model or DEFAULT_MODEL)
+    sanitized = _cached_term(term, model, cache)
+    if sanitized is not None:
+        return sanitized
+    model_obj = models.get(model)
     response = model_obj.prompt(PROMPT_SANITIZE_TERM.format(term=term))
-    return response.text().strip()
+    text = response.text().strip()
+    usage.record(model_obj.model_id, response.usage())
+    return _store_term(term, model, cache, text)
 
 
-def ask_llm(prompt: str, model: Optional[str] = None) -> str:
+def ask_llm(prompt: str, model: Optional[str] = None, system: Optional[str] = None) -> str:
     """
     Ask the LLM a question using the specified model.
 
@@ -39,16 +210,293 @@ def ask_llm(prompt: str, model: Optional[str] = None) -> str:
         prompt: The prompt to send to the LLM
         model: Model name to use (e.g., "gpt-4", "claude-3-5-sonnet", "gemini-2.0-flash")
                If None, uses DEFAULT_MODEL
+        system: Optional system prompt; keeping it identical across requests lets
+            providers cache it
+
+    Returns:
+        LLM response text
+    """
+    model_obj = models.get(model)
+    response = model_obj.prompt(prompt, system=system)
+    text = response.text()
+    usage.record(model_obj.model_id, response.usage())
+    return text
+
+
+async def ask_llm_async(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    system: Optional[str] = None,
+) -> str:
+    """
+    Ask the LLM a question using the llm package's async model API.
+
+    Requests are coroutines rather than threads, so thousands can be in flight at
+    once; pass a shared semaphore to bound how many actually hit the API. Timing
+    out or cancelling the calling task cancels the underlying HTTP request.
+
+    Example:
+        semaphore = asyncio.Semaphore(DEFAULT_CONCURRENCY)
+        answers = await asyncio.gather(*(ask_llm_async(p, semaphore=semaphore) for p in prompts))
+
+    Args:
+        prompt: The prompt to send to the LLM
+        model: Model name to use (defaults to DEFAULT_MODEL); must have an async implementation
+        timeout: Maximum number of seconds for the response (not counting time spent
+            waiting for the semaphore), or None for no limit
+        semaphore: Optional semaphore limiting concurrent requests
+        system: Optional system prompt (see ask_llm)
 
     Returns:
         LLM response text
+
+    Raises:
+        TimeoutError: If the response doesn't finish within the timeout
+    """
+    model_obj = models.get_async(model)
+    async with semaphore or contextlib.nullcontext():
+        response = model_obj.prompt(prompt, system=system)
+        try:
+            text = await asyncio.wait_for(response.text(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"LLM response not finished after {timeout}s") from None
+    usage.record(model_obj.model_id, await response.usage())
+    return text
+
+
+async def sanitize_term_async(
+    term: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache: Optional[SearchCache] = None,
+) -> str:
+    """
+    Async version of sanitize_term (see ask_llm_async for the arguments).
+
+    Args:
+        term: Original search term (may include dates, etc.)
+        model: LLM model to use (defaults to DEFAULT_MODEL)
+        timeout: Maximum number of seconds for the response, or None for no limit
+        semaphore: Optional semaphore limiting concurrent requests
+        cache: Optional search cache to look up and store sanitized terms in
+
+    Returns:
+        Sanitized search term
     """
-    model_obj = llm.get_model(model or DEFAULT_MODEL)
-    response = model_obj.prompt(prompt)
-    return response.text()
+    sanitized = _cached_term(term, model, cache)
+    if sanitized is not None:
+        return sanitized
+    response = await ask_llm_async(
+        PROMPT_SANITIZE_TERM.format(term=term), model=model, timeout=timeout, semaphore=semaphore
+    )
+    return _store_term(term, model, cache, response.strip())
 
 
-def get_qbr_data(ygk_data: dict[str, str], bonuses_df, tossups_df, model: Optional[str] = None) -> dict[str, str]:
+def stream_llm(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    system: Optional[str] = None,
+    schema: Optional[dict] = None,
+) -> Iterator[str]:
+    """
+    Stream the LLM response to a prompt chunk by chunk.
+
+    Usage is recorded once the response completes.
+
+    Args:
+        prompt: The prompt to send to the LLM
+        model: Model name to use (defaults to DEFAULT_MODEL)
+        timeout: Maximum number of seconds for the whole response, or None for no limit
+        system: Optional system prompt (see ask_llm)
+        schema: Optional JSON schema the response must follow (the model must
+            support schemas)
+
+    Yields:
+        Chunks of response text as they arrive
+
+    Raises:
+        TimeoutError: If the response doesn't finish within the timeout. The request
+            itself can't be cancelled, so it finishes in a background thread.
+    """
+    model_obj = models.get(model)
+    kwargs = {"schema": schema} if schema is not None else {}
+    response = model_obj.prompt(prompt, system=system, **kwargs)
+    if timeout is None:
+        yield from response
+        usage.record(model_obj.model_id, response.usage())
+        return
+
+    done = object()
+    chunks = queue.Queue()
+
+    def produce():
+        try:
+            for chunk in response:
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        else:
+            chunks.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            chunk = chunks.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            raise TimeoutError(f"LLM response not finished after {timeout}s") from None
+        if chunk is done:
+            usage.record(model_obj.model_id, response.usage())
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+
+def ask_llm_stream(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    on_row: Optional[Callable[[dict[str, str]], None]] = None,
+    system: Optional[str] = None,
+) -> tuple[pd.DataFrame, bool]:
+    """
+    Ask the LLM for a Markdown table, parsing rows as the response streams in.
+
+    If the timeout passes mid-stream, the rows received so far are kept.
+
+    Args:
+        prompt: The prompt to send to the LLM
+        model: Model name to use (defaults to DEFAULT_MODEL)
+        timeout: Maximum number of seconds for the whole response, or None for no limit
+        on_row: Called with each row (as a column -> cell dict) as soon as it is complete
+        system: Optional system prompt (see ask_llm)
+
+    Returns:
+        Tuple of (DataFrame of the rows received, whether the response completed)
+
+    Raises:
+        TimeoutError: If the timeout passes before the table header arrives
+        ValueError: If the complete response contains no Markdown table
+    """
+    parser = MarkdownTableParser()
+
+    def emit(rows):
+        if on_row is not None:
+            for row in rows:
+                on_row(dict(zip(parser.header, row)))
+
+    complete = True
+    try:
+        for chunk in stream_llm(prompt, model=model, timeout=timeout, system=system):
+            emit(parser.feed(chunk))
+            if parser.done:
+                break
+    except TimeoutError:
+        if parser.header is None:
+            raise
+        complete = False
+    else:
+        emit(parser.close())
+
+    if parser.header is None:
+        raise ValueError("No Markdown table found in LLM response")
+    return pd.DataFrame(parser.rows, columns=parser.header), complete
+
+
+def ask_llm_structured(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    on_row: Optional[Callable[[dict[str, str]], None]] = None,
+    system: Optional[str] = None,
+    batched: bool = False,
+) -> tuple[pd.DataFrame, bool]:
+    """
+    Ask the LLM for flashcards as JSON matching a schema, parsing them as they stream in.
+
+    Unlike a Markdown table, schema-constrained output can't come back malformed,
+    so topics aren't lost to parse failures. Models without schema support, and
+    responses that ignore the schema but contain a Markdown table, fall back to
+    the table parser (see ask_llm_stream).
+
+    Args:
+        prompt: The prompt to send to the LLM (instructions to return JSON are appended)
+        model: Model name to use (defaults to DEFAULT_MODEL)
+        timeout: Maximum number of seconds for the whole response, or None for no limit
+        on_row: Called with each flashcard (as a column -> cell dict) as soon as it is complete
+        system: Optional system prompt (see ask_llm)
+        batched: Whether the prompt is a batch of topics (see anki_qb.formatters.format_batch_prompt),
+            in which case each flashcard has a Topic
+
+    Returns:
+        Tuple of (DataFrame of the flashcards received, whether the response completed)
+
+    Raises:
+        TimeoutError: If the timeout passes before any flashcard arrives
+        ValueError: If the complete response contains neither flashcards nor a Markdown table
+    """
+    if not models.get(model).supports_schema:
+        return ask_llm_stream(prompt, model=model, timeout=timeout, on_row=on_row, system=system)
+
+    parser = JSONArrayParser()
+    text = []
+    rows = []
+    complete = True
+    try:
+        for chunk in stream_llm(
+            f"{prompt}\n\n{PROMPT_STRUCTURED}",
+            model=model,
+            timeout=timeout,
+            system=system,
+            schema=flashcard_schema(batched),
+        ):
+            text.append(chunk)
+            for item in parser.feed(chunk):
+                row = flashcard_row(item)
+                if row is not None:
+                    rows.append(row)
+                    if on_row is not None:
+                        on_row(row)
+    except TimeoutError:
+        if not rows:
+            raise
+        complete = False
+
+    if not rows and complete and not parser.done:
+        table = MarkdownTableParser()
+        table.feed("".join(text))
+        table.close()
+        if table.header is None:
+            raise ValueError("No flashcards or Markdown table found in LLM response")
+        rows = [dict(zip(table.header, row)) for row in table.rows]
+        if on_row is not None:
+            for row in rows:
+                on_row(row)
+        return pd.DataFrame(rows, columns=table.header), complete
+    return pd.DataFrame(rows, columns=None if rows else list(FLASHCARD_COLUMNS.values())), complete
+
+
+def get_qbr_data(
+    ygk_data: dict[str, str],
+    bonuses_df,
+    tossups_df,
+    model: Optional[str] = None,
+    cache: Optional[SearchCache] = None,
+    term_frequencies: Optional[TermFrequencies] = None,
+    filters: Optional[dict] = None,
+    bonuses_index: Optional[MetadataIndex] = None,
+    tossups_index: Optional[MetadataIndex] = None,
+    bonuses_embeddings: Optional[EmbeddingIndex] = None,
+    tossups_embeddings: Optional[EmbeddingIndex] = None,
+    semantic_k: int = DEFAULT_TOP_K,
+    bonuses_answers: Optional[AnswerIndex] = None,
+    tossups_answers: Optional[AnswerIndex] = None,
+) -> dict[str, str]:
     """
     Get QBReader data (tossups and bonuses) for a given YGK article data.
 
@@ -57,17 +505,196 @@ def get_qbr_data(ygk_data: dict[str, str], bonuses_df, tossups_df, model: Option
         bonuses_df: DataFrame with bonus questions
         tossups_df: DataFrame with tossup questions
         model: LLM model to use for term sanitization
+        cache: Optional search cache; on a hit the search and formatting are skipped.
+            Sanitized terms are also cached in it (see sanitize_term).
+        term_frequencies: Optional corpus frequencies of the topic's label and terms
+        filters: Optional metadata filters (difficulty, year, category) applied before the
+            text search (see search_tossups). Include them in the cache's fingerprint.
+        bonuses_index: Precomputed MetadataIndex for bonuses_df
+        tossups_index: Precomputed MetadataIndex for tossups_df
+        bonuses_embeddings: Optional EmbeddingIndex for bonuses_df; if given, the
+            semantic_k bonuses most similar to the topic's label and text are added
+            to those found by the text search (see anki_qb.embeddings)
+        tossups_embeddings: Optional EmbeddingIndex for tossups_df, used likewise
+        semantic_k: Number of questions to retrieve by similarity per corpus
+        bonuses_answers: Optional AnswerIndex for bonuses_df; if given, bonuses whose
+            answer is exactly the sanitized term are put first (see anki_qb.search.search_answers)
+        tossups_answers: Optional AnswerIndex for tossups_df, used likewise
+
+    If the DataFrames have a `cluster_id` column (see anki_qb.corpus), duplicate
+    questions are collapsed to one representative each. The num_related_* counts
+    still include the duplicates.
+
+    Returns:
+        Dictionary with num_related_bonuses, num_related_tossups, bonuses, tossups,
+        bonus_texts and tossup_texts (the individual formatted questions), sanitized_term,
+        and term_frequencies (formatted, if term_frequencies was given)
+    """
+    term = sanitize_term(ygk_data["label"], model=model, cache=cache)
+    return _related_questions(
+        term, ygk_data, bonuses_df, tossups_df, cache=cache, term_frequencies=term_frequencies,
+        filters=filters, bonuses_index=bonuses_index, tossups_index=tossups_index,
+        bonuses_embeddings=bonuses_embeddings, tossups_embeddings=tossups_embeddings,
+        semantic_k=semantic_k, bonuses_answers=bonuses_answers, tossups_answers=tossups_answers,
+    )
+
+
+async def get_qbr_data_async(
+    ygk_data: dict[str, str],
+    bonuses_df,
+    tossups_df,
+    model: Optional[str] = None,
+    cache: Optional[SearchCache] = None,
+    term_frequencies: Optional[TermFrequencies] = None,
+    filters: Optional[dict] = None,
+    bonuses_index: Optional[MetadataIndex] = None,
+    tossups_index: Optional[MetadataIndex] = None,
+    bonuses_embeddings: Optional[EmbeddingIndex] = None,
+    tossups_embeddings: Optional[EmbeddingIndex] = None,
+    semantic_k: int = DEFAULT_TOP_K,
+    bonuses_answers: Optional[AnswerIndex] = None,
+    tossups_answers: Optional[AnswerIndex] = None,
+    timeout: Optional[float] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> dict[str, str]:
+    """
+    Async version of get_qbr_data.
+
+    The term is sanitized with sanitize_term_async, and the corpus search runs in
+    a worker thread so it doesn't block the event loop.
+
+    Args:
+        ygk_data, bonuses_df, tossups_df, model, cache, term_frequencies, filters,
+            bonuses_index, tossups_index, bonuses_embeddings, tossups_embeddings,
+            semantic_k, bonuses_answers, tossups_answers: As for get_qbr_data
+        timeout: Maximum number of seconds for the sanitization request, or None for no limit
+        semaphore: Optional semaphore limiting concurrent LLM requests
 
     Returns:
-        Dictionary with num_related_bonuses, num_related_tossups, bonuses, tossups, and sanitized_term
-    """
-    term = sanitize_term(ygk_data["label"], model=model)
-    bonuses = search_bonuses(term, bonuses_df)
-    tossups = search_tossups(term, tossups_df)
-    return {
-        "num_related_bonuses": len(bonuses),
-        "num_related_tossups": len(tossups),
-        "bonuses": "\n\n".join(format_qa(bonuses)),
-        "tossups": "\n\n".join(format_qa(tossups)),
+        Dictionary as returned by get_qbr_data
+    """
+    term = await sanitize_term_async(
+        ygk_data["label"], model=model, timeout=timeout, semaphore=semaphore, cache=cache
+    )
+    return await asyncio.to_thread(
+        _related_questions,
+        term, ygk_data, bonuses_df, tossups_df, cache=cache, term_frequencies=term_frequencies,
+        filters=filters, bonuses_index=bonuses_index, tossups_index=tossups_index,
+        bonuses_embeddings=bonuses_embeddings, tossups_embeddings=tossups_embeddings,
+        semantic_k=semantic_k, bonuses_answers=bonuses_answers, tossups_answers=tossups_answers,
+    )
+
+
+def _with_similar(
+    found: pd.DataFrame,
+    query: str,
+    df: pd.DataFrame,
+    embeddings: Optional[EmbeddingIndex],
+    k: int,
+    index: Optional[MetadataIndex],
+    filters: dict,
+) -> pd.DataFrame:
+    """Append the questions most similar to a query that the text search didn't find."""
+    if embeddings is None or k <= 0:
+        return found
+    similar = semantic_search(query, df, embeddings, k=k, index=index, **filters)
+    similar = similar[~similar.index.isin(found.index)].drop(columns=["similarity"])
+    return pd.concat([found, similar]) if len(similar) else found
+
+
+def _with_exact_answers(
+    found: pd.DataFrame,
+    term: str,
+    df: pd.DataFrame,
+    answers: Optional[AnswerIndex],
+    index: Optional[MetadataIndex],
+    filters: dict,
+) -> pd.DataFrame:
+    """Put the questions whose answer is exactly the term first, adding any the text search missed."""
+    if answers is None:
+        return found
+    exact = search_answers(term, df, answers, index=index, **filters)
+    if not len(exact):
+        return found
+    return pd.concat([exact, found[~found.index.isin(exact.index)]])
+
+
+def _search_key(
+    term: str, query: Optional[str], embeddings: list[Optional[EmbeddingIndex]], k: int
+) -> str:
+    """
+    Build the search cache key for a term.
+
+    Text search results depend only on the term, but semantic hits also depend on
+    the query text (the topic's label and description), the embedding models and k,
+    so those are added to the key when semantic search is on.
+    """
+    if query is None:
+        return term
+    embedding_models = ",".join(e.model if e is not None else "-" for e in embeddings)
+    digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+    return f"{term}|semantic:{embedding_models}:k={k}:{digest}"
+
+
+def _related_questions(
+    term: str,
+    ygk_data: dict[str, str],
+    bonuses_df,
+    tossups_df,
+    cache: Optional[SearchCache] = None,
+    term_frequencies: Optional[TermFrequencies] = None,
+    filters: Optional[dict] = None,
+    bonuses_index: Optional[MetadataIndex] = None,
+    tossups_index: Optional[MetadataIndex] = None,
+    bonuses_embeddings: Optional[EmbeddingIndex] = None,
+    tossups_embeddings: Optional[EmbeddingIndex] = None,
+    semantic_k: int = DEFAULT_TOP_K,
+    bonuses_answers: Optional[AnswerIndex] = None,
+    tossups_answers: Optional[AnswerIndex] = None,
+) -> dict[str, str]:
+    """Search for and format the questions related to a sanitized term (see get_qbr_data)."""
+    semantic = bonuses_embeddings is not None or tossups_embeddings is not None
+    query = f"{ygk_data['label']}: {ygk_data['text']}" if semantic else None
+    key = _search_key(term, query, [bonuses_embeddings, tossups_embeddings], semantic_k)
+    found = cache.get(key) if cache is not None else None
+    if found is None:
+        filters = filters or {}
+        bonuses = search_bonuses(term, bonuses_df, index=bonuses_index, **filters)
+        tossups = search_tossups(term, tossups_df, index=tossups_index, **filters)
+        bonuses = _with_exact_answers(bonuses, term, bonuses_df, bonuses_answers, bonuses_index, filters)
+        tossups = _with_exact_answers(tossups, term, tossups_df, tossups_answers, tossups_index, filters)
+        if semantic:
+            bonuses = _with_similar(
+                bonuses, query, bonuses_df, bonuses_embeddings, semantic_k, bonuses_index, filters
+            )
+            tossups = _with_similar(
+                tossups, query, tossups_df, tossups_embeddings, semantic_k, tossups_index, filters
+            )
+        found = {
+            "num_bonuses": len(bonuses),
+            "num_tossups": len(tossups),
+        }
+        if "cluster_id" in bonuses.columns:
+            bonuses = collapse_duplicates(bonuses)
+        if "cluster_id" in tossups.columns:
+            tossups = collapse_duplicates(tossups)
+        found |= {
+            "bonus_ids": bonuses.index.tolist(),
+            "tossup_ids": tossups.index.tolist(),
+            "bonus_texts": format_qa(bonuses),
+            "tossup_texts": format_qa(tossups),
+        }
+        if cache is not None:
+            cache.put(key, found)
+    ret = {
+        "num_related_bonuses": found["num_bonuses"],
+        "num_related_tossups": found["num_tossups"],
+        "bonuses": "\n\n".join(found["bonus_texts"]),
+        "tossups": "\n\n".join(found["tossup_texts"]),
+        "bonus_texts": found["bonus_texts"],
+        "tossup_texts": found["tossup_texts"],
         "sanitized_term": term,
     }
+    if term_frequencies is not None:
+        ret["term_frequencies"] = term_frequencies.format(ygk_data["article"], ygk_data["label"])
+    return ret
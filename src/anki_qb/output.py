@@ -0,0 +1,259 @@
+"""Background writing of generated flashcards to per-category output files."""
+
+import csv
+import json
+import math
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from anki_qb.apkg import DEFAULT_DECK_PREFIX, export_apkg
+
+
+def _is_missing(value) -> bool:
+    """Whether a cell value is missing (None or NaN)."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class FlashcardWriter:
+    """
+    Writes flashcards on a background thread as topics finish.
+
+    Rows for a category are appended (and flushed) to
+    `flashcards_<category>.partial.csv` as they are written, so memory use stays
+    flat and a crash keeps everything generated so far. When the category is
+    finished the partial file is atomically renamed to `flashcards_<category>.csv`.
+    In apkg format, finished categories are instead added to `flashcards.apkg` all
+    at once when the writer is closed (rewriting the package only once), then their
+    partial files are removed and they are recorded as finished.
+
+    The columns of a category's file are those of the rows written to it so far, in
+    order of appearance; rows are padded with empty cells, and when a row brings a
+    new column, the partial file is rewritten with the wider header. Missing
+    values (None or NaN) are written as empty cells.
+
+    Progress is recorded in a state file in the output directory: the topics
+    marked done (see mark_done) and the categories finished. Since the writer
+    thread updates it after writing the rows before them, it only lists topics
+    whose flashcards are on disk. With resume=True, that state is loaded and
+    rows are appended to existing partial files, so an interrupted run can be
+    continued.
+
+    Example:
+        with FlashcardWriter(Path("output")) as writer:
+            writer.write("poets", flashcards_df)
+            writer.finish("poets")
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        format: str = "csv",
+        deck_prefix: str = DEFAULT_DECK_PREFIX,
+        max_pending: int = 1024,
+        resume: bool = False,
+    ):
+        """
+        Start the writer thread.
+
+        Args:
+            output_dir: Directory for the output files
+            format: "csv" for one CSV per category, or "apkg" for a single Anki package
+            deck_prefix: Parent deck name in apkg format
+            max_pending: Maximum number of queued writes before write() blocks
+            resume: Continue from the state file and partial files of an earlier run
+                instead of starting over
+        """
+        if format not in ("csv", "apkg"):
+            raise ValueError(f"Unknown output format: {format}")
+        self.output_dir = Path(output_dir)
+        self.format = format
+        self.deck_prefix = deck_prefix
+        self.apkg_stats = {"added": 0, "updated": 0, "unchanged": 0}
+        self.errors: list[str] = []
+        self.resume = resume
+        self.state = {"topics": {}, "finished": []}
+        # (category, partial file) pairs waiting to be added to the Anki package
+        self._apkg_pending: list[tuple[str, Path]] = []
+        if resume and self.state_path.exists():
+            self.state = json.loads(self.state_path.read_text())
+        self._files = {}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="flashcard-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def state_path(self) -> Path:
+        """Path of the file recording which topics and categories are done."""
+        return self.output_dir / ".flashcards_state.json"
+
+    def done_topics(self, category: str) -> set[int]:
+        """Topic numbers of a category whose flashcards were written by an earlier run."""
+        return set(self.state["topics"].get(category, []))
+
+    def is_finished(self, category: str) -> bool:
+        """Whether a category was finished by an earlier run."""
+        return category in self.state["finished"]
+
+    def partial_path(self, category: str) -> Path:
+        """Path that a category's rows are appended to while it is in progress."""
+        return self.output_dir / f"flashcards_{category}.partial.csv"
+
+    def output_path(self, category: Optional[str] = None) -> Path:
+        """Final output path for a category (or the Anki package in apkg format)."""
+        if self.format == "apkg":
+            return self.output_dir / "flashcards.apkg"
+        return self.output_dir / f"flashcards_{category}.csv"
+
+    def write(self, category: str, rows) -> None:
+        """
+        Queue flashcards to be appended to a category's output.
+
+        Args:
+            category: YGK category
+            rows: DataFrame or list of column -> value dicts
+        """
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.astype(object).where(rows.notna(), "").to_dict("records")
+        else:
+            rows = [
+                {key: "" if _is_missing(value) else value for key, value in row.items()} for row in rows
+            ]
+        self._queue.put(("write", category, rows))
+
+    def mark_done(self, category: str, topic_number: int) -> None:
+        """Queue recording a topic as done, once the rows written before this call are on disk."""
+        self._queue.put(("done", category, topic_number))
+
+    def finish(self, category: str) -> None:
+        """Queue the completion of a category, moving its output into place."""
+        self._queue.put(("finish", category, None))
+
+    def close(self) -> None:
+        """
+        Wait for all queued writes to complete and stop the writer thread.
+
+        Raises:
+            RuntimeError: If any write failed
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self.errors:
+            raise RuntimeError("Failed to write flashcards: " + "; ".join(self.errors))
+
+    def __enter__(self) -> "FlashcardWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            action, category, rows = item
+            try:
+                if action == "write":
+                    self._append(category, rows)
+                elif action == "done":
+                    self.state["topics"].setdefault(category, []).append(rows)
+                    self._save_state()
+                else:
+                    self._finish(category)
+            except Exception as e:
+                self.errors.append(f"{category}: {e}")
+        for f, _ in self._files.values():
+            f.close()
+        if self._apkg_pending:
+            try:
+                self._export_apkg()
+            except Exception as e:
+                self.errors.append(f"{self.output_path()}: {e}")
+
+    def _append(self, category: str, rows: list[dict]) -> None:
+        if not rows:
+            return
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        if category not in self._files:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            partial = self.partial_path(category)
+            if self.resume and partial.exists() and partial.stat().st_size:
+                # Continue the partial file of an earlier run, starting from its columns
+                with open(partial, newline="") as f:
+                    fieldnames = next(csv.reader(f))
+                f = open(partial, "a", newline="")
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+            else:
+                # Start fresh, replacing any partial file left by an earlier run
+                f = open(partial, "w", newline="")
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+            self._files[category] = (f, writer)
+        f, writer = self._files[category]
+        new_columns = [column for column in columns if column not in writer.fieldnames]
+        if new_columns:
+            f, writer = self._extend_header(category, list(writer.fieldnames) + new_columns)
+        writer.writerows(rows)
+        f.flush()
+
+    def _extend_header(self, category: str, fieldnames: list[str]) -> tuple:
+        """Rewrite a category's partial file with more columns, leaving them empty in earlier rows."""
+        f, _ = self._files.pop(category)
+        f.close()
+        partial = self.partial_path(category)
+        tmp_path = partial.with_name(partial.name + ".tmp")
+        with open(partial, newline="") as src, open(tmp_path, "w", newline="") as dst:
+            writer = csv.DictWriter(dst, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(csv.DictReader(src))
+        os.replace(tmp_path, partial)
+        f = open(partial, "a", newline="")
+        self._files[category] = (f, csv.DictWriter(f, fieldnames=fieldnames))
+        return self._files[category]
+
+    def _finish(self, category: str) -> None:
+        partial = self.partial_path(category)
+        if category in self._files:
+            f, _ = self._files.pop(category)
+            f.close()
+        elif not (self.resume and partial.exists()):
+            # The category has no rows
+            partial = None
+        # Otherwise all of the category's rows were written by the earlier run
+        if partial is not None and self.format == "apkg":
+            self._apkg_pending.append((category, partial))
+            return
+        if partial is not None:
+            os.replace(partial, self.output_path(category))
+        self._mark_finished([category])
+
+    def _mark_finished(self, categories: list[str]) -> None:
+        for category in categories:
+            self.state["topics"].pop(category, None)
+            self.state["finished"].append(category)
+        self._save_state()
+
+    def _save_state(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.state))
+        os.replace(tmp_path, self.state_path)
+
+    def _export_apkg(self) -> None:
+        """Add the finished categories' flashcards to the Anki package in a single update."""
+        flashcards = pd.concat(
+            [pd.read_csv(partial, dtype=str, keep_default_na=False) for _, partial in self._apkg_pending],
+            ignore_index=True,
+        )
+        stats = export_apkg(self.output_path(), flashcards, deck_prefix=self.deck_prefix)
+        for key, value in stats.items():
+            self.apkg_stats[key] += value
+        for _, partial in self._apkg_pending:
+            partial.unlink()
+        self._mark_finished([category for category, _ in self._apkg_pending])
+        self._apkg_pending = []
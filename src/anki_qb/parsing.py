@@ -1,5 +1,7 @@
 """Parsing functions for NAQT 'You Gotta Know' articles."""
 
+from typing import Optional
+
 import lxml.html
 from more_itertools import first
 
@@ -24,6 +26,98 @@ def ygk_path(category_or_path: str, base_dir: str = "data/ygk") -> str:
     return f"{base_dir}/{filename}"
 
 
+class YGKItem:
+    """
+    A single topic from a 'You Gotta Know' article.
+
+    The `html` and `text` fields are computed from the parsed element the first
+    time they are accessed, so callers that don't use them don't pay for
+    serializing and normalizing every item. Once both are computed the element is
+    dropped, so the item no longer keeps the page's tree alive. Pickling computes
+    them first, since lxml elements can't be pickled. Fields can also be read
+    dict-style (item["label"]) for compatibility with code that expects plain dicts.
+    """
+
+    __slots__ = ("article", "label", "terms", "_element", "_html", "_text")
+
+    FIELDS = ("article", "label", "terms", "html", "text")
+
+    def __init__(
+        self,
+        article: str,
+        label: str,
+        terms: list[str],
+        element: Optional[lxml.html.HtmlElement] = None,
+        html: Optional[str] = None,
+        text: Optional[str] = None,
+    ):
+        """
+        Initialize a YGK item.
+
+        Args:
+            article: Article title (e.g. "You Gotta Know These Short Story Authors")
+            label: Topic label
+            terms: Key terms highlighted in the topic text
+            element: Parsed <li> or <dd> element to compute html and text from
+            html: Precomputed normalized HTML of the topic
+            text: Precomputed normalized text of the topic
+        """
+        self.article = article
+        self.label = label
+        self.terms = terms
+        self._element = element
+        self._html = html
+        self._text = text
+
+    @property
+    def html(self) -> str:
+        """Normalized HTML of the topic."""
+        if self._html is None:
+            self._html = (
+                normalize_text(lxml.html.tostring(self._element).decode("ascii").strip())
+                if self._element is not None else ""
+            )
+            self._release_element()
+        return self._html
+
+    @property
+    def text(self) -> str:
+        """Normalized text of the topic."""
+        if self._text is None:
+            self._text = normalize_text(self._element.text_content()) if self._element is not None else ""
+            self._release_element()
+        return self._text
+
+    def _release_element(self) -> None:
+        """Drop the parsed element once every field computed from it is cached."""
+        if self._html is not None and self._text is not None:
+            self._element = None
+
+    def __getstate__(self) -> dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(
+            state["article"], state["label"], state["terms"], html=state["html"], text=state["text"]
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        """Get a field by name, or default if there is no such field."""
+        return self[key] if key in self.FIELDS else default
+
+    def to_dict(self) -> dict:
+        """Convert to a plain dict, computing all fields."""
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"YGKItem(article={self.article!r}, label={self.label!r}, terms={self.terms!r})"
+
+
 def read_html(path: str) -> lxml.html.HtmlElement:
     """
     Read an HTML file and parse it into an lxml element tree.
@@ -39,7 +133,7 @@ def read_html(path: str) -> lxml.html.HtmlElement:
     return lxml.html.fromstring(text)
 
 
-def parse_ygk_page_ul(path: str) -> list[dict[str, str]]:
+def parse_ygk_page_ul(path: str) -> list[YGKItem]:
     """
     Parse a 'You Gotta Know' page that uses <ul> structure.
 
@@ -47,7 +141,7 @@ def parse_ygk_page_ul(path: str) -> list[dict[str, str]]:
         path: Path to the HTML file or category name
 
     Returns:
-        List of dictionaries containing article, label, terms, html, and text
+        List of YGKItems with article, label, terms, html, and text
     """
     ret = []
     tree = read_html(path)
@@ -55,17 +149,16 @@ def parse_ygk_page_ul(path: str) -> list[dict[str, str]]:
     assert article.lower().startswith("you gotta know")
 
     for li in tree.xpath("//ul[@class='ygk']/li"):
-        ret.append({
-            "article": article,
-            "label": " / ".join([normalize_text(span.text) for span in li.xpath("./span[@class='label']")]),
-            "terms": [normalize_text(t.text) for t in li.xpath("./span[@class='ygk-term']")],
-            "html": normalize_text(lxml.html.tostring(li).decode("ascii").strip()),
-            "text": normalize_text(li.text_content())
-        })
+        ret.append(YGKItem(
+            article=article,
+            label=" / ".join([normalize_text(span.text) for span in li.xpath("./span[@class='label']")]),
+            terms=[normalize_text(t.text) for t in li.xpath("./span[@class='ygk-term']")],
+            element=li,
+        ))
     return ret
 
 
-def parse_ygk_page_dl(path: str) -> list[dict[str, str]]:
+def parse_ygk_page_dl(path: str) -> list[YGKItem]:
     """
     Parse a 'You Gotta Know' page that uses <dl> structure.
     Some pages have a dl instead of ul.
@@ -74,7 +167,7 @@ def parse_ygk_page_dl(path: str) -> list[dict[str, str]]:
         path: Path to the HTML file or category name
 
     Returns:
-        List of dictionaries containing article, label, terms, html, and text
+        List of YGKItems with article, label, terms, html, and text
     """
     ret = []
     tree = read_html(path)
@@ -85,17 +178,16 @@ def parse_ygk_page_dl(path: str) -> list[dict[str, str]]:
     assert len(tree.xpath("//dl[@class='ygk']/dd")) == len(labels)
 
     for label, dd in zip(labels, tree.xpath("//dl[@class='ygk']/dd")):
-        ret.append({
-            "article": article,
-            "label": normalize_text(label.text),
-            "terms": [normalize_text(t.text) for t in dd.xpath("./span[@class='ygk-term']")],
-            "html": normalize_text(lxml.html.tostring(dd).decode("ascii").strip()),
-            "text": normalize_text(dd.text_content())
-        })
+        ret.append(YGKItem(
+            article=article,
+            label=normalize_text(label.text),
+            terms=[normalize_text(t.text) for t in dd.xpath("./span[@class='ygk-term']")],
+            element=dd,
+        ))
     return ret
 
 
-def parse_ygk_page(path: str) -> list[dict[str, str]]:
+def parse_ygk_page(path: str) -> list[YGKItem]:
     """
     Parse a 'You Gotta Know' page, automatically detecting structure type.
 
@@ -103,7 +195,7 @@ def parse_ygk_page(path: str) -> list[dict[str, str]]:
         path: Path to the HTML file or category name
 
     Returns:
-        List of dictionaries containing article, label, terms, html, and text
+        List of YGKItems with article, label, terms, html, and text
     """
     ret = parse_ygk_page_ul(path)
     if not ret:
@@ -569,6 +569,26 @@ the output should be "Flannery O'Connor".
 <term>{term}</term>
 """.strip()
 
+PROMPT_BATCH = """
+## BATCHED INPUT
+
+The input below contains {num_topics} topics, each starting with a "### TOPIC <n>"
+heading. Generate flashcards for EVERY topic, following the instructions above for
+each one. Output all flashcards in ONE Markdown table with an extra first column
+named `Topic` holding the number of the topic each flashcard is for (e.g. `1`).
+
+{topics}
+""".strip()
+
+PROMPT_STRUCTURED = """
+## STRUCTURED OUTPUT
+
+Instead of a Markdown table, return the flashcards as JSON matching the provided
+schema: one object in the `flashcards` array per table row, with the table's
+columns as lowercase keys (`question`, `answer`, and `difficulty` as an integer
+if the table has a Difficulty column).
+""".strip()
+
 PROMPT_FREQUENCY_FOCUSED = """
 # FLASHCARD GENERATION - FREQUENCY-FOCUSED
 
@@ -581,10 +601,11 @@ You will receive:
 1. **YGK Article Excerpt** - Summary of a Quiz Bowl topic with key terms (bolded)
 2. **Related Tossups** - Actual quiz questions where this topic appears
 3. **Related Bonuses** - Bonus questions about this topic
+4. **Term Frequencies** - How many questions in the whole database mention the topic and each key term
 
 ## YOUR TASK
 Analyze the tossups and bonuses to identify:
-- Which clues appear MOST FREQUENTLY across multiple questions
+- Which clues appear MOST FREQUENTLY across multiple questions (use the term frequencies)
 - Which facts are used to identify the answer EARLY in pyramidal questions
 - Which associations are mentioned repeatedly
 - "Giveaway" clues that appear in many questions
@@ -645,6 +666,9 @@ Related tossups:
 Number of related bonuses: {num_related_bonuses}
 Related bonuses:
 {bonuses}
+
+Term frequencies:
+{term_frequencies}
 ```
 """.strip()
 
@@ -0,0 +1,269 @@
+"""Flattened storage for DataFrame columns of string lists, such as bonus parts and answers."""
+
+import re
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, register_extension_dtype, take
+from pandas.api.indexers import check_array_indexer
+
+# Byte after each string in the buffer, so a search never matches across two strings
+_SEPARATOR = b"\x00"
+
+
+@register_extension_dtype
+class StringListDtype(ExtensionDtype):
+    """pandas dtype of a StringListArray column."""
+
+    name = "string_list"
+    type = list
+    kind = "O"
+
+    @classmethod
+    def construct_array_type(cls):
+        return StringListArray
+
+
+class StringListArray(ExtensionArray):
+    """
+    A column of string lists stored Arrow-style in a few flat buffers.
+
+    All strings are UTF-8 encoded into one bytes buffer with an array of string
+    offsets, and each row is a range of string indices. Slicing and taking rows
+    (e.g. df[mask]) only copies the row ranges and shares the buffer, and there
+    are no per-row list or str objects until a row is read. Reading a row
+    returns a list of str, so code written for list columns keeps working.
+
+    Example:
+        df["parts_sanitized"] = StringListArray.from_lists(df["parts_sanitized"])
+        mask = df["parts_sanitized"].array.contains("Stravinsky")
+    """
+
+    def __init__(
+        self,
+        data: bytes,
+        offsets: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        na: np.ndarray,
+    ):
+        """
+        Initialize from buffers (see from_lists).
+
+        Args:
+            data: UTF-8 strings, each followed by a NUL byte
+            offsets: Start of each string in data, plus the length of data (int64)
+            starts: Index of each row's first string (int64)
+            ends: Index after each row's last string (int64)
+            na: Whether each row is missing
+        """
+        self._data = data
+        self._offsets = offsets
+        self._starts = starts
+        self._ends = ends
+        self._na = na
+
+    @classmethod
+    def from_lists(cls, values: Iterable) -> "StringListArray":
+        """
+        Build an array from lists of strings.
+
+        A string is stored as a one-element list, non-string items as empty strings,
+        and anything else (e.g. NaN) as a missing row.
+
+        Args:
+            values: One list (or tuple/array) of strings per row
+
+        Returns:
+            StringListArray with its own buffers
+        """
+        encoded = []
+        starts, ends, na = [], [], []
+        for value in values:
+            starts.append(len(encoded))
+            if isinstance(value, str):
+                value = [value]
+            if isinstance(value, (list, tuple, np.ndarray)):
+                encoded.extend(v.encode() if isinstance(v, str) else b"" for v in value)
+                na.append(False)
+            else:
+                na.append(True)
+            ends.append(len(encoded))
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) + 1 for e in encoded], out=offsets[1:])
+        data = _SEPARATOR.join(encoded) + _SEPARATOR if encoded else b""
+        return cls(
+            data,
+            offsets,
+            np.array(starts, dtype=np.int64),
+            np.array(ends, dtype=np.int64),
+            np.array(na, dtype=bool),
+        )
+
+    def _view(self, starts: np.ndarray, ends: np.ndarray, na: np.ndarray) -> "StringListArray":
+        """Array of other rows over the same buffers."""
+        return type(self)(self._data, self._offsets, starts, ends, na)
+
+    # ExtensionArray interface
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        return cls.from_lists(scalars)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls.from_lists(values)
+
+    @property
+    def dtype(self) -> StringListDtype:
+        return StringListDtype()
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self._data) + self._offsets.nbytes
+            + self._starts.nbytes + self._ends.nbytes + self._na.nbytes
+        )
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _row(self, start: int, end: int) -> list[str]:
+        data = self._data
+        bounds = self._offsets[start:end + 1].tolist()
+        return [data[a:b - 1].decode() for a, b in zip(bounds, bounds[1:])]
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            if self._na[item]:
+                return self.dtype.na_value
+            return self._row(int(self._starts[item]), int(self._ends[item]))
+        if not isinstance(item, slice):
+            item = check_array_indexer(self, item)
+        return self._view(self._starts[item], self._ends[item], self._na[item])
+
+    def __iter__(self) -> Iterator:
+        na_value = self.dtype.na_value
+        for start, end, na in zip(self._starts.tolist(), self._ends.tolist(), self._na.tolist()):
+            yield na_value if na else self._row(start, end)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        result = np.empty(len(self), dtype=object)
+        for i, value in enumerate(self):
+            result[i] = value
+        return result
+
+    def isna(self) -> np.ndarray:
+        return self._na.copy()
+
+    def take(self, indices, allow_fill: bool = False, fill_value=None) -> "StringListArray":
+        # Filled rows are always missing
+        indices = np.asarray(indices, dtype=np.intp)
+        return self._view(
+            take(self._starts, indices, allow_fill=allow_fill, fill_value=0),
+            take(self._ends, indices, allow_fill=allow_fill, fill_value=0),
+            take(self._na, indices, allow_fill=allow_fill, fill_value=True),
+        )
+
+    def copy(self) -> "StringListArray":
+        return self._view(self._starts.copy(), self._ends.copy(), self._na.copy())
+
+    @classmethod
+    def _concat_same_type(cls, to_concat) -> "StringListArray":
+        to_concat = list(to_concat)
+        first = to_concat[0]
+        if all(array._data is first._data for array in to_concat):
+            # Rows of the same corpus, e.g. two sets of search results
+            return first._view(
+                np.concatenate([array._starts for array in to_concat]),
+                np.concatenate([array._ends for array in to_concat]),
+                np.concatenate([array._na for array in to_concat]),
+            )
+        offsets, starts, ends = [], [], []
+        num_bytes = num_strings = 0
+        for array in to_concat:
+            offsets.append(array._offsets[:-1] + num_bytes)
+            starts.append(array._starts + num_strings)
+            ends.append(array._ends + num_strings)
+            num_bytes += len(array._data)
+            num_strings += len(array._offsets) - 1
+        offsets.append(np.array([num_bytes], dtype=np.int64))
+        return cls(
+            b"".join(array._data for array in to_concat),
+            np.concatenate(offsets),
+            np.concatenate(starts),
+            np.concatenate(ends),
+            np.concatenate([array._na for array in to_concat]),
+        )
+
+    def __getstate__(self) -> dict:
+        # Pickle only the strings this array uses, not the whole shared buffer
+        used = int((self._ends - self._starts)[~self._na].sum())
+        if used < len(self._offsets) - 1:
+            return type(self).from_lists(self).__dict__
+        return self.__dict__
+
+    # Vectorized operations
+
+    def contains(self, term: str) -> np.ndarray:
+        """
+        Find the rows with a string containing a term, ignoring case.
+
+        The whole buffer is searched in one pass and matches are mapped back to
+        rows, so no strings are decoded.
+
+        Args:
+            term: Substring to search for
+
+        Returns:
+            Boolean array with one entry per row
+        """
+        if "\0" in term:
+            return np.zeros(len(self), dtype=bool)
+        pattern = _case_insensitive(term)
+        matched = np.zeros(len(self._offsets), dtype=np.int64)
+        positions = [match.start() for match in pattern.finditer(self._data)]
+        if positions:
+            matched[np.searchsorted(self._offsets, positions, side="right") - 1] = 1
+        # Number of matched strings before each string index
+        before = np.concatenate([[0], np.cumsum(matched[:-1])])
+        return (before[self._ends] > before[self._starts]) & ~self._na
+
+
+def _case_insensitive(term: str) -> re.Pattern:
+    """Compile a bytes pattern matching a term in UTF-8 regardless of case."""
+    if term.isascii():
+        return re.compile(re.escape(term.encode()), re.IGNORECASE)
+    # re.IGNORECASE only folds ASCII in bytes patterns, so spell out other letters' cases
+    pieces = []
+    for char in term:
+        cases = {char.lower(), char.upper()}
+        if char.isascii() or len(cases) == 1:
+            pieces.append(re.escape(char.encode()))
+        else:
+            pieces.append(b"(?:" + b"|".join(re.escape(c.encode()) for c in sorted(cases)) + b")")
+    return re.compile(b"".join(pieces), re.IGNORECASE)
+
+
+def is_string_list(values) -> bool:
+    """Whether a Series or array is stored as a StringListArray."""
+    return isinstance(getattr(values, "array", values), StringListArray)
+
+
+def flatten_lists(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    """
+    Convert columns of string lists to StringListArrays.
+
+    Args:
+        df: DataFrame to convert in place
+        columns: Names of the columns to convert (missing ones are skipped)
+
+    Returns:
+        The DataFrame
+    """
+    for column in columns:
+        if column in df.columns and not is_string_list(df[column]):
+            df[column] = pd.Series(StringListArray.from_lists(df[column]), index=df.index)
+    return df
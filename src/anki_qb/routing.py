@@ -0,0 +1,245 @@
+"""Routing prompts across several LLM models with timeouts, fallbacks and racing."""
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from anki_qb.formatters import read_markdown
+from anki_qb.llm import DEFAULT_MODEL, ask_llm, ask_llm_stream
+
+
+class Route:
+    """How to send a prompt to one or more models."""
+
+    def __init__(
+        self,
+        models: list[str],
+        timeout: Optional[float] = None,
+        budget: Optional[float] = None,
+        race: bool = False,
+    ):
+        """
+        Initialize a route.
+
+        Args:
+            models: Models to try in order; later models are fallbacks
+            timeout: Maximum seconds to wait for each model
+            budget: Maximum seconds to spend on the prompt across all models
+            race: Send the prompt to the first two models at once and take
+                whichever returns a valid result first
+        """
+        if not models:
+            raise ValueError("A route needs at least one model")
+        self.models = list(models)
+        self.timeout = timeout
+        self.budget = budget
+        self.race = race
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Route":
+        """Create a route from a dict with models and optional timeout, budget and race keys."""
+        return cls(
+            models=data["models"],
+            timeout=data.get("timeout"),
+            budget=data.get("budget"),
+            race=data.get("race", False),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Route(models={self.models!r}, timeout={self.timeout!r}, "
+            f"budget={self.budget!r}, race={self.race!r})"
+        )
+
+
+class Router:
+    """Per-category routes with a default for categories that aren't listed."""
+
+    def __init__(self, default: Route, categories: Optional[dict[str, Route]] = None):
+        """
+        Initialize a router.
+
+        Args:
+            default: Route for categories without their own route
+            categories: Routes keyed by YGK category name
+        """
+        self.default = default
+        self.categories = categories or {}
+
+    def route_for(self, category: str) -> Route:
+        """Get the route for a YGK category."""
+        return self.categories.get(category, self.default)
+
+    @classmethod
+    def from_file(cls, path, default_model: str = DEFAULT_MODEL) -> "Router":
+        """
+        Load routes from a JSON file of the form:
+
+            {
+                "default": {"models": ["gpt-4o-mini", "gpt-4o"], "timeout": 60},
+                "categories": {
+                    "chemical_elements": {"models": ["gpt-4o", "claude-3.5-sonnet"], "race": true}
+                }
+            }
+
+        Args:
+            path: Path to the JSON file
+            default_model: Model for the default route if the file doesn't set one
+
+        Returns:
+            Router
+        """
+        data = json.loads(Path(path).read_text())
+        default = Route.from_dict(data.get("default", {"models": [default_model]}))
+        categories = {
+            name: Route.from_dict(route) for name, route in data.get("categories", {}).items()
+        }
+        return cls(default, categories)
+
+
+def ask_routed(
+    prompt: str,
+    route: Route,
+    ask_fn: Callable[..., str] = ask_llm,
+    parse: Callable[[str], Any] = read_markdown,
+) -> tuple[Any, str]:
+    """
+    Send a prompt along a route, falling back to the next model on failure.
+
+    A model fails if it raises, exceeds the route's timeout, or returns output
+    that `parse` rejects (e.g. no Markdown table). Timed-out requests can't be
+    cancelled and finish in the background.
+
+    Args:
+        prompt: The prompt to send
+        route: Models and time limits to use
+        ask_fn: Function called as ask_fn(prompt, model=name) returning the response text
+        parse: Function that parses the response text, raising on malformed output
+
+    Returns:
+        Tuple of (parsed response, name of the model that produced it)
+
+    Raises:
+        RuntimeError: If every model on the route failed or the budget ran out
+    """
+    deadline = time.monotonic() + route.budget if route.budget is not None else None
+    errors = []
+    pending = list(route.models)
+
+    def attempt(model):
+        return parse(ask_fn(prompt, model=model)), model
+
+    # One worker per model, so requests that timed out never hold up a fallback
+    executor = ThreadPoolExecutor(max_workers=len(route.models))
+    try:
+        while pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                errors.append(f"budget of {route.budget}s exhausted")
+                break
+            group = pending[:2] if route.race and not errors else pending[:1]
+            pending = pending[len(group):]
+            futures = {executor.submit(attempt, model): model for model in group}
+            limits = [deadline]
+            if route.timeout is not None:
+                limits.append(time.monotonic() + route.timeout)
+            limit = min((t for t in limits if t is not None), default=None)
+            while futures:
+                timeout = max(limit - time.monotonic(), 0) if limit is not None else None
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    errors.extend(f"{model}: timed out" for model in futures.values())
+                    break
+                for future in done:
+                    model = futures.pop(future)
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        errors.append(f"{model}: {e}")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    raise RuntimeError("All models failed: " + "; ".join(errors))
+
+
+def ask_routed_stream(
+    prompt: str,
+    route: Route,
+    ask_fn: Callable[..., tuple] = ask_llm_stream,
+    on_row: Optional[Callable[[dict[str, str]], None]] = None,
+) -> tuple[Any, bool, str]:
+    """
+    Stream a prompt along a route, falling back to the next model on failure.
+
+    A model fails if it raises or its response has no rows, including when the
+    timeout passes before the first row. Once a model has passed a row to
+    on_row its response is kept, even if it then times out (the rows so far are
+    returned) or raises (the error is passed on), so on_row never gets rows from
+    two responses. With race, the first two models stream at once and the first
+    to send a row wins; the other's rows are dropped.
+
+    Args:
+        prompt: The prompt to send
+        route: Models and time limits to use
+        ask_fn: Function called as ask_fn(prompt, model=name, timeout=seconds, on_row=callback)
+            returning (DataFrame, whether the response completed), e.g. ask_llm_stream
+        on_row: Called with each row of the response that is kept, as soon as it arrives
+
+    Returns:
+        Tuple of (DataFrame of rows, whether the response completed, name of the model)
+
+    Raises:
+        RuntimeError: If every model failed or the budget ran out
+    """
+    deadline = time.monotonic() + route.budget if route.budget is not None else None
+    errors = []
+    pending = list(route.models)
+    lock = threading.Lock()
+    winner = []  # The model whose rows are passed on, once one sends a row
+
+    def attempt(model):
+        def forward(row):
+            with lock:
+                if not winner:
+                    winner.append(model)
+                if winner[0] != model:
+                    return
+            if on_row is not None:
+                on_row(row)
+
+        limits = [route.timeout]
+        if deadline is not None:
+            limits.append(max(deadline - time.monotonic(), 0))
+        timeout = min((t for t in limits if t is not None), default=None)
+        return ask_fn(prompt, model=model, timeout=timeout, on_row=forward)
+
+    # One worker per model, so a race's losing request never holds up a fallback
+    executor = ThreadPoolExecutor(max_workers=len(route.models))
+    try:
+        while pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                errors.append(f"budget of {route.budget}s exhausted")
+                break
+            group = pending[:2] if route.race and not errors else pending[:1]
+            pending = pending[len(group):]
+            futures = {executor.submit(attempt, model): model for model in group}
+            for future in as_completed(futures):
+                model = futures[future]
+                try:
+                    flashcards_df, complete = future.result()
+                except Exception as e:
+                    if winner and winner[0] == model:
+                        raise
+                    errors.append(f"{model}: {e}")
+                    continue
+                if winner and winner[0] != model:
+                    continue
+                if len(flashcards_df):
+                    return flashcards_df, complete, model
+                errors.append(f"{model}: " + ("no rows" if complete else "timed out"))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    raise RuntimeError("All models failed: " + "; ".join(errors))
@@ -1,20 +1,147 @@
 """Search functions for QBReader database of tossups and bonuses."""
 
 import re
+from typing import Iterable, Optional, Union
+
+import numpy as np
 import pandas as pd
 
+from anki_qb.answers import AnswerIndex, accepted_answers, normalize_answer
+from anki_qb.ragged import is_string_list
+
+
+class MetadataIndex:
+    """
+    Precomputed bitmaps over the metadata columns of a tossup or bonus DataFrame.
+
+    One packed bitmap is kept per difficulty, year and category value, so a filter
+    is a handful of bitwise ORs/ANDs over small arrays instead of a scan of the
+    columns. Build it once after loading (see anki_qb.corpus) and pass it to the
+    search functions.
+    """
+
+    COLUMNS = ("difficulty", "year", "category")
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the bitmaps.
+
+        Args:
+            df: Tossup or bonus DataFrame with difficulty, year and/or category columns
+        """
+        self.size = len(df)
+        self.bitmaps = {}
+        for column in self.COLUMNS:
+            if column not in df.columns:
+                continue
+            codes, values = pd.factorize(df[column], sort=True)
+            self.bitmaps[column] = {
+                value: np.packbits(codes == code) for code, value in enumerate(values)
+            }
+
+    def _any(self, column: str, values: Iterable) -> np.ndarray:
+        bitmaps = self.bitmaps.get(column)
+        if bitmaps is None:
+            raise ValueError(f"DataFrame has no {column} column to filter on")
+        ret = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            if value in bitmaps:
+                ret |= bitmaps[value]
+        return ret
+
+    def _range(self, column: str, bounds: tuple[Optional[int], Optional[int]]) -> np.ndarray:
+        low, high = bounds
+        # Unknown values are stored as -1 (see anki_qb.corpus) and never match a range
+        values = [
+            v for v in self.bitmaps.get(column, {})
+            if v >= 0 and (low is None or v >= low) and (high is None or v <= high)
+        ]
+        return self._any(column, values)
+
+    def mask(
+        self,
+        difficulty: Optional[tuple[Optional[int], Optional[int]]] = None,
+        year: Optional[tuple[Optional[int], Optional[int]]] = None,
+        category: Optional[Union[str, Iterable[str]]] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Get a row mask for metadata filters.
+
+        Args:
+            difficulty: Inclusive (min, max) difficulty range; either bound may be None.
+                Rows with an unknown difficulty are excluded.
+            year: Inclusive (min, max) year range; either bound may be None. Rows with
+                an unknown year are excluded.
+            category: QBReader category name or names
+
+        Returns:
+            Boolean array aligned with the DataFrame rows, or None if no filters were given
+        """
+        masks = []
+        if difficulty is not None:
+            masks.append(self._range("difficulty", difficulty))
+        if year is not None:
+            masks.append(self._range("year", year))
+        if category is not None:
+            masks.append(self._any("category", [category] if isinstance(category, str) else category))
+        if not masks:
+            return None
+        packed = masks[0]
+        for mask in masks[1:]:
+            packed = packed & mask
+        return np.unpackbits(packed, count=self.size).astype(bool)
+
+
+def _prefilter(df: pd.DataFrame, index: Optional[MetadataIndex], filters: dict) -> pd.DataFrame:
+    """Apply metadata filters to a DataFrame before text matching."""
+    if not any(value is not None for value in filters.values()):
+        return df
+    mask = (index or MetadataIndex(df)).mask(**filters)
+    return df[mask]
+
 
-def search_bonuses(term: str, df: pd.DataFrame) -> pd.DataFrame:
+def _match_answers(term: str, df: pd.DataFrame) -> Optional[pd.Series]:
+    """
+    Match a term against the accepted answers of each row (see anki_qb.answers).
+
+    Returns None if df has no normalized answer columns.
+    """
+    answers = accepted_answers(df)
+    if answers is None:
+        return None
+    needle = normalize_answer(term)
+    if not needle:
+        return pd.Series(False, index=df.index)
+    return answers.str.contains(needle, regex=False)
+
+
+def search_bonuses(
+    term: str,
+    df: pd.DataFrame,
+    difficulty: Optional[tuple[Optional[int], Optional[int]]] = None,
+    year: Optional[tuple[Optional[int], Optional[int]]] = None,
+    category: Optional[Union[str, Iterable[str]]] = None,
+    index: Optional[MetadataIndex] = None,
+) -> pd.DataFrame:
     """
     Search for a term (case-insensitive) in the following columns of a
     bonus DataFrame:
       - leadin_sanitized (string)
       - answers_sanitized (list of strings)
-      - parts_sanitized (list of strings)
+      - parts_sanitized (list of strings, or a StringListArray as loaded by
+        anki_qb.corpus.load_bonuses)
+
+    If the DataFrame has an answers_accept column (see anki_qb.corpus), answers
+    are matched against it instead, so prompt and reject clauses don't match.
+    Metadata filters are applied before the text is matched.
 
     Args:
         term: The search term
         df: Bonus DataFrame with sanitized columns
+        difficulty: Inclusive (min, max) difficulty range to restrict the search to
+        year: Inclusive (min, max) year range to restrict the search to
+        category: QBReader category name or names to restrict the search to
+        index: Precomputed MetadataIndex for df (built on the fly if filters are given without one)
 
     Returns:
         Filtered DataFrame with rows where the term appears
@@ -26,6 +153,7 @@ def search_bonuses(term: str, df: pd.DataFrame) -> pd.DataFrame:
     missing = required_cols - set(df.columns)
     if missing:
         raise ValueError(f"DataFrame missing required columns: {missing}")
+    df = _prefilter(df, index, {"difficulty": difficulty, "year": year, "category": category})
 
     # Compile regex pattern for robust, case-insensitive substring match
     pattern = re.compile(re.escape(term), re.IGNORECASE)
@@ -40,22 +168,46 @@ def search_bonuses(term: str, df: pd.DataFrame) -> pd.DataFrame:
             return any(isinstance(item, str) and pattern.search(item) for item in lst)
         return False
 
+    def match_lists(column):
+        # Flat columns (see anki_qb.ragged) are searched in one pass over their buffer
+        if is_string_list(df[column]):
+            return df[column].array.contains(term)
+        return df[column].apply(match_in_list)
+
+    answer_mask = _match_answers(term, df)
+    if answer_mask is None:
+        answer_mask = match_lists('answers_sanitized')
     mask = (
         df['leadin_sanitized'].apply(match_in_text)
-        | df['answers_sanitized'].apply(match_in_list)
-        | df['parts_sanitized'].apply(match_in_list)
+        | answer_mask
+        | match_lists('parts_sanitized')
     )
     return df[mask]
 
 
-def search_tossups(term: str, df: pd.DataFrame) -> pd.DataFrame:
+def search_tossups(
+    term: str,
+    df: pd.DataFrame,
+    difficulty: Optional[tuple[Optional[int], Optional[int]]] = None,
+    year: Optional[tuple[Optional[int], Optional[int]]] = None,
+    category: Optional[Union[str, Iterable[str]]] = None,
+    index: Optional[MetadataIndex] = None,
+) -> pd.DataFrame:
     """
     Search for a term (case-insensitive) in both `question_sanitized`
     and `answer_sanitized` columns of a tossups DataFrame.
 
+    If the DataFrame has an answer_accept column (see anki_qb.corpus), answers
+    are matched against it instead, so prompt and reject clauses don't match.
+    Metadata filters are applied before the text is matched.
+
     Args:
         term: The search term
         df: Tossups DataFrame with sanitized columns
+        difficulty: Inclusive (min, max) difficulty range to restrict the search to
+        year: Inclusive (min, max) year range to restrict the search to
+        category: QBReader category name or names to restrict the search to
+        index: Precomputed MetadataIndex for df (built on the fly if filters are given without one)
 
     Returns:
         Filtered DataFrame with rows where the term appears
@@ -66,6 +218,7 @@ def search_tossups(term: str, df: pd.DataFrame) -> pd.DataFrame:
     required_cols = {'question_sanitized', 'answer_sanitized'}
     if not required_cols.issubset(df.columns):
         raise ValueError(f"DataFrame must have columns: {required_cols}")
+    df = _prefilter(df, index, {"difficulty": difficulty, "year": year, "category": category})
 
     pattern = re.compile(re.escape(term), re.IGNORECASE)
 
@@ -74,5 +227,44 @@ def search_tossups(term: str, df: pd.DataFrame) -> pd.DataFrame:
             return bool(pattern.search(text))
         return False
 
-    mask = df['question_sanitized'].apply(match) | df['answer_sanitized'].apply(match)
+    answer_mask = _match_answers(term, df)
+    if answer_mask is None:
+        answer_mask = df['answer_sanitized'].apply(match)
+    mask = df['question_sanitized'].apply(match) | answer_mask
     return df[mask]
+
+
+def search_answers(
+    term: str,
+    df: pd.DataFrame,
+    answers: AnswerIndex,
+    alternates: bool = True,
+    difficulty: Optional[tuple[Optional[int], Optional[int]]] = None,
+    year: Optional[tuple[Optional[int], Optional[int]]] = None,
+    category: Optional[Union[str, Iterable[str]]] = None,
+    index: Optional[MetadataIndex] = None,
+) -> pd.DataFrame:
+    """
+    Find the tossups or bonuses whose answer is exactly a term, after normalization.
+
+    Unlike search_tossups/search_bonuses this is a hash lookup, not a scan, and
+    it only finds questions about the term rather than ones that mention it.
+
+    Args:
+        term: The answer to look up
+        df: Tossup or bonus DataFrame the AnswerIndex was built from
+        answers: AnswerIndex for df
+        alternates: Whether to also match accepted alternates, not just primary answers
+        difficulty: Inclusive (min, max) difficulty range to restrict the search to
+        year: Inclusive (min, max) year range to restrict the search to
+        category: QBReader category name or names to restrict the search to
+        index: Precomputed MetadataIndex for df (built on the fly if filters are given without one)
+
+    Returns:
+        DataFrame with the matching rows, in their original order
+    """
+    positions = answers.lookup(term, alternates=alternates)
+    if difficulty is not None or year is not None or category is not None:
+        mask = (index or MetadataIndex(df)).mask(difficulty=difficulty, year=year, category=category)
+        positions = positions[mask[positions]]
+    return df.iloc[positions]
@@ -0,0 +1,171 @@
+"""Precompiled snapshot of all parsed YGK articles, rebuilt when the HTML changes."""
+
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from anki_qb.cache import corpus_fingerprint
+from anki_qb.config import Config, get_config
+
+# Bump when the snapshot layout or the parsed fields change
+SNAPSHOT_VERSION = 2
+
+_FILENAME_PREFIX = "https___www_naqt_com_you_gotta_know_"
+_FILENAME_SUFFIX = "_html.html"
+
+
+def ygk_categories(ygk_dir: Path) -> dict[str, Path]:
+    """
+    Find the YGK article files in a directory.
+
+    Args:
+        ygk_dir: Directory with the saved YGK HTML files
+
+    Returns:
+        Dictionary from category name (e.g. "short_story_authors") to HTML path, sorted by path
+    """
+    ret = {}
+    for path in sorted(Path(ygk_dir).glob("*.html")):
+        name = path.name
+        if name.startswith(_FILENAME_PREFIX) and name.endswith(_FILENAME_SUFFIX):
+            ret[name[len(_FILENAME_PREFIX):-len(_FILENAME_SUFFIX)]] = path
+    return ret
+
+
+class YGKSnapshot:
+    """
+    All topics of all YGK articles, parsed ahead of time.
+
+    Items are returned as YGKItems with precomputed text, so nothing is parsed or
+    normalized at load time. The topics' HTML isn't kept, since nothing downstream
+    uses it and it would roughly double the snapshot; the items' html field is
+    empty (use parse_ygk_page for it).
+    """
+
+    def __init__(self, fingerprint: str, categories: dict[str, list[list]]):
+        """
+        Initialize from snapshot data.
+
+        Args:
+            fingerprint: Fingerprint of the HTML files the snapshot was built from
+            categories: Category name -> list of [article, label, terms, text] rows
+        """
+        self.fingerprint = fingerprint
+        self._categories = categories
+
+    @property
+    def categories(self) -> list[str]:
+        """Names of the categories in the snapshot."""
+        return list(self._categories)
+
+    def __contains__(self, category: str) -> bool:
+        return _category_name(category) in self._categories
+
+    def items(self, category: str) -> list:
+        """
+        Get the topics of a category.
+
+        Args:
+            category: Category name, or the path/filename of its HTML file
+
+        Returns:
+            List of YGKItems, as parse_ygk_page would return but without html
+
+        Raises:
+            KeyError: If the category isn't in the snapshot
+        """
+        from anki_qb.parsing import YGKItem
+
+        return [
+            YGKItem(article, label, terms, text=text)
+            for article, label, terms, text in self._categories[_category_name(category)]
+        ]
+
+    def save(self, path: Path) -> None:
+        """Write the snapshot as gzipped JSON, replacing any existing file atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "fingerprint": self.fingerprint,
+            "categories": self._categories,
+        }
+        # A temporary file of its own, since several processes may rebuild the snapshot at once
+        tmp = tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp, gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp.name, path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["YGKSnapshot"]:
+        """Read a snapshot file, or return None if it is missing or from another version."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, EOFError, ValueError):
+            # Missing, truncated or corrupt
+            return None
+        if data.get("version") != SNAPSHOT_VERSION:
+            return None
+        return cls(data["fingerprint"], data["categories"])
+
+
+def _category_name(category: str) -> str:
+    """Get the category name from a category name, HTML filename or path."""
+    name = Path(category).name
+    if name.startswith(_FILENAME_PREFIX) and name.endswith(_FILENAME_SUFFIX):
+        return name[len(_FILENAME_PREFIX):-len(_FILENAME_SUFFIX)]
+    return category.lower().replace(" ", "_")
+
+
+def build_snapshot(ygk_dir: Path) -> YGKSnapshot:
+    """
+    Parse every YGK article in a directory into a snapshot.
+
+    Args:
+        ygk_dir: Directory with the saved YGK HTML files
+
+    Returns:
+        YGKSnapshot of all categories
+    """
+    from anki_qb.parsing import parse_ygk_page
+
+    paths = ygk_categories(ygk_dir)
+    categories = {
+        category: [
+            [item.article, item.label, item.terms, item.text]
+            for item in parse_ygk_page(str(path))
+        ]
+        for category, path in paths.items()
+    }
+    return YGKSnapshot(corpus_fingerprint(*paths.values()), categories)
+
+
+def load_snapshot(config: Optional[Config] = None) -> YGKSnapshot:
+    """
+    Load the YGK snapshot from the config's cache directory, rebuilding it if stale.
+
+    The snapshot is rebuilt whenever an HTML file is added, removed or modified.
+
+    Args:
+        config: Configuration with data paths (defaults to the global config)
+
+    Returns:
+        YGKSnapshot of all categories in the config's ygk directory
+    """
+    config = config or get_config()
+    fingerprint = corpus_fingerprint(*ygk_categories(config.ygk_dir).values())
+    snapshot = YGKSnapshot.load(config.ygk_snapshot_path)
+    if snapshot is None or snapshot.fingerprint != fingerprint:
+        snapshot = build_snapshot(config.ygk_dir)
+        snapshot.save(config.ygk_snapshot_path)
+    return snapshot
@@ -0,0 +1,170 @@
+"""JSON-schema structured output for flashcards, with an incremental JSON parser."""
+
+import json
+import re
+from typing import Optional
+
+# Flashcard fields in the JSON schema, mapped to the column names of the Markdown tables
+FLASHCARD_COLUMNS = {"question": "Question", "answer": "Answer", "difficulty": "Difficulty"}
+
+# Characters that change the parser's state outside of strings, and inside them
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+
+
+def flashcard_schema(batched: bool = False) -> dict:
+    """
+    Get the JSON schema for a flashcard response.
+
+    Difficulty is optional, since some prompts ask for Question and Answer only.
+
+    Args:
+        batched: Whether each flashcard also has the number of its topic (see
+            anki_qb.formatters.format_batch_prompt)
+
+    Returns:
+        JSON schema for an object with a `flashcards` array
+    """
+    properties = {
+        "question": {"type": "string"},
+        "answer": {"type": "string"},
+        "difficulty": {"type": "integer", "minimum": 1, "maximum": 10},
+    }
+    if batched:
+        properties = {"topic": {"type": "integer"}, **properties}
+    return {
+        "type": "object",
+        "properties": {
+            "flashcards": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": [key for key in properties if key != "difficulty"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["flashcards"],
+        "additionalProperties": False,
+    }
+
+
+def flashcard_row(item: dict) -> Optional[dict[str, str]]:
+    """
+    Convert a flashcard object from a structured response into a table row.
+
+    Args:
+        item: Decoded flashcard object
+
+    Returns:
+        Dictionary with Question, Answer and, when given, Difficulty and Topic as
+        strings, or None if the question or answer is missing
+    """
+    fields = {str(key).lower(): value for key, value in item.items()}
+    if not fields.get("question") or not fields.get("answer"):
+        return None
+    return {
+        column: str(fields[key]).strip()
+        for key, column in {"topic": "Topic", **FLASHCARD_COLUMNS}.items()
+        if fields.get(key) is not None
+    }
+
+
+class JSONArrayParser:
+    """
+    Incrementally extracts the objects of the first JSON array in a stream of text.
+
+    Each object is decoded as soon as its closing brace arrives, so flashcards
+    can be used while the rest of the response is still streaming. Text before
+    the array (such as the `{"flashcards":` wrapper or a code fence) is skipped.
+
+    Example:
+        parser = JSONArrayParser()
+        for chunk in stream:
+            for item in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self.items: list[dict] = []
+        self.done = False
+        self.errors = 0
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0  # Nesting depth inside the current item
+        self._item_start: Optional[int] = None
+        self._in_string = False
+
+    def feed(self, text: str) -> list[dict]:
+        """
+        Add text to the stream.
+
+        Args:
+            text: Next chunk of the response
+
+        Returns:
+            Objects completed by this chunk (malformed ones are counted in `errors`)
+        """
+        if self.done:
+            return []
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        pos = self._pos
+        while not self.done:
+            pattern = _STRING_END if self._in_string else _STRUCTURAL
+            match = pattern.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+            if self._in_string:
+                if char == "\\":
+                    if pos >= len(buffer):
+                        pos -= 1  # Wait for the escaped character
+                        break
+                    pos += 1
+                else:
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif not self._in_array:
+                if char == "[":
+                    self._in_array = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._item_start = match.start()
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    if char == "]":
+                        self.done = True
+                    continue
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    item = self._decode(buffer[self._item_start:pos])
+                    if item is not None:
+                        completed.append(item)
+                    self._item_start = None
+
+        # Drop text that is no longer needed, keeping any partial item
+        keep = self._item_start if self._item_start is not None else pos
+        self._buffer = buffer[keep:]
+        self._pos = pos - keep
+        if self._item_start is not None:
+            self._item_start = 0
+        self.items.extend(completed)
+        return completed
+
+    def _decode(self, text: str) -> Optional[dict]:
+        try:
+            item = json.loads(text)
+        except ValueError:
+            item = None
+        if not isinstance(item, dict):
+            self.errors += 1
+            return None
+        return item
@@ -0,0 +1,142 @@
+"""Incremental parsing of Markdown tables from (streamed) LLM responses."""
+
+import re
+from typing import Optional
+
+# Unescaped pipe separating two cells
+_CELL_SPLIT = re.compile(r"(?<!\\)\|")
+
+# Header/body delimiter row, e.g. "|---|:---:|"
+_DELIMITER = re.compile(r"^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$")
+
+
+def split_row(line: str) -> list[str]:
+    """
+    Split a Markdown table row into stripped cells.
+
+    Outer pipes are optional and escaped pipes (\\|) are kept as literal pipes.
+
+    Args:
+        line: A single table row
+
+    Returns:
+        List of cell strings
+    """
+    line = line.strip()
+    cells = _CELL_SPLIT.split(line)
+    if line.startswith("|"):
+        cells = cells[1:]
+    if len(cells) > 1 and line.endswith("|") and not line.endswith("\\|"):
+        cells = cells[:-1]
+    return [c.strip().replace("\\|", "|") for c in cells]
+
+
+def is_table_row(line: str) -> bool:
+    """Check whether a line contains an unescaped pipe, i.e. could be a table row."""
+    return bool(_CELL_SPLIT.search(line))
+
+
+class MarkdownTableParser:
+    """
+    Single-pass parser that extracts the first Markdown table from LLM output.
+
+    Text can be fed in arbitrary chunks as it streams in; rows are returned as soon
+    as the line that contains them is complete. Any text before the table (preamble,
+    code fences) is skipped, and parsing stops at the first non-table line after it.
+    Rows with too few cells are padded, and extra cells are merged into the last column.
+
+    Example:
+        parser = MarkdownTableParser()
+        for chunk in response:
+            for row in parser.feed(chunk):
+                ...
+        rows = parser.close()
+    """
+
+    def __init__(self):
+        self.header: Optional[list[str]] = None
+        self.rows: list[list[str]] = []
+        self.done = False
+        self._buffer = ""
+        self._pending: list[list[str]] = []
+
+    def feed(self, text: str) -> list[list[str]]:
+        """
+        Feed the next chunk of the response.
+
+        Args:
+            text: Next chunk of text
+
+        Returns:
+            Rows completed by this chunk (as lists of cells matching the header)
+        """
+        self._buffer += text
+        if "\n" not in self._buffer:
+            return []
+        *lines, self._buffer = self._buffer.split("\n")
+        ret = []
+        for line in lines:
+            ret.extend(self._feed_line(line))
+        return ret
+
+    def close(self) -> list[list[str]]:
+        """
+        Flush any buffered text at the end of the response.
+
+        If no delimiter row was seen, consecutive pipe rows are treated as a
+        table whose first row is the header.
+
+        Returns:
+            Rows completed by flushing the buffer
+        """
+        ret = []
+        if self._buffer:
+            ret.extend(self._feed_line(self._buffer))
+            self._buffer = ""
+        ret.extend(self._flush_pending())
+        self.done = True
+        return ret
+
+    def _feed_line(self, line: str) -> list[list[str]]:
+        line = line.strip()
+        if self.done:
+            return []
+
+        if self.header is None:
+            if not is_table_row(line):
+                # End of preamble, or of a table without a delimiter row
+                return self._flush_pending()
+            if _DELIMITER.match(line):
+                # The header is the row just above the delimiter; earlier pipe lines are preamble
+                if self._pending:
+                    self.header = self._pending[-1]
+                self._pending = []
+            else:
+                self._pending.append(split_row(line))
+            return []
+
+        if not line or _DELIMITER.match(line):
+            return []
+        if not is_table_row(line):
+            self.done = True
+            return []
+        return [self._emit(split_row(line))]
+
+    def _flush_pending(self) -> list[list[str]]:
+        """Treat buffered pipe rows without a delimiter row as a headed table, if possible."""
+        pending, self._pending = self._pending, []
+        if self.header is not None or len(pending) < 2:
+            return []
+        self.header, *rows = pending
+        self.done = True
+        return [self._emit(row) for row in rows]
+
+    def _emit(self, cells: list[str]) -> list[str]:
+        width = len(self.header)
+        if len(cells) < width:
+            cells = cells + [""] * (width - len(cells))
+        elif len(cells) > width:
+            extra = [c for c in cells[width - 1:] if c]
+            cells = cells[:width - 1] + [" | ".join(extra)]
+        self.rows.append(cells)
+        return cells
@@ -1,15 +1,25 @@
 """Text processing and normalization utilities."""
 
+import functools
 import html
 import unicodedata
 
+# Unicode spaces to replace before NFKD normalization
+_SPACES = str.maketrans({"\xa0": " ", "\u200b": "", "\u202f": " "})
+
+# Dashes and ellipses to replace with plain ASCII equivalents after NFKD normalization
+_PUNCTUATION = str.maketrans({"–": "-", "—": "-", "…": "..."})
+
+# Strings up to this length (labels, terms) are cached since they repeat across parses
+_CACHE_MAX_LENGTH = 256
+
 
 def normalize_text(s: str) -> str:
     """
     Normalize a string by:
     - Unescaping HTML entities
     - Replacing non-breaking spaces with normal spaces
-    - Converting fancy quotes and dashes to plain ASCII equivalents
+    - Converting fancy dashes and ellipses to plain ASCII equivalents
     - Removing extra whitespace
 
     Args:
@@ -20,30 +30,32 @@ def normalize_text(s: str) -> str:
     """
     if not s:
         return ""
+    if len(s) <= _CACHE_MAX_LENGTH:
+        return _normalize_cached(s)
+    return _normalize(s)
+
+
+@functools.lru_cache(maxsize=65536)
+def _normalize_cached(s: str) -> str:
+    return _normalize(s)
 
+
+def _normalize(s: str) -> str:
     # 1. Unescape HTML entities
-    s = html.unescape(s)
-
-    # 2. Replace non-breaking spaces and other common unicode spaces
-    s = s.replace("\xa0", " ").replace("\u200b", "").replace("\u202f", " ")
-
-    # 3. Normalize unicode to NFKD form to separate accents
-    s = unicodedata.normalize("NFKD", s)
-
-    # 4. Replace fancy quotes and dashes with simple equivalents
-    replacements = {
-        """: '"',
-        """: '"',
-        "'": "'",
-        "'": "'",
-        "–": "-",
-        "—": "-",
-        "…": "...",
-    }
-    for k, v in replacements.items():
-        s = s.replace(k, v)
+    if "&" in s:
+        s = html.unescape(s)
 
-    # 5. Collapse multiple spaces to a single space
-    s = " ".join(s.split())
+    # Pure ASCII text only needs whitespace collapsed
+    if not s.isascii():
+        # 2. Replace non-breaking spaces and other common unicode spaces
+        s = s.translate(_SPACES)
+
+        # 3. Normalize unicode to NFKD form to separate accents
+        if not unicodedata.is_normalized("NFKD", s):
+            s = unicodedata.normalize("NFKD", s)
 
-    return s
+        # 4. Replace fancy dashes with simple equivalents
+        s = s.translate(_PUNCTUATION)
+
+    # 5. Collapse multiple spaces to a single space
+    return " ".join(s.split())
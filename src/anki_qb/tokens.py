@@ -0,0 +1,150 @@
+"""Token estimation and context window sizes for LLM models."""
+
+import functools
+from typing import Optional
+
+# Approximate context windows (in tokens), keyed by model name prefix.
+# The longest matching prefix wins, so specific models can override a family default.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16_385,
+    "gpt-4": 8_192,
+    "gpt-4-turbo": 128_000,
+    "gpt-4o": 128_000,
+    "4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+    "claude": 200_000,
+    "gemini": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+}
+
+# Context window used for unknown models
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# Average characters per token, keyed by model name prefix. Used when no local
+# tokenizer is available for the model.
+CHARS_PER_TOKEN = {
+    "gpt": 4.0,
+    "4o": 4.0,
+    "o1": 4.0,
+    "o3": 4.0,
+    "o4": 4.0,
+    "claude": 3.5,
+    "gemini": 4.0,
+}
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Fraction of the context window that prompts may fill by default, leaving room for the response
+DEFAULT_CONTEXT_FRACTION = 0.5
+
+# Approximate list prices in USD per million (input, output) tokens, keyed by model name prefix
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "4o": (2.50, 10.00),
+    "4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "o1": (15.00, 60.00),
+    "o3": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+    "claude": (3.00, 15.00),
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-opus": (15.00, 75.00),
+    "gemini": (0.10, 0.40),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# Price used for unknown models (deliberately on the high side, so budgets stay conservative)
+DEFAULT_PRICE = (3.00, 15.00)
+
+
+def _base_name(model: Optional[str]) -> str:
+    """Strip any provider prefix (e.g. "anthropic/") and lowercase a model name."""
+    return (model or "").rsplit("/", 1)[-1].lower()
+
+
+def _lookup(table: dict, model: Optional[str], default):
+    """Look up a model in a prefix-keyed table, preferring the longest matching prefix."""
+    name = _base_name(model)
+    matches = [prefix for prefix in table if name.startswith(prefix)]
+    if not matches:
+        return default
+    return table[max(matches, key=len)]
+
+
+def estimate_cost(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    """
+    Estimate the cost of a request from its token counts.
+
+    Args:
+        model: Model name (e.g., "gpt-4o-mini", "claude-3-5-sonnet")
+        input_tokens: Number of prompt tokens
+        output_tokens: Number of response tokens
+
+    Returns:
+        Approximate cost in USD (using DEFAULT_PRICE for unknown models)
+    """
+    input_price, output_price = _lookup(MODEL_PRICES, model, DEFAULT_PRICE)
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def context_window(model: Optional[str] = None) -> int:
+    """
+    Get the context window size of a model.
+
+    Args:
+        model: Model name (e.g., "gpt-4o-mini", "claude-3-5-sonnet")
+
+    Returns:
+        Context window in tokens (DEFAULT_CONTEXT_WINDOW for unknown models)
+    """
+    return _lookup(MODEL_CONTEXT_WINDOWS, model, DEFAULT_CONTEXT_WINDOW)
+
+
+@functools.cache
+def _tiktoken_encoding(model: str):
+    """Get a tiktoken encoding for an OpenAI model, or None if unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return None
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Estimate the number of tokens in a text for a given model.
+
+    Uses tiktoken when it is installed and knows the model, otherwise falls back
+    to a characters-per-token heuristic for the model family.
+
+    Args:
+        text: Text to estimate
+        model: Model name the text will be sent to
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding(_base_name(model)) if model else None
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    chars_per_token = _lookup(CHARS_PER_TOKEN, model, DEFAULT_CHARS_PER_TOKEN)
+    return int(len(text) / chars_per_token) + 1
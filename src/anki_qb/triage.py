@@ -0,0 +1,100 @@
+"""Triage of topics before generation, by how much support they have in the corpus."""
+
+from dataclasses import dataclass
+from typing import Optional
+
+# Triage actions: generate as usual, generate with a cheaper model and shorter prompt, or skip
+FULL, DOWNTIER, SKIP = "full", "downtier", "skip"
+
+# Topics with fewer related tossups plus bonuses than this have weak corpus support
+DEFAULT_MIN_RELATED = 3
+
+# Topics whose label is mentioned in fewer questions than this have weak corpus support
+DEFAULT_MIN_FREQUENCY = 5
+
+# YGK texts shorter than this (the one-line entries at the end of some articles) give the
+# model little to work with
+DEFAULT_MIN_TEXT_LENGTH = 250
+
+
+@dataclass
+class TriageDecision:
+    """How to handle a topic, and the signals the decision was based on."""
+
+    action: str
+    reason: str
+
+
+class TriagePolicy:
+    """
+    Decides from cheap local signals whether a topic is worth a full LLM request.
+
+    The signals are the number of related questions found for the topic, how many
+    questions mention its label (see anki_qb.frequency) and the length of its YGK
+    text. A topic is skipped if every signal is weak and no related questions were
+    found, since the flashcards would rest on the article alone. It is down-tiered
+    if it has few related questions or two weak signals, and generated as usual
+    otherwise.
+
+    Example:
+        policy = TriagePolicy()
+        decision = policy.decide(metadata["num_related"], metadata["text_length"], frequency)
+        if decision.action == SKIP:
+            ...
+    """
+
+    def __init__(
+        self,
+        min_related: int = DEFAULT_MIN_RELATED,
+        min_frequency: int = DEFAULT_MIN_FREQUENCY,
+        min_text_length: int = DEFAULT_MIN_TEXT_LENGTH,
+    ):
+        """
+        Initialize a triage policy.
+
+        Args:
+            min_related: Fewest related tossups plus bonuses for strong support
+            min_frequency: Fewest questions mentioning the topic for strong support
+            min_text_length: Fewest characters of YGK text for strong support
+        """
+        self.min_related = min_related
+        self.min_frequency = min_frequency
+        self.min_text_length = min_text_length
+
+    def decide(
+        self, num_related: int, text_length: int, frequency: Optional[int] = None
+    ) -> TriageDecision:
+        """
+        Triage a topic.
+
+        Args:
+            num_related: Number of related tossups plus bonuses (see get_qbr_data)
+            text_length: Number of characters in the topic's YGK text
+            frequency: Number of questions mentioning the topic, or None if term
+                frequencies weren't loaded (the signal is then left out)
+
+        Returns:
+            TriageDecision whose reason lists the signals, weak ones first
+        """
+        signals = [
+            (num_related < self.min_related, f"{num_related} related questions"),
+            (text_length < self.min_text_length, f"{text_length} characters of text"),
+        ]
+        if frequency is not None:
+            signals.append((frequency < self.min_frequency, f"{frequency} mentions"))
+        weak = [description for is_weak, description in signals if is_weak]
+        strong = [description for is_weak, description in signals if not is_weak]
+        reason = "; ".join(
+            part for part in (
+                f"weak: {', '.join(weak)}" if weak else "",
+                f"strong: {', '.join(strong)}" if strong else "",
+            ) if part
+        )
+
+        if num_related == 0 and not strong:
+            action = SKIP
+        elif signals[0][0] or len(weak) >= 2:
+            action = DOWNTIER
+        else:
+            action = FULL
+        return TriageDecision(action, reason)
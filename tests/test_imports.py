@@ -0,0 +1,38 @@
+"""Tests that importing anki_qb stays cheap."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import anki_qb
+
+# Modules that are slow to import and must only be loaded on first use
+HEAVY_MODULES = ("pandas", "numpy", "llm", "lxml")
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import anki_qb",
+        "from anki_qb import Config, get_config",
+        # What bin/generate-flashcards.py imports before parsing arguments
+        "import anki_qb.config, anki_qb.jobs, anki_qb.tokens",
+    ],
+)
+def test_import_does_not_load_heavy_modules(statement):
+    src = str(Path(anki_qb.__file__).parent.parent)
+    path = os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))
+    env = {**os.environ, "PYTHONPATH": path}
+    code = f"{statement}; import sys; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == []
+
+
+def test_lazy_exports_resolve():
+    for name in anki_qb.__all__:
+        assert getattr(anki_qb, name) is not None
@@ -0,0 +1,101 @@
+"""Tests for the async LLM API (anki_qb.llm.ask_llm_async) with a stub model."""
+
+import asyncio
+
+import llm
+import pytest
+
+import anki_qb.llm as anki_llm
+from anki_qb.llm import ask_llm_async
+
+
+class StubAsyncModel(llm.AsyncModel):
+    """Async model that echoes prompts of the form "<name>:<seconds>" after a delay."""
+
+    model_id = "stub-async"
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def execute(self, prompt, stream, response, conversation):
+        name, delay = prompt.prompt.split(":")
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(float(delay))
+            yield f"echo {name}"
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    model = StubAsyncModel()
+    monkeypatch.setitem(anki_llm.models._models, (model.model_id, True), model)
+    return model
+
+
+def test_semaphore_limits_concurrency(stub):
+    async def run():
+        semaphore = asyncio.Semaphore(3)
+        return await asyncio.gather(
+            *(ask_llm_async(f"p{i}:0.02", model=stub.model_id, semaphore=semaphore) for i in range(12))
+        )
+
+    assert len(asyncio.run(run())) == 12
+    assert stub.peak == 3
+    assert stub.active == 0
+
+
+def test_results_in_input_order(stub):
+    # Later prompts finish first
+    delays = [0.08, 0.06, 0.04, 0.02, 0.0]
+
+    async def run():
+        semaphore = asyncio.Semaphore(len(delays))
+        return await asyncio.gather(
+            *(
+                ask_llm_async(f"p{i}:{delay}", model=stub.model_id, semaphore=semaphore)
+                for i, delay in enumerate(delays)
+            )
+        )
+
+    assert asyncio.run(run()) == [f"echo p{i}" for i in range(len(delays))]
+
+
+def test_timeout_raises_and_cancels_request(stub):
+    async def run():
+        await ask_llm_async("slow:5", model=stub.model_id, timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+    assert stub.active == 0
+
+
+def test_timeout_falls_back_with_gather(stub):
+    # One slow request times out without holding up or failing the others
+    async def run():
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(
+            ask_llm_async("a:0.01", model=stub.model_id, timeout=0.5, semaphore=semaphore),
+            ask_llm_async("slow:5", model=stub.model_id, timeout=0.05, semaphore=semaphore),
+            ask_llm_async("b:0.01", model=stub.model_id, timeout=0.5, semaphore=semaphore),
+            return_exceptions=True,
+        )
+
+    first, slow, last = asyncio.run(run())
+    assert (first, last) == ("echo a", "echo b")
+    assert isinstance(slow, TimeoutError)
+
+
+def test_timeout_excludes_semaphore_wait(stub):
+    # The second request waits ~0.1s for the semaphore, longer than its timeout
+    async def run():
+        semaphore = asyncio.Semaphore(1)
+        return await asyncio.gather(
+            ask_llm_async("a:0.1", model=stub.model_id, semaphore=semaphore),
+            ask_llm_async("b:0.01", model=stub.model_id, timeout=0.05, semaphore=semaphore),
+        )
+
+    assert asyncio.run(run()) == ["echo a", "echo b"]
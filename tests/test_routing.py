@@ -0,0 +1,160 @@
+"""Tests for anki_qb.routing with stub models in place of LLM calls."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from anki_qb.routing import Route, ask_routed, ask_routed_stream
+
+TABLE = "| Question | Answer |\n|---|---|\n| q from {model} | a |\n"
+
+
+def stub_ask(behaviors, calls=None):
+    """
+    Build an ask_fn whose models behave as given.
+
+    Args:
+        behaviors: Model name -> (seconds to wait, response text or exception to raise)
+        calls: Optional list the called model names are appended to
+    """
+    def ask_fn(prompt, model):
+        if calls is not None:
+            calls.append(model)
+        delay, response = behaviors[model]
+        time.sleep(delay)
+        if isinstance(response, Exception):
+            raise response
+        return response.format(model=model)
+
+    return ask_fn
+
+
+def stub_ask_stream(behaviors):
+    """
+    Build a streaming ask_fn (see ask_llm_stream) whose models behave as given.
+
+    Args:
+        behaviors: Model name -> (seconds to wait before each row, number of rows,
+            exception to raise after the rows or None)
+    """
+    def ask_fn(prompt, model, timeout=None, on_row=None):
+        delay, num_rows, error = behaviors[model]
+        start = time.monotonic()
+        rows = []
+        for i in range(num_rows):
+            time.sleep(delay)
+            if timeout is not None and time.monotonic() - start > timeout:
+                return pd.DataFrame(rows), False
+            row = {"Question": f"q{i} from {model}", "Answer": "a"}
+            rows.append(row)
+            if on_row is not None:
+                on_row(row)
+        if error is not None:
+            raise error
+        return pd.DataFrame(rows), True
+
+    return ask_fn
+
+
+def test_falls_back_when_model_raises():
+    calls = []
+    ask_fn = stub_ask({"a": (0, RuntimeError("rate limited")), "b": (0, TABLE)}, calls)
+    df, model = ask_routed("prompt", Route(["a", "b"]), ask_fn=ask_fn)
+    assert model == "b"
+    assert df["Question"].tolist() == ["q from b"]
+    assert calls == ["a", "b"]
+
+
+def test_falls_back_on_malformed_table():
+    ask_fn = stub_ask({"a": (0, "Sorry, I can't help with that."), "b": (0, TABLE)})
+    df, model = ask_routed("prompt", Route(["a", "b"]), ask_fn=ask_fn)
+    assert model == "b"
+    assert len(df) == 1
+
+
+def test_all_models_failing_raises():
+    ask_fn = stub_ask({"a": (0, ValueError("boom")), "b": (0, "no table")})
+    with pytest.raises(RuntimeError, match="a: boom"):
+        ask_routed("prompt", Route(["a", "b"]), ask_fn=ask_fn)
+
+
+def test_race_takes_first_valid_result():
+    calls = []
+    ask_fn = stub_ask({"slow": (0.3, TABLE), "fast": (0.01, TABLE), "spare": (0, TABLE)}, calls)
+    start = time.monotonic()
+    _, model = ask_routed("prompt", Route(["slow", "fast", "spare"], race=True), ask_fn=ask_fn)
+    assert model == "fast"
+    assert time.monotonic() - start < 0.25
+    assert "spare" not in calls
+
+
+def test_race_skips_invalid_result_that_finishes_first():
+    ask_fn = stub_ask({"a": (0.05, TABLE), "b": (0, "not a table")})
+    _, model = ask_routed("prompt", Route(["a", "b"], race=True), ask_fn=ask_fn)
+    assert model == "a"
+
+
+def test_timeout_falls_back():
+    ask_fn = stub_ask({"slow": (0.5, TABLE), "b": (0, TABLE)})
+    start = time.monotonic()
+    _, model = ask_routed("prompt", Route(["slow", "b"], timeout=0.05), ask_fn=ask_fn)
+    assert model == "b"
+    assert time.monotonic() - start < 0.4
+
+
+def test_timeout_on_every_model_raises():
+    ask_fn = stub_ask({"a": (0.5, TABLE), "b": (0.5, TABLE)})
+    with pytest.raises(RuntimeError, match="b: timed out"):
+        ask_routed("prompt", Route(["a", "b"], timeout=0.05), ask_fn=ask_fn)
+
+
+def test_stream_falls_back_before_first_row():
+    rows = []
+    ask_fn = stub_ask_stream({"a": (0, 0, RuntimeError("overloaded")), "b": (0, 2, None)})
+    df, complete, model = ask_routed_stream(
+        "prompt", Route(["a", "b"]), ask_fn=ask_fn, on_row=rows.append
+    )
+    assert (model, complete, len(df)) == ("b", True, 2)
+    assert [row["Question"] for row in rows] == ["q0 from b", "q1 from b"]
+
+
+def test_stream_failure_after_rows_is_not_retried():
+    rows = []
+    calls = []
+    stream = stub_ask_stream({"a": (0, 2, RuntimeError("connection reset")), "b": (0, 2, None)})
+
+    def ask_fn(prompt, model, **kwargs):
+        calls.append(model)
+        return stream(prompt, model, **kwargs)
+
+    with pytest.raises(RuntimeError, match="connection reset"):
+        ask_routed_stream("prompt", Route(["a", "b"]), ask_fn=ask_fn, on_row=rows.append)
+    # The rows already passed on aren't followed by a second response's rows
+    assert calls == ["a"]
+    assert [row["Question"] for row in rows] == ["q0 from a", "q1 from a"]
+
+
+def test_stream_timeout_keeps_rows_so_far():
+    ask_fn = stub_ask_stream({"a": (0.04, 5, None), "b": (0, 1, None)})
+    df, complete, model = ask_routed_stream("prompt", Route(["a", "b"], timeout=0.1), ask_fn=ask_fn)
+    assert model == "a"
+    assert not complete
+    assert 0 < len(df) < 5
+
+
+def test_stream_race_forwards_only_winner_rows():
+    rows = []
+    lock = threading.Lock()
+
+    def on_row(row):
+        with lock:
+            rows.append(row)
+
+    ask_fn = stub_ask_stream({"slow": (0.1, 2, None), "fast": (0.01, 3, None)})
+    df, complete, model = ask_routed_stream(
+        "prompt", Route(["slow", "fast"], race=True), ask_fn=ask_fn, on_row=on_row
+    )
+    assert (model, complete, len(df)) == ("fast", True, 3)
+    assert all(row["Question"].endswith("from fast") for row in rows)
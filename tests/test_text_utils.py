@@ -0,0 +1,59 @@
+"""Tests for anki_qb.text_utils."""
+
+import html
+import random
+import unicodedata
+
+import pytest
+
+from anki_qb.text_utils import _CACHE_MAX_LENGTH, normalize_text
+
+# Pieces that exercise every step of the normalization, mixed with plain text
+_PIECES = [
+    "a", "Z", "7", " ", "  ", "\t", "\n", ".", ",", "'", '"', "|",
+    "&amp;", "&nbsp;", "&#8212;", "&eacute;", "&lt;b&gt;", "&", "&bogus;",
+    "\xa0", "\u200b", "\u202f", " ", "\u3000",
+    "–", "—", "…", "“", "”", "‘", "’",
+    "é", "ñ", "Å", "ø", "ß", "e\u0301", "\u0301", "Ａ", "ﬁ", "½", "²", "Ω", "漢", "🎻",
+]
+
+
+def _baseline_normalize(s: str) -> str:
+    """normalize_text as it was before it was made table-driven and cached."""
+    if not s:
+        return ""
+    s = html.unescape(s)
+    s = s.replace("\xa0", " ").replace("\u200b", "").replace("\u202f", " ")
+    s = unicodedata.normalize("NFKD", s)
+    for k, v in {"–": "-", "—": "-", "…": "..."}.items():
+        s = s.replace(k, v)
+    return " ".join(s.split())
+
+
+def _random_text(rng: random.Random, max_pieces: int) -> str:
+    return "".join(rng.choice(_PIECES) for _ in range(rng.randint(0, max_pieces)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_normalize_text_matches_baseline(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        s = _random_text(rng, 40)
+        assert normalize_text(s) == _baseline_normalize(s), repr(s)
+        # Again, now from the cache
+        assert normalize_text(s) == _baseline_normalize(s), repr(s)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_normalize_text_matches_baseline_uncached(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        s = _random_text(rng, 400)
+        while len(s) <= _CACHE_MAX_LENGTH:
+            s += _random_text(rng, 100)
+        assert normalize_text(s) == _baseline_normalize(s), repr(s)
+
+
+@pytest.mark.parametrize("s", [None, "", "   ", "&nbsp;", "\u200b", "Caf&eacute;\xa0—  1850…"])
+def test_normalize_text_edge_cases(s):
+    assert normalize_text(s) == _baseline_normalize(s)